@@ -1,23 +1,139 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, ValidationError
+from typing import Optional, List, Tuple
 import psycopg2
-from psycopg2.extras import RealDictCursor
 import os
 import json
 import re
 import logging
+import logging.handlers
 import hashlib
-from contextlib import contextmanager
-from datetime import datetime
-
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+import base64
+import asyncio
+import atexit
+import contextvars
+import gzip
+import cProfile
+import io
+import pstats
+import queue
+import random
+import sys
+import threading
+import time
+import urllib.request
+from collections import deque, OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+# ============================================================================
+# LOGGING ESTRUCTURADO (COLA + HILO DE ESCRITURA)
+# ============================================================================
+# Los handlers de la aplicación solo encolan el LogRecord: el mensaje se formatea y
+# se escribe en stdout desde el hilo del QueueListener, no en el que atiende la petición
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" (una línea JSON por evento) o "text" (formato legible de siempre)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Niveles por logger, p. ej. "app=WARNING,uvicorn.access=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# Fracción de eventos informativos por petición (p. ej. contenido creado) que se registran;
+# los avisos y errores se registran siempre
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1"))
+
+# Atributos propios de un LogRecord: el resto son los campos pasados en `extra`
+_ATRIBUTOS_LOG_RECORD = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def campos_extra(record: logging.LogRecord) -> dict:
+    return {clave: valor for clave, valor in vars(record).items() if clave not in _ATRIBUTOS_LOG_RECORD}
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por evento: ts, level, logger, msg y los campos de `extra`."""
+
+    def format(self, record):
+        evento = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        evento.update(campos_extra(record))
+        if record.exc_info:
+            evento["exc"] = self.formatException(record.exc_info)
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+class FormatoTexto(logging.Formatter):
+    """Formato legible; los campos de `extra` se añaden al final como clave=valor."""
+
+    def format(self, record):
+        linea = super().format(record)
+        extra = campos_extra(record)
+        if extra:
+            linea += " " + " ".join(f"{clave}={valor}" for clave, valor in extra.items())
+        return linea
+
+
+class ColaLogs(logging.handlers.QueueHandler):
+    """QueueHandler que encola el LogRecord sin formatear.
+
+    QueueHandler.prepare() formatea el mensaje antes de encolarlo (pensado para colas entre
+    procesos); aquí la cola es del mismo proceso, así que todo el formateo se deja al hilo
+    del listener. Los argumentos del mensaje deben ser valores que no cambien después.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+_listener_logs = None
+
+
+def configurar_logging(destino=None, formato: str = None):
+    """Configura el logger raíz con la cola y arranca el hilo que escribe en `destino` (stdout)."""
+    global _listener_logs
+    if _listener_logs is not None:
+        _listener_logs.stop()
+    salida = logging.StreamHandler(destino or sys.stdout)
+    if (formato or LOG_FORMAT) == "json":
+        salida.setFormatter(FormatoJSON())
+    else:
+        salida.setFormatter(FormatoTexto('%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                                         datefmt='%Y-%m-%d %H:%M:%S'))
+    cola = queue.SimpleQueue()
+    raiz = logging.getLogger()
+    for handler in raiz.handlers[:]:
+        raiz.removeHandler(handler)
+    raiz.addHandler(ColaLogs(cola))
+    raiz.setLevel(LOG_LEVEL)
+    for par in filter(None, (p.strip() for p in LOG_LEVELS.split(","))):
+        nombre, _, nivel = par.partition("=")
+        logging.getLogger(nombre.strip()).setLevel(nivel.strip().upper())
+    _listener_logs = logging.handlers.QueueListener(cola, salida)
+    _listener_logs.start()
+    return _listener_logs
+
+
+def detener_logging():
+    """Vacía la cola de logs y detiene el hilo de escritura."""
+    global _listener_logs
+    if _listener_logs is not None:
+        _listener_logs.stop()
+        _listener_logs = None
+
+
+def muestrear_log(nivel: int = logging.INFO) -> bool:
+    """True si un evento de `nivel` debe construirse y registrarse (nivel activo y LOG_SAMPLE_RATE)."""
+    return logger.isEnabledFor(nivel) and (LOG_SAMPLE_RATE >= 1 or random.random() < LOG_SAMPLE_RATE)
+
+
+configurar_logging()
+atexit.register(detener_logging)
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
@@ -29,6 +145,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Consistency-Token", "X-Cache", "ETag", "X-DB-Round-Trips", "X-Profile"],
 )
 
 # =========================================================
@@ -49,141 +166,1933 @@ DB_REPLICA_NAME = os.getenv("DB_REPLICA_NAME", "synthetic_data_db")
 DB_REPLICA_USER = os.getenv("DB_REPLICA_USER", "postgres_user")
 DB_REPLICA_PASSWORD = os.getenv("DB_REPLICA_PASSWORD", "postgres_password_secure_2024")
 
+# Varias réplicas: lista "host[:puerto][*peso]" separada por comas, p. ej.
+# "db-replica:5432,db-replica-2:5432*2". Sin definir, se usa DB_REPLICA_HOST/DB_REPLICA_PORT.
+DB_REPLICAS = os.getenv("DB_REPLICAS", "")
+# Reparto de lecturas: "least_outstanding" (menos lecturas en curso por peso) o "weighted" (aleatorio por peso)
+DB_REPLICA_BALANCING = os.getenv("DB_REPLICA_BALANCING", "least_outstanding").lower()
+
+
+# Configuración de los pools de conexiones (uno por rol: PRIMARY y REPLICA)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+DB_POOL_VALIDATE_AFTER = float(os.getenv("DB_POOL_VALIDATE_AFTER", "30"))
+# Segundos máximos para abrir una conexión (un servidor caído no debe colgar la petición)
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "3"))
+# SQL distintos sin declarar (ni lectura(...) ni escritura(...)) cuya ruta se memoriza
+SQL_ROUTE_CACHE_SIZE = int(os.getenv("SQL_ROUTE_CACHE_SIZE", "256"))
+# Sentencias preparadas en el servidor (PREPARE/EXECUTE) para las Consulta declaradas,
+# y cuántas se mantienen como máximo en cada conexión
+DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() in ("1", "true", "yes", "on")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "64"))
+
+
+class PoolTimeoutError(ConnectionError):
+    """No se pudo obtener una conexión del pool dentro del timeout configurado."""
+
+
+async def _esperar_conexion(raw):
+    """
+    Esperar a que una conexión psycopg2 asíncrona termine su operación en curso,
+    usando el event loop (add_reader/add_writer) en lugar de bloquear el hilo.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        state = raw.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            return
+        fd = raw.fileno()
+        fut = loop.create_future()
+
+        def _listo():
+            if not fut.done():
+                fut.set_result(None)
+
+        if state == psycopg2.extensions.POLL_READ:
+            loop.add_reader(fd, _listo)
+            try:
+                await fut
+            finally:
+                loop.remove_reader(fd)
+        elif state == psycopg2.extensions.POLL_WRITE:
+            loop.add_writer(fd, _listo)
+            try:
+                await fut
+            finally:
+                loop.remove_writer(fd)
+        else:
+            raise psycopg2.OperationalError(f"Estado de poll inesperado: {state}")
+
+
+# Marcadores de parámetros de psycopg2 (%s, %(nombre)s) y el % literal escapado (%%)
+_MARCADOR_RE = re.compile(r"%\((\w+)\)s|%s|%%")
+
+
+# Una entrada por sentencia que una conexión puede tener preparada
+@lru_cache(maxsize=DB_STATEMENT_CACHE_SIZE)
+def sql_preparable(sql: str):
+    """
+    Traducir un SQL con marcadores de psycopg2 al formato de PREPARE.
+    Retorna (texto con $1..$n, argumentos de EXECUTE con marcadores de psycopg2).
+    Ej.: "... WHERE a = %(x)s AND b = %(x)s" -> ("... WHERE a = $1 AND b = $1", "(%(x)s)").
+    """
+    nombres, posicionales = {}, 0
+
+    def sustituir(m):
+        nonlocal posicionales
+        if m.group(0) == "%%":
+            return "%"
+        if m.group(1):
+            return "$" + str(nombres.setdefault(m.group(1), len(nombres) + 1))
+        posicionales += 1
+        return f"${posicionales}"
+
+    texto = _MARCADOR_RE.sub(sustituir, sql)
+    if nombres and posicionales:
+        raise ValueError("No se pueden mezclar parámetros %s y %(nombre)s en una sentencia preparada")
+    marcadores = [f"%({nombre})s" for nombre in nombres] or ["%s"] * posicionales
+    return texto, "(" + ", ".join(marcadores) + ")" if marcadores else ""
+
+
+class SentenciasPreparadas:
+    """
+    Registro de las sentencias preparadas de una conexión: la primera vez que se ejecuta
+    una `Consulta` se hace PREPARE y las siguientes solo EXECUTE, con lo que PostgreSQL
+    no vuelve a analizar ni (con plan genérico) a planificar el SQL.
+
+    Vive en la `AsyncConnection`: una conexión nueva o reciclada por el pool empieza con
+    el registro vacío y vuelve a preparar. Guarda como mucho DB_STATEMENT_CACHE_SIZE
+    sentencias; al superarlo libera con DEALLOCATE las usadas hace más tiempo (fuera de
+    transacciones). Si el servidor las pierde (DISCARD ALL) o un cambio de esquema
+    invalida el plan, fuera de una transacción se preparan de nuevo y se reintenta.
+    """
+
+    # Totales de todas las conexiones (para /api/health)
+    prepares = 0
+    executes = 0
+    deallocates = 0
+    reprepares = 0
+
+    def __init__(self, max_size: int = DB_STATEMENT_CACHE_SIZE):
+        self.max_size = max(1, max_size)
+        self._nombres = OrderedDict()
+
+    def __len__(self):
+        return len(self._nombres)
+
+    def olvidar(self):
+        """Vaciar el registro (p. ej. tras un DISCARD ALL en la conexión)."""
+        self._nombres.clear()
+
+    async def _liberar_antiguas(self, cursor: "AsyncCursor"):
+        # Solo fuera de una transacción: un DEALLOCATE fallido no debe abortar la del llamador
+        while len(self._nombres) >= self.max_size and not cursor.in_transaction():
+            antigua, _ = self._nombres.popitem(last=False)
+            try:
+                await cursor.execute_simple(f"DEALLOCATE {antigua}")
+            except psycopg2.errors.InvalidSqlStatementName:
+                pass
+            SentenciasPreparadas.deallocates += 1
+
+    async def _preparar(self, cursor: "AsyncCursor", nombre: str, texto: str):
+        await cursor.execute_simple(f"PREPARE {nombre} AS {texto}")
+        self._nombres[nombre] = True
+        SentenciasPreparadas.prepares += 1
+
+    async def preparar(self, cursor: "AsyncCursor", consulta: "Consulta") -> bool:
+        """Preparar `consulta` sin ejecutarla si la conexión aún no la tiene (calentamiento)."""
+        if consulta.nombre in self._nombres:
+            return False
+        await self._liberar_antiguas(cursor)
+        await self._preparar(cursor, consulta.nombre, sql_preparable(consulta)[0])
+        return True
+
+    async def ejecutar(self, cursor: "AsyncCursor", consulta: "Consulta", params=None):
+        texto, argumentos = sql_preparable(consulta)
+        nombre = consulta.nombre
+        if nombre in self._nombres:
+            self._nombres.move_to_end(nombre)
+        else:
+            await self._liberar_antiguas(cursor)
+            await self._preparar(cursor, nombre, texto)
+
+        try:
+            await cursor.execute_simple(f"EXECUTE {nombre}{argumentos}", params, descripcion=consulta)
+        except psycopg2.errors.InvalidSqlStatementName:
+            # El servidor ya no tiene las sentencias de esta sesión (DISCARD ALL)
+            self.olvidar()
+            if cursor.in_transaction():
+                raise
+            await self._reintentar(cursor, nombre, texto, argumentos, params)
+        except psycopg2.errors.FeatureNotSupported as e:
+            # "cached plan must not change result type": el esquema cambió desde el PREPARE
+            if "cached plan" not in str(e) or cursor.in_transaction():
+                raise
+            self._nombres.pop(nombre, None)
+            await cursor.execute_simple(f"DEALLOCATE {nombre}")
+            await self._reintentar(cursor, nombre, texto, argumentos, params)
+        SentenciasPreparadas.executes += 1
+
+    async def _reintentar(self, cursor: "AsyncCursor", nombre: str, texto: str, argumentos: str, params):
+        await self._preparar(cursor, nombre, texto)
+        SentenciasPreparadas.reprepares += 1
+        await cursor.execute_simple(f"EXECUTE {nombre}{argumentos}", params, descripcion=texto)
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "enabled": DB_PREPARED_STATEMENTS,
+            "prepares": cls.prepares,
+            "executes": cls.executes,
+            "reprepares": cls.reprepares,
+            "deallocates": cls.deallocates,
+        }
+
+
+class AsyncCursor:
+    """
+    Cursor psycopg2 cuyo `execute` se espera en el event loop. Las `Consulta`
+    (`lectura`/`escritura`) se ejecutan como sentencias preparadas de la conexión.
+    """
+
+    def __init__(self, cursor, conn: "AsyncConnection"):
+        self._cursor = cursor
+        self._conn = conn
+        self._raw = conn.raw
+
+    async def execute(self, query, params=None):
+        if DB_PREPARED_STATEMENTS and isinstance(query, Consulta):
+            await self._conn.sentencias.ejecutar(self, query, params)
+        else:
+            await self.execute_simple(query, params)
+
+    async def execute_simple(self, query, params=None, descripcion=None):
+        """
+        Ejecutar el SQL tal cual, sin pasar por las sentencias preparadas. Dentro de una
+        petición, cuenta el viaje a la base de datos y su duración (`descripcion` es el SQL
+        que se muestra en el log de consultas lentas si no es el propio `query`).
+        """
+        medicion = _medicion.get()
+        if medicion is None:
+            self._cursor.execute(query, params)
+            await _esperar_conexion(self._raw)
+            return
+        medicion.viajes += 1
+        inicio = time.perf_counter()
+        try:
+            self._cursor.execute(query, params)
+            await _esperar_conexion(self._raw)
+        finally:
+            medicion.registrar_consulta(self._conn.destino, time.perf_counter() - inicio, descripcion or query)
+
+    def in_transaction(self) -> bool:
+        return self._conn.in_transaction()
+
+    async def execute_values(self, sql, argslist, template=None, page_size=100, fetch=False):
+        """
+        Equivalente de psycopg2.extras.execute_values para el modo asíncrono: `sql` lleva
+        un único `VALUES %s` que se sustituye por las filas de cada página, compuestas
+        en el cliente con `mogrify`. Retorna las filas devueltas si `fetch=True`.
+        """
+        antes, despues = sql.encode("utf-8").split(b"%s", 1)
+        resultado = []
+        argslist = list(argslist)
+        for inicio in range(0, len(argslist), page_size):
+            pagina = argslist[inicio:inicio + page_size]
+            plantilla = template or "(" + ",".join(["%s"] * len(pagina[0])) + ")"
+            valores = b",".join(self._cursor.mogrify(plantilla, fila) for fila in pagina)
+            await self.execute_simple(antes + valores + despues)
+            if fetch:
+                resultado.extend(self._cursor.fetchall())
+        return resultado
+
+    def __getattr__(self, name):
+        # fetchone/fetchall/rowcount/description/mogrify/close... del cursor real
+        return getattr(self._cursor, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+
+class AsyncConnection:
+    """
+    Conexión psycopg2 en modo asíncrono (`async_=1`).
+
+    Las conexiones asíncronas de psycopg2 trabajan siempre en autocommit, así
+    que las transacciones se abren explícitamente con `transaction()`.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        # "primary", "replica" o "fallback" (lectura servida por PRIMARY); lo fija el router
+        self.destino = "primary"
+        self.sentencias = SentenciasPreparadas()
+
+    @classmethod
+    async def connect(cls, **connect_kwargs) -> "AsyncConnection":
+        raw = psycopg2.connect(async_=1, **connect_kwargs)
+        try:
+            await _esperar_conexion(raw)
+        except BaseException:
+            raw.close()
+            raise
+        return cls(raw)
+
+    @property
+    def closed(self) -> bool:
+        return bool(self.raw.closed)
+
+    def is_busy(self) -> bool:
+        """True si quedó una query en curso (p. ej. petición cancelada a mitad)."""
+        return not self.raw.closed and self.raw.isexecuting()
+
+    def in_transaction(self) -> bool:
+        return self.raw.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self, cursor_factory=None) -> AsyncCursor:
+        return AsyncCursor(self.raw.cursor(cursor_factory=cursor_factory), self)
+
+    async def execute(self, query, params=None):
+        """Ejecutar una sentencia sin resultados."""
+        with self.cursor() as cur:
+            await cur.execute(query, params)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Bloque BEGIN ... COMMIT (ROLLBACK si el bloque lanza una excepción)."""
+        await self.execute("BEGIN")
+        try:
+            yield self
+        except BaseException:
+            if not self.closed and not self.is_busy():
+                await self.execute("ROLLBACK")
+            raise
+        else:
+            await self.execute("COMMIT")
+
+    def close(self):
+        try:
+            self.raw.close()
+        except Exception:
+            pass
+
+
+class AsyncConnectionPool:
+    """
+    Pool acotado de conexiones `AsyncConnection`.
+
+    - Mantiene entre `min_size` y `max_size` conexiones abiertas.
+    - `getconn` espera como máximo `timeout` segundos a que se libere una conexión,
+      sin bloquear el event loop.
+    - Las conexiones que superan `max_lifetime` se reciclan y las que llevan más de
+      `validate_after` segundos inactivas se validan antes de entregarse.
+    Todo su estado se manipula desde el hilo del event loop, por lo que no usa locks.
+    """
+
+    def __init__(self, name: str, connect_kwargs: dict, min_size: int = DB_POOL_MIN_SIZE,
+                 max_size: int = DB_POOL_MAX_SIZE, timeout: float = DB_POOL_TIMEOUT,
+                 max_lifetime: float = DB_POOL_MAX_LIFETIME,
+                 validate_after: float = DB_POOL_VALIDATE_AFTER):
+        self.name = name
+        self._connect_kwargs = connect_kwargs
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.validate_after = validate_after
+
+        self._idle = deque()      # (conn, created_at, last_used)
+        self._in_use = {}         # id(conn) -> created_at
+        self._waiters = deque()   # futures de corrutinas esperando conexión
+        self._size = 0
+        self._closed = False
+
+        # Estadísticas
+        self._checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    async def _connect(self) -> AsyncConnection:
+        # libpq no aplica connect_timeout a las conexiones asíncronas
+        try:
+            conn = await asyncio.wait_for(AsyncConnection.connect(**self._connect_kwargs), DB_CONNECT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise psycopg2.OperationalError(f"Timeout ({DB_CONNECT_TIMEOUT}s) conectando con {self.name}")
+        self._created += 1
+        return conn
+
+    async def _is_usable(self, conn: AsyncConnection, created_at: float, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            return False
+        if self.validate_after is not None and now - last_used > self.validate_after:
+            try:
+                await conn.execute("SELECT 1")
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _wake_one(self):
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+
+    def _discard(self, conn: AsyncConnection):
+        conn.close()
+        self._size -= 1
+        self._discarded += 1
+        self._wake_one()
+
+    async def prefill(self):
+        """Abrir las conexiones mínimas (`min_size`)."""
+        while not self._closed and self._size < self.min_size:
+            self._size += 1
+            try:
+                conn = await self._connect()
+            except BaseException:
+                self._size -= 1
+                self._wake_one()
+                raise
+            self._idle.append((conn, time.monotonic(), time.monotonic()))
+            self._wake_one()
+
+    async def getconn(self, timeout: Optional[float] = None) -> AsyncConnection:
+        """Obtener una conexión del pool, esperando como máximo `timeout` segundos."""
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            if self._closed:
+                raise ConnectionError(f"Pool {self.name} cerrado")
+            if self._idle:
+                conn, created_at, last_used = self._idle.pop()
+                if not await self._is_usable(conn, created_at, last_used):
+                    # Conexión muerta o demasiado antigua: reciclar y volver a intentar
+                    self._discard(conn)
+                    continue
+                break
+            if self._size < self.max_size:
+                self._size += 1
+                try:
+                    conn = await self._connect()
+                except BaseException:
+                    self._size -= 1
+                    self._wake_one()
+                    raise
+                created_at = time.monotonic()
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._timeouts += 1
+                raise PoolTimeoutError(
+                    f"Timeout ({timeout}s) esperando conexión del pool {self.name} "
+                    f"({self._size}/{self.max_size} en uso)"
+                )
+            fut = loop.create_future()
+            self._waiters.append(fut)
+            try:
+                await asyncio.wait_for(fut, remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                if fut in self._waiters:
+                    self._waiters.remove(fut)
+
+        waited = time.monotonic() - started
+        self._in_use[id(conn)] = created_at
+        self._checkouts += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    async def putconn(self, conn: AsyncConnection, discard: bool = False):
+        """Devolver una conexión al pool (o descartarla si está rota u ocupada)."""
+        created_at = self._in_use.pop(id(conn), None) or time.monotonic()
+
+        if conn.closed or conn.is_busy():
+            discard = True
+        if not discard and conn.in_transaction():
+            try:
+                await conn.execute("ROLLBACK")
+            except psycopg2.Error:
+                discard = True
+
+        if discard or self._closed:
+            self._discard(conn)
+        else:
+            self._idle.append((conn, created_at, time.monotonic()))
+            self._wake_one()
+
+    @asynccontextmanager
+    async def connection(self, timeout: Optional[float] = None):
+        """Context manager asíncrono que toma y devuelve una conexión del pool."""
+        conn = await self.getconn(timeout)
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            await self.putconn(conn, discard=True)
+            raise
+        except BaseException:
+            await self.putconn(conn)
+            raise
+        else:
+            await self.putconn(conn)
+
+    def discard_idle(self):
+        """Cerrar las conexiones inactivas (p. ej. tras caerse el servidor) sin cerrar el pool."""
+        while self._idle:
+            conn, _, _ = self._idle.pop()
+            self._discard(conn)
+
+    async def close(self, timeout: float = 0):
+        """
+        Cerrar todas las conexiones inactivas y rechazar nuevas solicitudes. Con `timeout`,
+        espera antes hasta ese tiempo a que se devuelvan las que están en uso (se cierran
+        al devolverlas).
+        """
+        self._closed = True
+        deadline = time.monotonic() + timeout
+        while self._in_use and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        while self._idle:
+            conn, _, _ = self._idle.pop()
+            conn.close()
+            self._size -= 1
+        while self._waiters:
+            self._wake_one()
+
+    def stats(self) -> dict:
+        """Estadísticas del pool para dimensionarlo bajo carga."""
+        return {
+            "size": self._size,
+            "in_use": len(self._in_use),
+            "idle": len(self._idle),
+            "waiting": sum(1 for fut in self._waiters if not fut.done()),
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "checkouts": self._checkouts,
+            "timeouts": self._timeouts,
+            "created": self._created,
+            "discarded": self._discarded,
+            "wait_time_avg_ms": round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+            "wait_time_max_ms": round(self._wait_max * 1000, 3),
+        }
+
+
+# Réplicas atrasadas y lecturas que deben ver las escrituras previas del cliente
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+READ_YOUR_WRITES_TIMEOUT = float(os.getenv("READ_YOUR_WRITES_TIMEOUT", "0.2"))
+CONSISTENCY_TOKEN_HEADER = "X-Consistency-Token"
+
+# Health checker de réplicas: intervalo entre comprobaciones, límite de cada sondeo y
+# backoff exponencial (1s, 2s, 4s... hasta el máximo) para reintentar las caídas
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv("REPLICA_HEALTH_CHECK_INTERVAL", "1"))
+REPLICA_PROBE_TIMEOUT = float(os.getenv("REPLICA_PROBE_TIMEOUT", "2"))
+REPLICA_BACKOFF_MAX = float(os.getenv("REPLICA_BACKOFF_MAX", "30"))
+
+# Estado de consistencia de la petición en curso (lo crea el middleware de consistencia):
+# "min_lsn" es el LSN que deben ver sus lecturas (token recibido) y "write_lsn" el
+# LSN de PRIMARY tras su última escritura (token que se devuelve al cliente)
+_consistencia = contextvars.ContextVar("consistencia", default=None)
+
+# Posición en el WAL de la réplica y su retraso; en un servidor que no es réplica
+# (p. ej. desarrollo con una sola base de datos) se usa su posición actual y retraso 0
+ESTADO_REPLICA_QUERY = """
+    SELECT
+        CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() ELSE pg_current_wal_lsn() END::text AS lsn,
+        CASE
+            WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END::float AS lag
+"""
+
+
+def lsn_a_int(lsn: str) -> int:
+    """Convertir un LSN de PostgreSQL ("16/B374D848") en un entero comparable."""
+    alto, bajo = lsn.strip().split("/")
+    return (int(alto, 16) << 32) | int(bajo, 16)
+
+
+def lsn_minimo_peticion() -> Optional[int]:
+    """LSN que deben ver las lecturas de la petición en curso (None si no envió token)."""
+    estado = _consistencia.get()
+    return estado["min_lsn"] if estado else None
+
+
+def parsear_replicas(valor: str) -> list:
+    """
+    Convierte DB_REPLICAS en [(host, puerto, peso)].
+    Ej.: "db-replica,db-replica-2:5432*2" -> [("db-replica", 5432, 1), ("db-replica-2", 5432, 2)].
+    """
+    replicas = []
+    for entrada in valor.split(","):
+        entrada = entrada.strip()
+        if not entrada:
+            continue
+        direccion, _, peso = entrada.partition("*")
+        host, _, puerto = direccion.partition(":")
+        replicas.append((host, int(puerto or DB_REPLICA_PORT), float(peso or 1)))
+    return replicas or [(DB_REPLICA_HOST, DB_REPLICA_PORT, 1.0)]
+
+
+# =========================================================
+# ENRUTAMIENTO DECLARATIVO DE CONSULTAS
+# =========================================================
+
+class Consulta(str):
+    """
+    SQL con su destino decidido al definirla: `lectura(...)` va a las réplicas y
+    `escritura(...)` a PRIMARY. Es un `str`, así que se pasa tal cual a `execute`.
+
+    `nombre` identifica la sentencia de forma estable (mismo SQL, mismo nombre).
+    """
+
+    __slots__ = ("read_only", "nombre")
+
+    def __new__(cls, sql: str, read_only: bool):
+        consulta = super().__new__(cls, sql)
+        consulta.read_only = read_only
+        consulta.nombre = "q_" + hashlib.md5(sql.encode("utf-8")).hexdigest()[:16]
+        return consulta
+
+
+def lectura(sql: str) -> Consulta:
+    """Declarar una consulta de solo lectura (se enruta a una réplica)."""
+    return Consulta(sql, True)
+
+
+def escritura(sql: str) -> Consulta:
+    """Declarar una consulta que escribe o bloquea filas (se enruta a PRIMARY)."""
+    return Consulta(sql, False)
+
+
+# Fallback para SQL sin declarar: literales y comentarios fuera, y cualquier palabra de
+# escritura (también en un CTE `WITH ... INSERT`) o `FOR UPDATE/SHARE` la manda a PRIMARY
+_SQL_LITERALES_RE = re.compile(r"'(?:[^']|'')*'|--[^\n]*|/\*.*?\*/", re.S)
+_SQL_ESCRITURA_RE = re.compile(
+    r"\b(?:INSERT|UPDATE|DELETE|MERGE|CREATE|DROP|ALTER|TRUNCATE|GRANT|REVOKE|COPY|LOCK|CALL)\b"
+    r"|\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE)\b|\bFOR\s+KEY\s+SHARE\b",
+    re.I,
+)
+
+
+@lru_cache(maxsize=SQL_ROUTE_CACHE_SIZE)
+def clasificar_sql(query: str) -> bool:
+    """Determinar si un SQL sin declarar es de solo lectura (resultado memorizado por texto)."""
+    return _SQL_ESCRITURA_RE.search(_SQL_LITERALES_RE.sub(" ", query)) is None
+
+
+class Replica:
+    """
+    Una réplica de lectura con su pool de conexiones, su peso y su estado.
+
+    Funciona como un circuit breaker: un fallo de conexión abre el circuito y la
+    réplica deja de recibir lecturas. El health checker la vuelve a sondear con
+    backoff exponencial y la readmite en cuanto responde.
+    """
+
+    def __init__(self, host: str, port: int, weight: float, connect_kwargs: dict):
+        self.name = f"{host}:{port}"
+        self.weight = weight if weight > 0 else 1.0
+        self.connect_kwargs = connect_kwargs
+        self.async_pool = AsyncConnectionPool(f"replica {self.name}", connect_kwargs)
+        self.available = True
+        self.lagging = False
+        self.lag = 0.0
+        self.lsn = 0              # mayor LSN aplicado que se ha observado
+        self.outstanding = 0      # lecturas en curso
+        self.failures = 0         # fallos consecutivos (determinan el backoff)
+        self.next_probe = 0.0     # momento (monotonic) del próximo sondeo con el circuito abierto
+        self.reads = 0
+        self.ejections = 0
+
+    @property
+    def healthy(self) -> bool:
+        return self.available and not self.lagging
+
+    def mark_failed(self, error):
+        """Abrir el circuito (o mantenerlo abierto) y programar el próximo sondeo."""
+        self.failures += 1
+        espera = min(2 ** (self.failures - 1), REPLICA_BACKOFF_MAX)
+        self.next_probe = time.monotonic() + espera
+        if self.available:
+            self.available = False
+            self.ejections += 1
+            logger.warning(f"Réplica {self.name} fuera de servicio, próximo intento en {espera:.0f}s: {str(error)}")
+            # Las conexiones inactivas apuntan a un servidor caído o reiniciado
+            self.async_pool.discard_idle()
+
+    def mark_recovered(self):
+        """Cerrar el circuito: la réplica vuelve a recibir lecturas."""
+        if not self.available:
+            logger.info(f"Réplica {self.name} recuperada tras {self.failures} intento(s), vuelve a recibir lecturas")
+        self.available = True
+        self.failures = 0
+
+    def set_lag(self, lag: float):
+        atrasada = lag > REPLICA_MAX_LAG_SECONDS
+        if atrasada and not self.lagging:
+            logger.warning(f"Réplica {self.name} atrasada {lag:.1f}s (máximo {REPLICA_MAX_LAG_SECONDS}s), deja de recibir lecturas")
+        elif self.lagging and not atrasada:
+            logger.info(f"Réplica {self.name} al día ({lag:.1f}s de retraso), vuelve a recibir lecturas")
+        self.lag = lag
+        self.lagging = atrasada
+
+    def status(self) -> dict:
+        return {
+            "name": self.name,
+            "weight": self.weight,
+            "available": self.available,
+            "lagging": self.lagging,
+            "lag_seconds": round(self.lag, 3),
+            "outstanding": self.outstanding,
+            "reads": self.reads,
+            "ejections": self.ejections,
+            "consecutive_failures": self.failures,
+            "next_probe_in": round(max(0.0, self.next_probe - time.monotonic()), 1) if not self.available else None,
+        }
+
 
 class DatabaseRouter:
     """
     Router de base de datos que enruta automáticamente:
-    - Lecturas (SELECT) -> Replica
+    - Lecturas (SELECT) -> una de las Replicas en servicio, elegida según
+      DB_REPLICA_BALANCING
     - Escrituras (INSERT/UPDATE/DELETE) -> Primary
-    - Fallback a Primary si Replica no está disponible
+    - Fallback a Primary si ninguna Replica está disponible o todas van
+      atrasadas más de REPLICA_MAX_LAG_SECONDS
+    - Lecturas con token de consistencia: esperan a que la réplica haya
+      aplicado ese LSN (hasta READ_YOUR_WRITES_TIMEOUT) o van a Primary
+
+    Cada servidor tiene su propio `AsyncConnectionPool`, de modo que las peticiones
+    concurrentes nunca comparten una conexión. Un health checker en segundo plano
+    mide el retraso de las réplicas y readmite las que se recuperan.
     """
     
     def __init__(self):
-        self._primary_conn = None
-        self._replica_conn = None
-        self._replica_available = True
+        primary_kwargs = {
+            "host": DB_PRIMARY_HOST,
+            "port": DB_PRIMARY_PORT,
+            "database": DB_PRIMARY_NAME,
+            "user": DB_PRIMARY_USER,
+            "password": DB_PRIMARY_PASSWORD,
+            "connect_timeout": DB_CONNECT_TIMEOUT,
+        }
+        # Pools de PRIMARY y de cada réplica
+        self._async_primary_pool = AsyncConnectionPool("primary", primary_kwargs)
+        self.replicas = [
+            Replica(host, port, weight, {
+                "host": host,
+                "port": port,
+                "database": DB_REPLICA_NAME,
+                "user": DB_REPLICA_USER,
+                "password": DB_REPLICA_PASSWORD,
+                "connect_timeout": DB_CONNECT_TIMEOUT,
+            })
+            for host, port, weight in parsear_replicas(DB_REPLICAS)
+        ]
+        self._health_task = None
+        self._rw_waits = 0
+        self._rw_fallbacks = 0
+        # LISTEN/NOTIFY solo funciona en PRIMARY (una réplica en hot standby no admite LISTEN)
+        self.primary_connect_kwargs = primary_kwargs
+    
+    def _elegir_replica(self, min_lsn: Optional[int] = None, excluir=()) -> Optional[Replica]:
+        """Elegir la réplica para una lectura (None si no hay ninguna en servicio)."""
+        candidatas = [r for r in self.replicas if r.healthy and r not in excluir]
+        if not candidatas:
+            return None
+        if min_lsn:
+            # Preferir las que ya se sabe que han aplicado la escritura del cliente
+            al_dia = [r for r in candidatas if r.lsn >= min_lsn]
+            candidatas = al_dia or candidatas
+        if len(candidatas) == 1:
+            return candidatas[0]
+        if DB_REPLICA_BALANCING == "weighted":
+            return random.choices(candidatas, weights=[r.weight for r in candidatas])[0]
+        # Menos lecturas en curso en proporción al peso; los empates se reparten al azar
+        return min(candidatas, key=lambda r: ((r.outstanding + 1) / r.weight, random.random()))
     
-    def _get_primary_connection(self):
-        """Obtener conexión a la base de datos PRIMARY (escritura)."""
+    async def _get_primary_connection_async(self):
+        """Obtener una conexión del pool asíncrono PRIMARY (escritura)."""
         try:
-            if self._primary_conn is None or self._primary_conn.closed:
-                self._primary_conn = psycopg2.connect(
-                    host=DB_PRIMARY_HOST,
-                    port=DB_PRIMARY_PORT,
-                    database=DB_PRIMARY_NAME,
-                    user=DB_PRIMARY_USER,
-                    password=DB_PRIMARY_PASSWORD
-                )
-            return self._primary_conn
+            return self._async_primary_pool, await self._async_primary_pool.getconn()
+        except PoolTimeoutError:
+            raise
         except Exception as e:
             raise ConnectionError(f"Error conectando a PRIMARY: {str(e)}")
     
-    def _get_replica_connection(self):
-        """Obtener conexión a la base de datos REPLICA (lectura)."""
-        if not self._replica_available:
-            # Si la réplica no está disponible, usar primary como fallback
-            return self._get_primary_connection()
-        
-        try:
-            if self._replica_conn is None or self._replica_conn.closed:
-                self._replica_conn = psycopg2.connect(
-                    host=DB_REPLICA_HOST,
-                    port=DB_REPLICA_PORT,
-                    database=DB_REPLICA_NAME,
-                    user=DB_REPLICA_USER,
-                    password=DB_REPLICA_PASSWORD
-                )
-            return self._replica_conn
-        except Exception as e:
-            # Si falla la réplica, marcar como no disponible y usar primary
-            print(f"Warning: Réplica no disponible, usando PRIMARY como fallback: {str(e)}")
-            self._replica_available = False
-            return self._get_primary_connection()
+    async def _get_replica_connection_async(self, min_lsn: Optional[int] = None):
+        """
+        Obtener una conexión de una réplica (lectura). Retorna (pool, conexión, réplica);
+        la réplica es None si se usa PRIMARY como fallback.
+        """
+        intentadas = set()
+        while True:
+            replica = self._elegir_replica(min_lsn, excluir=intentadas)
+            if replica is None:
+                return (*await self._get_primary_connection_async(), None)
+            try:
+                return replica.async_pool, await replica.async_pool.getconn(), replica
+            except PoolTimeoutError:
+                raise
+            except Exception as e:
+                replica.mark_failed(e)
+                intentadas.add(replica)
     
     def _is_read_query(self, query: str) -> bool:
         """
-        Determinar si una query es de lectura (SELECT) o escritura (INSERT/UPDATE/DELETE).
+        Determinar si una query es de lectura. Las `Consulta` ya traen su destino; el
+        SQL sin declarar se clasifica con `clasificar_sql` (memorizado por texto).
         """
-        # Normalizar query: remover espacios y convertir a mayúsculas
-        normalized = re.sub(r'\s+', ' ', query.strip().upper())
-        
-        # Verificar si comienza con SELECT
-        if normalized.startswith('SELECT'):
-            return True
-        
-        # Verificar si contiene operaciones de escritura
-        write_keywords = ['INSERT', 'UPDATE', 'DELETE', 'CREATE', 'DROP', 'ALTER', 'TRUNCATE']
-        for keyword in write_keywords:
-            if normalized.startswith(keyword) or f' {keyword} ' in normalized:
-                return False
-        
-        # Por defecto, asumir lectura si no se puede determinar
-        return True
+        if isinstance(query, Consulta):
+            return query.read_only
+        return clasificar_sql(query)
     
-    @contextmanager
-    def get_connection(self, query: Optional[str] = None, force_primary: bool = False):
+    @asynccontextmanager
+    async def get_async_connection(self, query: Optional[str] = None, force_primary: bool = False):
         """
-        Obtener conexión apropiada según el tipo de query.
-        
-        Args:
-            query: La query SQL a ejecutar (opcional, para auto-detección)
-            force_primary: Forzar uso de PRIMARY incluso para lecturas
+        Obtener una conexión apropiada según el tipo de query: las escrituras (y con
+        `force_primary`, todas) van a PRIMARY y las lecturas a una réplica, con PRIMARY
+        como fallback. `query` es una `Consulta` (`lectura`/`escritura`) que trae su
+        destino o SQL sin declarar, que se clasifica con `clasificar_sql`.
         
-        Returns:
-            Conexión a la base de datos apropiada
+        Entrega una `AsyncConnection` y la devuelve al pool al salir del bloque; las
+        transacciones se abren con `async with conn.transaction():`.
         """
-        if force_primary:
-            conn = self._get_primary_connection()
-        elif query and not self._is_read_query(query):
-            # Escritura -> PRIMARY
-            conn = self._get_primary_connection()
+        replica = None
+        escritura = force_primary or (query and not self._is_read_query(query))
+        if escritura:
+            pool, conn = await self._get_primary_connection_async()
         else:
-            # Lectura -> REPLICA (con fallback a PRIMARY)
-            conn = self._get_replica_connection()
+            min_lsn = lsn_minimo_peticion()
+            pool, conn, replica = await self._get_replica_connection_async(min_lsn)
+            if min_lsn and replica is not None:
+                try:
+                    alcanzado = await self._esperar_lsn(replica, conn, min_lsn)
+                except BaseException as e:
+                    roto = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+                    await pool.putconn(conn, discard=roto)
+                    if roto:
+                        replica.mark_failed(e)
+                    raise
+                if not alcanzado:
+                    # La réplica no ha aplicado aún la escritura del cliente: leer de PRIMARY
+                    await pool.putconn(conn)
+                    self._rw_fallbacks += 1
+                    replica = None
+                    pool, conn = await self._get_primary_connection_async()
         
+        # Destino para las métricas: las lecturas sin réplica disponible son "fallback"
+        conn.destino = "primary" if escritura else ("replica" if replica is not None else "fallback")
+        registrar_conexion(conn.destino)
+        if replica is not None:
+            replica.outstanding += 1
+            replica.reads += 1
         try:
             yield conn
-        except Exception as e:
-            # Si hay error con la réplica, intentar con primary
-            if conn == self._replica_conn and self._replica_available:
-                print(f"Error con réplica, intentando con PRIMARY: {str(e)}")
-                self._replica_available = False
-                conn = self._get_primary_connection()
-                yield conn
-            else:
-                raise
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            await pool.putconn(conn, discard=True)
+            if replica is not None:
+                replica.mark_failed(e)
+            raise
+        except BaseException:
+            await pool.putconn(conn)
+            raise
+        else:
+            await pool.putconn(conn)
+        finally:
+            if replica is not None:
+                replica.outstanding -= 1
     
-    def check_replica_health(self) -> bool:
-        """Verificar si la réplica está disponible."""
-        try:
-            conn = self._get_replica_connection()
-            cur = conn.cursor()
-            cur.execute("SELECT 1")
-            cur.close()
-            if conn != self._primary_conn:
-                conn.close()
-            self._replica_available = True
+    async def _leer_estado_replica(self, replica: Replica, conn):
+        """Retorna (lsn aplicado, retraso en segundos) de `replica` usando `conn`."""
+        with conn.cursor() as cur:
+            await cur.execute(ESTADO_REPLICA_QUERY)
+            lsn, lag = cur.fetchone()
+        lsn = lsn_a_int(lsn) if lsn else 0
+        replica.lsn = max(replica.lsn, lsn)
+        return lsn, lag
+    
+    async def _esperar_lsn(self, replica: Replica, conn, min_lsn: int) -> bool:
+        """Esperar (hasta READ_YOUR_WRITES_TIMEOUT) a que `replica` haya aplicado `min_lsn`."""
+        if replica.lsn >= min_lsn:
             return True
-        except:
-            self._replica_available = False
+        self._rw_waits += 1
+        limite = time.monotonic() + READ_YOUR_WRITES_TIMEOUT
+        while True:
+            lsn, _ = await self._leer_estado_replica(replica, conn)
+            if lsn >= min_lsn:
+                return True
+            if time.monotonic() >= limite:
+                return False
+            await asyncio.sleep(0.01)
+    
+    async def registrar_escritura(self, conn):
+        """
+        Anotar en la petición en curso el LSN de PRIMARY tras una escritura confirmada;
+        el middleware de consistencia lo devuelve al cliente como token.
+        """
+        with conn.cursor() as cur:
+            await cur.execute("SELECT pg_current_wal_lsn()::text")
+            lsn = cur.fetchone()[0]
+        estado = _consistencia.get()
+        if estado is not None and (estado["write_lsn"] is None or lsn_a_int(lsn) > lsn_a_int(estado["write_lsn"])):
+            estado["write_lsn"] = lsn
+        return lsn
+
+    async def esperar_replicacion(self, lsn: str, timeout: float) -> bool:
+        """
+        Esperar (hasta `timeout` segundos en total) a que todas las réplicas en servicio
+        hayan aplicado `lsn`. Sirve para frenar escrituras masivas al ritmo de la
+        replicación. Una réplica que falla al consultarla se omite: el health checker se
+        encarga de ella. Retorna False si se agotó el tiempo.
+        """
+        min_lsn = lsn_a_int(lsn)
+        limite = time.monotonic() + timeout
+        for replica in self.replicas:
+            if not replica.available or replica.lsn >= min_lsn:
+                continue
+            try:
+                async with replica.async_pool.connection() as conn:
+                    while True:
+                        await self._leer_estado_replica(replica, conn)
+                        if replica.lsn >= min_lsn:
+                            break
+                        if time.monotonic() >= limite:
+                            return False
+                        await asyncio.sleep(0.05)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError, PoolTimeoutError):
+                continue
+        return True
+
+    async def _comprobar_replica(self, replica: Replica) -> bool:
+        """
+        Sondear una réplica: si está en servicio, medir su retraso; si su circuito está
+        abierto y ya pasó su backoff, intentar readmitirla. Retorna si está disponible.
+        """
+        if not replica.available and time.monotonic() < replica.next_probe:
             return False
+        try:
+            async def sondear():
+                async with replica.async_pool.connection() as conn:
+                    return await self._leer_estado_replica(replica, conn)
+            _, lag = await asyncio.wait_for(sondear(), REPLICA_PROBE_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            replica.mark_failed(e if str(e) else "timeout del sondeo")
+            return False
+        replica.mark_recovered()
+        replica.set_lag(lag)
+        return True
+    
+    async def _vigilar_replicas(self):
+        """Health checker en segundo plano de todas las réplicas."""
+        while True:
+            await asyncio.gather(*(self._comprobar_replica(r) for r in self.replicas))
+            await asyncio.sleep(REPLICA_HEALTH_CHECK_INTERVAL)
+    
+    async def check_replica_health_async(self) -> bool:
+        """Verificar si hay alguna réplica disponible."""
+        resultados = await asyncio.gather(*(self._comprobar_replica(r) for r in self.replicas))
+        return any(resultados)
+
+    def replica_status(self) -> dict:
+        """Estado de cada réplica y uso de los tokens de consistencia."""
+        return {
+            "balancing": DB_REPLICA_BALANCING,
+            "available": sum(1 for r in self.replicas if r.healthy),
+            "max_lag_seconds": REPLICA_MAX_LAG_SECONDS,
+            "replicas": [r.status() for r in self.replicas],
+            "read_your_writes_waits": self._rw_waits,
+            "read_your_writes_fallbacks": self._rw_fallbacks,
+        }
+
+    def pool_stats(self) -> dict:
+        """Estadísticas de los pools de PRIMARY y de cada réplica."""
+        return {
+            "primary": self._async_primary_pool.stats(),
+            "replicas": {r.name: r.async_pool.stats() for r in self.replicas},
+        }
+
+    async def open(self):
+        """Abrir las conexiones mínimas de los pools asíncronos y arrancar el health checker."""
+        await self._async_primary_pool.prefill()
+        for replica in self.replicas:
+            try:
+                await replica.async_pool.prefill()
+            except Exception as e:
+                logger.warning(f"Réplica {replica.name} no disponible al iniciar, se reintentará: {str(e)}")
+                replica.mark_failed(e)
+        if self._health_task is None:
+            self._health_task = asyncio.get_running_loop().create_task(self._vigilar_replicas())
+
+    async def calentar(self, consultas: List["Consulta"]) -> int:
+        """
+        Preparar `consultas` en todas las conexiones abiertas de los pools asíncronos, para
+        que las primeras peticiones no paguen el PREPARE. Las de lectura también en PRIMARY,
+        que las atiende cuando no hay réplicas. Retorna cuántas sentencias se prepararon.
+        """
+        if not DB_PREPARED_STATEMENTS:
+            return 0
+        preparadas = 0
+        pools = [self._async_primary_pool] + [r.async_pool for r in self.replicas if r.available]
+        for pool in pools:
+            conexiones = [await pool.getconn() for _ in range(pool.stats()["idle"])]
+            try:
+                for conn in conexiones:
+                    with conn.cursor() as cur:
+                        for consulta in consultas:
+                            if consulta.read_only or pool is self._async_primary_pool:
+                                preparadas += await conn.sentencias.preparar(cur, consulta)
+            finally:
+                for conn in conexiones:
+                    await pool.putconn(conn)
+        return preparadas
+
+    async def close(self, timeout: float = 0):
+        """Cerrar los pools de conexiones (esperando hasta `timeout` a las que están en uso)."""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        await self._async_primary_pool.close(timeout)
+        for replica in self.replicas:
+            await replica.async_pool.close(timeout)
 
 
 # Instancia global del router
 db_router = DatabaseRouter()
 
+# Arranque y parada de cada worker (scripts/api-entrypoint.sh lanza uno por CPU): con
+# API_WARMUP, /api/health no responde "ready" hasta tener las tablas de referencia en
+# cache y las consultas frecuentes preparadas en las conexiones abiertas del pool. Al
+# parar, se espera hasta API_SHUTDOWN_TIMEOUT a que se devuelvan las conexiones en uso.
+API_WARMUP = os.getenv("API_WARMUP", "true").lower() in ("1", "true", "yes", "on")
+API_WARMUP_RETRY = float(os.getenv("API_WARMUP_RETRY", "2"))
+API_SHUTDOWN_TIMEOUT = float(os.getenv("API_SHUTDOWN_TIMEOUT", "20"))
+
+
+@app.on_event("startup")
+async def abrir_pools():
+    """Precalentar los pools de conexiones al arrancar la API."""
+    try:
+        await db_router.open()
+    except Exception as e:
+        logger.warning(f"No se pudieron precalentar los pools de conexiones: {str(e)}")
+
+
+@app.middleware("http")
+async def consistencia_lecturas(request: Request, call_next):
+    """
+    Read-your-writes: si la petición trae X-Consistency-Token (LSN de PRIMARY tras una
+    escritura anterior del cliente), sus lecturas en la réplica esperan a ese LSN.
+    Las peticiones que escriben devuelven el nuevo token en la misma cabecera.
+    """
+    estado = {"min_lsn": None, "write_lsn": None}
+    token = request.headers.get(CONSISTENCY_TOKEN_HEADER)
+    if token:
+        try:
+            estado["min_lsn"] = lsn_a_int(token)
+        except ValueError:
+            logger.warning(f"{CONSISTENCY_TOKEN_HEADER} inválido, se ignora: {token}")
+    _consistencia.set(estado)
+    response = await call_next(request)
+    if estado["write_lsn"]:
+        response.headers[CONSISTENCY_TOKEN_HEADER] = estado["write_lsn"]
+    return response
+
+
+# =========================================================
+# INSTRUMENTACIÓN: MÉTRICAS, CONSULTAS LENTAS Y PROFILING
+# =========================================================
+
+# Métricas Prometheus en /metrics; prometheus_client es opcional (sin él no se exportan)
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+# Consultas más lentas que SLOW_QUERY_MS se registran en el log (0 = desactivado)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+# Profiling con cProfile de las peticiones con la cabecera X-Profile (si
+# PROFILE_HEADER_ENABLED) y de una fracción PROFILE_SAMPLE_RATE de todas. El informe
+# (PROFILE_TOP funciones por tiempo acumulado) va al log y, con PROFILE_DIR, a un .prof
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "false").lower() in ("1", "true", "yes", "on")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "25"))
+
+DB_ROUND_TRIPS_HEADER = "X-DB-Round-Trips"
+PROFILE_HEADER = "X-Profile"
+
+_metricas = METRICS_ENABLED and prometheus_client is not None
+if _metricas:
+    HTTP_PETICIONES = prometheus_client.Counter(
+        "http_requests_total", "Peticiones HTTP atendidas", ["method", "endpoint", "status"])
+    HTTP_DURACION = prometheus_client.Histogram(
+        "http_request_duration_seconds", "Latencia de las peticiones HTTP", ["method", "endpoint"],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+    HTTP_VIAJES_BD = prometheus_client.Histogram(
+        "http_request_db_round_trips", "Sentencias enviadas a la base de datos por petición", ["endpoint"],
+        buckets=(0, 1, 2, 3, 4, 6, 8, 12, 16, 32, 64))
+    HTTP_TIEMPO_BD = prometheus_client.Histogram(
+        "http_request_db_seconds", "Tiempo de cada petición esperando a la base de datos", ["endpoint"],
+        buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+    BD_CONSULTA_DURACION = prometheus_client.Histogram(
+        "db_query_duration_seconds", "Duración de cada sentencia por destino", ["target"],
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+    BD_CONSULTAS_LENTAS = prometheus_client.Counter(
+        "db_slow_queries_total", "Sentencias por encima de SLOW_QUERY_MS", ["target"])
+    BD_CONEXIONES = prometheus_client.Counter(
+        "db_connections_total", "Conexiones entregadas por el router por destino", ["target"])
+
+
+class MedicionPeticion:
+    """Viajes a la base de datos y tiempo en consultas de una petición."""
+
+    __slots__ = ("ruta", "viajes", "tiempo_bd")
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.viajes = 0
+        self.tiempo_bd = 0.0
+
+    def registrar_consulta(self, destino: str, segundos: float, sql):
+        self.tiempo_bd += segundos
+        if _metricas:
+            BD_CONSULTA_DURACION.labels(destino).observe(segundos)
+        if SLOW_QUERY_MS and segundos * 1000 >= SLOW_QUERY_MS:
+            if _metricas:
+                BD_CONSULTAS_LENTAS.labels(destino).inc()
+            if isinstance(sql, bytes):
+                sql = sql.decode("utf-8", "replace")
+            logger.warning(f"Consulta lenta ({segundos * 1000:.1f} ms en {destino}, {self.ruta}): "
+                           f"{' '.join(str(sql).split())[:500]}")
+
+
+# Medición de la petición en curso (la crea el middleware instrumentar_peticion)
+_medicion = contextvars.ContextVar("medicion", default=None)
+
+
+def registrar_conexion(destino: str):
+    if _metricas:
+        BD_CONEXIONES.labels(destino).inc()
+
+
+@lru_cache(maxsize=None)
+def plantilla_ruta(endpoint) -> str:
+    """Ruta declarada ("/api/contenidos/{id_contenido}") del endpoint que atendió la petición."""
+    for route in app.routes:
+        if getattr(route, "endpoint", None) is endpoint:
+            return route.path
+    return "unmatched"
+
+
+# cProfile no admite dos perfiles activos a la vez: se perfila una petición cada vez
+_perfil_activo = False
+
+
+def iniciar_perfil(request: Request) -> Optional[cProfile.Profile]:
+    global _perfil_activo
+    pedido = PROFILE_HEADER_ENABLED and request.headers.get(PROFILE_HEADER)
+    muestreado = PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+    if _perfil_activo or not (pedido or muestreado):
+        return None
+    _perfil_activo = True
+    perfil = cProfile.Profile()
+    perfil.enable()
+    return perfil
+
+
+def terminar_perfil(perfil: cProfile.Profile, metodo: str, endpoint: str, duracion: float) -> str:
+    """
+    Detener el perfil y registrarlo; retorna su identificador. Mientras estuvo activo
+    también se ejecutaron en el event loop otras peticiones concurrentes, que aparecen en él.
+    """
+    global _perfil_activo
+    perfil.disable()
+    _perfil_activo = False
+    id_perfil = f"{datetime.now():%Y%m%d-%H%M%S}-{random.getrandbits(32):08x}"
+    salida = io.StringIO()
+    pstats.Stats(perfil, stream=salida).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    logger.info(f"Perfil {id_perfil} de {metodo} {endpoint} ({duracion * 1000:.1f} ms):\n{salida.getvalue()}")
+    if PROFILE_DIR:
+        perfil.dump_stats(os.path.join(PROFILE_DIR, f"{id_perfil}.prof"))
+    return id_perfil
+
+
+@app.middleware("http")
+async def instrumentar_peticion(request: Request, call_next):
+    """
+    Medir cada petición por endpoint: latencia, sentencias enviadas a la base de datos
+    (BEGIN/COMMIT, PREPARE y validaciones del pool incluidos; 0 si se sirvió desde cache)
+    y tiempo esperando a la base de datos. Los viajes se devuelven en X-DB-Round-Trips.
+    En las respuestas en streaming solo cuenta lo ocurrido antes del primer byte.
+    """
+    medicion = MedicionPeticion(request.url.path)
+    _medicion.set(medicion)
+    perfil = iniciar_perfil(request)
+    status = 500
+    inicio = time.perf_counter()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        duracion = time.perf_counter() - inicio
+        endpoint = plantilla_ruta(request.scope.get("endpoint"))
+        id_perfil = terminar_perfil(perfil, request.method, endpoint, duracion) if perfil else None
+        if _metricas:
+            HTTP_PETICIONES.labels(request.method, endpoint, str(status)).inc()
+            HTTP_DURACION.labels(request.method, endpoint).observe(duracion)
+            HTTP_VIAJES_BD.labels(endpoint).observe(medicion.viajes)
+            HTTP_TIEMPO_BD.labels(endpoint).observe(medicion.tiempo_bd)
+    response.headers[DB_ROUND_TRIPS_HEADER] = str(medicion.viajes)
+    if id_perfil:
+        response.headers[PROFILE_HEADER] = id_perfil
+    return response
+
+
+# =========================================================
+# SERIALIZACIÓN JSON
+# =========================================================
+
+# orjson serializa datetime y las filas (dicts, listas, str) en C; sin él se usa json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_default(valor):
+    """Tipos de las filas que el serializador no admite por sí solo (como jsonable_encoder)."""
+    if isinstance(valor, Decimal):
+        return int(valor) if valor.as_tuple().exponent >= 0 else float(valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def json_bytes(datos) -> bytes:
+    """
+    JSON compacto en UTF-8, el mismo que producía JSONResponse tras jsonable_encoder,
+    pero serializando directamente dicts y tuplas de psycopg2 (Decimal -> número,
+    datetime -> ISO 8601) sin recorrer antes cada valor en Python.
+    """
+    if orjson is not None:
+        return orjson.dumps(datos, default=_json_default)
+    return json.dumps(datos, default=_json_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class RespuestaJSON(JSONResponse):
+    """JSONResponse que serializa con `json_bytes`; el contenido no necesita jsonable_encoder."""
+
+    def render(self, content) -> bytes:
+        return json_bytes(content)
+
+
+def filas_dict(cur) -> List[dict]:
+    """
+    Filas del último `execute` (tuplas de un cursor normal) como dicts con los nombres de
+    columna: más barato que RealDictCursor, que construye cada fila campo a campo.
+    """
+    columnas = [col.name for col in cur.description]
+    return [dict(zip(columnas, fila)) for fila in cur.fetchall()]
+
+
+# =========================================================
+# CACHE DE DATOS DE REFERENCIA
+# =========================================================
+
+# facultades, temas y las listas de cada tema casi nunca cambian: se sirven desde
+# memoria y se invalidan con LISTEN/NOTIFY (triggers definidos en init.sql).
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "300"))
+REFERENCE_CACHE_MAXSIZE = int(os.getenv("REFERENCE_CACHE_MAXSIZE", "256"))
+CACHE_INVALIDATION_CHANNEL = "cache_invalidation"
+
+# Segundos tras una notificación en los que se vuelve a invalidar: la notificación llega
+# desde PRIMARY y la réplica podría no haber aplicado aún el cambio al recargar.
+CACHE_INVALIDATION_GRACE = float(os.getenv("CACHE_INVALIDATION_GRACE", "2"))
+
+# Tabla modificada -> espacios de claves de la cache que dejan de ser válidos
+INVALIDACIONES_POR_TABLA = {
+    "facultades": ("facultades",),
+    "temas": ("temas",),
+    "tema_key_concepts": ("tema_listas",),
+    "tema_main_actors": ("tema_listas",),
+    "tema_case_studies": ("tema_listas",),
+    "tema_future_trends": ("tema_listas",),
+}
+
+
+class TTLCache:
+    """
+    Cache LRU con expiración por tiempo (TTL) y contadores de aciertos/fallos.
+
+    Las claves son tuplas cuyo primer elemento es el espacio de claves
+    (p. ej. ("tema_listas", id_tema)), lo que permite invalidar un espacio completo.
+    """
+
+    def __init__(self, maxsize: int = REFERENCE_CACHE_MAXSIZE, ttl: float = REFERENCE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # clave -> (expira_en, valor)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def snapshot(self, namespace: str) -> dict:
+        """Entradas vigentes de claves (namespace, id) como {id: valor}, sin tocar contadores."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key[1]: value
+                for key, (expira_en, value) in self._data.items()
+                if key[0] == namespace and expira_en > now
+            }
+
+    def record(self, hit: bool):
+        """Registrar un acierto/fallo resuelto fuera de `get` (p. ej. a partir de `snapshot`)."""
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def invalidate(self, *namespaces: str):
+        """Eliminar todas las entradas de los espacios de claves indicados."""
+        with self._lock:
+            for key in [key for key in self._data if key[0] in namespaces]:
+                del self._data[key]
+                self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / total, 4) if total else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+class NotificationListener:
+    """
+    Escucha un canal LISTEN/NOTIFY de PRIMARY desde el event loop.
+
+    Usa una conexión asíncrona dedicada (fuera de los pools) y se reconecta con
+    backoff exponencial si se pierde; `on_reconnect` se llama tras cada reconexión
+    porque las notificaciones emitidas mientras tanto se han perdido.
+    """
+
+    def __init__(self, connect_kwargs: dict, channel: str, on_notify, on_reconnect=None):
+        self._connect_kwargs = connect_kwargs
+        self.channel = channel
+        self._on_notify = on_notify
+        self._on_reconnect = on_reconnect
+        self._task = None
+        self._conn = None
+
+    async def _escuchar(self):
+        loop = asyncio.get_running_loop()
+        self._conn = await AsyncConnection.connect(**self._connect_kwargs)
+        await self._conn.execute(f"LISTEN {self.channel}")
+        raw = self._conn.raw
+        while True:
+            fut = loop.create_future()
+            loop.add_reader(raw.fileno(), lambda: fut.done() or fut.set_result(None))
+            try:
+                await fut
+            finally:
+                loop.remove_reader(raw.fileno())
+            raw.poll()
+            while raw.notifies:
+                notificacion = raw.notifies.pop(0)
+                try:
+                    self._on_notify(notificacion.payload)
+                except Exception as e:
+                    logger.warning(f"Error procesando notificación de {self.channel}: {str(e)}")
+
+    async def _run(self):
+        espera = 1.0
+        primera_conexion = True
+        while True:
+            try:
+                if not primera_conexion and self._on_reconnect:
+                    self._on_reconnect()
+                primera_conexion = False
+                await self._escuchar()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Listener {self.channel} desconectado, reintentando en {espera:.0f}s: {str(e)}")
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, 30.0)
+            else:
+                espera = 1.0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+reference_cache = TTLCache()
+
+# Listas de cada tema que se guardan en la cache ("tema_listas", id_tema)
+TEMA_LISTAS = ("key_concepts", "main_actors", "case_studies", "future_trends")
+
+
+def invalidar_cache_referencia(tabla: str):
+    """Invalidar las entradas afectadas por un cambio en `tabla` (payload de la notificación)."""
+    espacios = INVALIDACIONES_POR_TABLA.get(tabla)
+    if espacios is None:
+        reference_cache.clear()
+        return
+    reference_cache.invalidate(*espacios)
+    purgar_cache_edge(espacios)
+    logger.info(f"Cache de referencia invalidada por cambios en {tabla}: {', '.join(espacios)}")
+    # Segunda invalidación por si se recargó desde una réplica que aún no tenía el cambio
+    loop = asyncio.get_running_loop()
+    loop.call_later(CACHE_INVALIDATION_GRACE, reference_cache.invalidate, *espacios)
+    loop.call_later(CACHE_INVALIDATION_GRACE, purgar_cache_edge, espacios)
+
+
+cache_listener = NotificationListener(
+    db_router.primary_connect_kwargs,
+    CACHE_INVALIDATION_CHANNEL,
+    on_notify=invalidar_cache_referencia,
+    on_reconnect=reference_cache.clear,
+)
+
+
+@app.on_event("startup")
+async def iniciar_listener_cache():
+    """Empezar a escuchar las invalidaciones de la cache de referencia."""
+    cache_listener.start()
+
+
+async def detener_listener_cache():
+    await cache_listener.stop()
+
+
+def etag_debil(cuerpo: bytes) -> str:
+    """ETag débil (W/"...") de un cuerpo ya serializado."""
+    return 'W/"' + hashlib.blake2b(cuerpo, digest_size=12).hexdigest() + '"'
+
+
+def calcular_etag(data) -> str:
+    """
+    ETag débil a partir del contenido JSON de la respuesta: se calcula sobre `data` en
+    JSON canónico (claves ordenadas), no sobre los bytes enviados, que Nginx puede comprimir.
+    """
+    return etag_debil(json.dumps(data, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8"))
+
+
+def etag_coincide(request: Request, etag: str) -> bool:
+    """Comparación débil con If-None-Match (ignora el prefijo W/, como exige RFC 9110)."""
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in [valor.strip().removeprefix("W/") for valor in if_none_match.split(",")]
+
+
+def respuesta_condicional(request: Request, data, etag: str, tags: List[str]):
+    """
+    Responder 304 si el cliente ya tiene esta versión (If-None-Match), o el cuerpo
+    con su ETag. `Cache-Control: no-cache` obliga al navegador a revalidar siempre;
+    Nginx la guarda EDGE_CACHE_TTL segundos (ver cabeceras_edge).
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache", **cabeceras_edge(tags)}
+    if etag_coincide(request, etag):
+        return Response(status_code=304, headers=headers)
+    return RespuestaJSON({"success": True, "data": data}, headers=headers)
+
+
+FACULTADES_QUERY = lectura("SELECT id_facultad, nombre, color_hex FROM facultades ORDER BY nombre")
+TEMAS_QUERY = lectura("SELECT id_tema, nombre, descripcion FROM temas ORDER BY nombre")
+
+
+async def cargar_referencia(clave: str, query: str):
+    """Leer una tabla de referencia completa desde la cache o, si no está, desde la réplica."""
+    entrada = reference_cache.get((clave,))
+    if entrada is None:
+        async with db_router.get_async_connection(query) as conn:
+            with conn.cursor() as cur:
+                await cur.execute(query)
+                data = filas_dict(cur)
+        entrada = (data, calcular_etag(data))
+        reference_cache.set((clave,), entrada)
+    return entrada
+
+
+# =========================================================
+# CACHE DE RESPUESTAS (LISTADOS Y BÚSQUEDAS)
+# =========================================================
+
+# Respuestas completas de /api/contenidos y /api/search. Con el backend "redis" la cache
+# se comparte entre todos los workers; "memory" es por proceso y "none" la desactiva.
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MAXSIZE = int(os.getenv("RESPONSE_CACHE_MAXSIZE", "1024"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "0.5"))
+RESPONSE_CACHE_PREFIX = "rc:"
+
+
+class MemoryResponseBackend:
+    """
+    Backend en memoria del proceso: LRU con TTL y un índice etiqueta -> claves
+    para invalidar. Solo se usa desde el event loop, por eso no lleva lock.
+    """
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_MAXSIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # clave -> (expira_en, cuerpo, etiquetas)
+        self._tags = {}  # etiqueta -> set(claves)
+
+    def _borrar(self, key):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            claves = self._tags.get(tag)
+            if claves is not None:
+                claves.discard(key)
+                if not claves:
+                    del self._tags[tag]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._borrar(key)
+            return None
+        self._data.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value: bytes, ttl: int, tags: List[str]):
+        self._borrar(key)
+        self._data[key] = (time.monotonic() + ttl, value, tuple(tags))
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._data) > self.maxsize:
+            self._borrar(next(iter(self._data)))
+
+    async def invalidate(self, tags: List[str]) -> int:
+        claves = set()
+        for tag in tags:
+            claves |= self._tags.pop(tag, set())
+        for key in claves:
+            self._borrar(key)
+        return len(claves)
+
+    def size(self) -> int:
+        return len(self._data)
+
+    async def close(self):
+        self._data.clear()
+        self._tags.clear()
+
+
+class RedisResponseBackend:
+    """
+    Backend compartido sobre Redis (o cualquier servidor que hable su protocolo).
+    Cada etiqueta es un SET con las claves que la llevan; invalidar borra las claves y el SET.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = REDIS_URL, timeout: float = REDIS_TIMEOUT):
+        # Dependencia solo necesaria con este backend
+        import redis.asyncio as redis_asyncio
+        self._redis = redis_asyncio.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"{RESPONSE_CACHE_PREFIX}tag:{tag}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._redis.get(RESPONSE_CACHE_PREFIX + key)
+
+    async def set(self, key: str, value: bytes, ttl: int, tags: List[str]):
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.set(RESPONSE_CACHE_PREFIX + key, value, ex=ttl)
+            for tag in tags:
+                # El SET de la etiqueta vive al menos tanto como la última clave añadida
+                pipe.sadd(self._tag_key(tag), RESPONSE_CACHE_PREFIX + key)
+                pipe.expire(self._tag_key(tag), ttl)
+            await pipe.execute()
+
+    async def invalidate(self, tags: List[str]) -> int:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        async with self._redis.pipeline(transaction=True) as pipe:
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            pipe.delete(*tag_keys)
+            resultados = await pipe.execute()
+        claves = set().union(*resultados[:-1])
+        if claves:
+            await self._redis.delete(*claves)
+        return len(claves)
+
+    def size(self) -> Optional[int]:
+        return None
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def crear_backend_respuestas(nombre: str):
+    """Instanciar el backend configurado en RESPONSE_CACHE_BACKEND (None = sin cache)."""
+    if nombre == "none":
+        return None
+    if nombre == "memory":
+        return MemoryResponseBackend()
+    if nombre == "redis":
+        return RedisResponseBackend()
+    raise ValueError(f"RESPONSE_CACHE_BACKEND desconocido: {nombre} (memory, redis o none)")
+
+
+def serializar_respuesta(respuesta: dict) -> bytes:
+    """Mismo JSON compacto que genera JSONResponse."""
+    return json_bytes(respuesta)
+
+
+class ResponseCache:
+    """
+    Cache de respuestas serializadas con coalescencia de peticiones: si varias peticiones
+    llegan a la vez para una clave fría, solo una ejecuta la consulta y el resto espera
+    su resultado. Los fallos del backend nunca rompen la petición: cuentan como fallo de cache.
+    """
+
+    def __init__(self, backend, ttl: int = RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._en_vuelo = {}  # clave -> Future con el cuerpo que se está generando
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._invalidations = 0
+        self._errors = 0
+
+    @staticmethod
+    def clave(endpoint: str, params: dict) -> str:
+        """Clave estable para un endpoint y sus parámetros ya normalizados."""
+        cuerpo = json.dumps([endpoint, sorted(params.items())], default=str, ensure_ascii=False)
+        return f"{endpoint}:{hashlib.sha1(cuerpo.encode('utf-8')).hexdigest()}"
+
+    async def _leer(self, key: str) -> Optional[bytes]:
+        try:
+            return await self.backend.get(key)
+        except Exception as e:
+            self._errors += 1
+            logger.warning(f"Cache de respuestas ({self.backend.name}) no disponible al leer: {str(e)}")
+            return None
+
+    async def _escribir(self, key: str, cuerpo: bytes, tags: List[str]):
+        try:
+            await self.backend.set(key, cuerpo, self.ttl, tags)
+        except Exception as e:
+            self._errors += 1
+            logger.warning(f"Cache de respuestas ({self.backend.name}) no disponible al escribir: {str(e)}")
+
+    async def obtener(self, key: str, tags: List[str], producir, leer: bool = True):
+        """
+        Retorna (cuerpo JSON, estado) para `key`. `producir` es una corrutina que genera
+        la respuesta (dict) si no está en cache; solo se guardan las que tienen success=True.
+        Con `leer=False` no se consulta la cache (ni se comparte una consulta en curso),
+        pero el resultado sí se guarda.
+        El estado es "HIT", "MISS", "COALESCED" o "BYPASS" (cache desactivada o no leída).
+        """
+        if self.backend is None:
+            return serializar_respuesta(await producir()), "BYPASS"
+        
+        if not leer:
+            respuesta = await producir()
+            cuerpo = serializar_respuesta(respuesta)
+            if respuesta.get("success"):
+                await self._escribir(key, cuerpo, tags)
+            return cuerpo, "BYPASS"
+        
+        cuerpo = await self._leer(key)
+        if cuerpo is not None:
+            self._hits += 1
+            return cuerpo, "HIT"
+        
+        pendiente = self._en_vuelo.get(key)
+        if pendiente is not None:
+            # shield: si se cancela esta petición, la que genera la respuesta sigue
+            cuerpo = await asyncio.shield(pendiente)
+            if cuerpo is None:
+                # La petición que generaba la respuesta se canceló (cliente desconectado,
+                # timeout): volver a empezar, generándola esta petición o esperando a otra
+                return await self.obtener(key, tags, producir, leer)
+            self._coalesced += 1
+            return cuerpo, "COALESCED"
+        
+        self._misses += 1
+        pendiente = asyncio.get_running_loop().create_future()
+        self._en_vuelo[key] = pendiente
+        try:
+            respuesta = await producir()
+            cuerpo = serializar_respuesta(respuesta)
+            if respuesta.get("success"):
+                await self._escribir(key, cuerpo, tags)
+            pendiente.set_result(cuerpo)
+            return cuerpo, "MISS"
+        except asyncio.CancelledError:
+            # None (en lugar de cancelar el Future compartido): las peticiones que esperaban
+            # siguen vivas y generan la respuesta ellas mismas
+            pendiente.set_result(None)
+            raise
+        except Exception as e:
+            pendiente.set_exception(e)
+            pendiente.exception()  # evitar el aviso si nadie más esperaba
+            raise
+        finally:
+            del self._en_vuelo[key]
+
+    async def invalidar(self, tags: List[str]):
+        if self.backend is None:
+            return
+        try:
+            self._invalidations += await self.backend.invalidate(tags)
+        except Exception as e:
+            self._errors += 1
+            logger.warning(f"Cache de respuestas ({self.backend.name}) no disponible al invalidar: {str(e)}")
+
+    def stats(self) -> dict:
+        total = self._hits + self._misses + self._coalesced
+        return {
+            "backend": self.backend.name if self.backend is not None else "none",
+            "size": self.backend.size() if self.backend is not None else 0,
+            "ttl_seconds": self.ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "coalesced": self._coalesced,
+            "hit_ratio": round((self._hits + self._coalesced) / total, 4) if total else 0.0,
+            "invalidations": self._invalidations,
+            "errors": self._errors,
+        }
+
+
+response_cache = ResponseCache(crear_backend_respuestas(RESPONSE_CACHE_BACKEND))
+
+
+def etiquetas_contenidos(id_facultad: Optional[str]) -> List[str]:
+    """Etiqueta de los listados filtrados por una facultad o, con None, de los no filtrados."""
+    return [f"contenidos:{id_facultad or '*'}"]
+
+
+# Segundas invalidaciones en espera: el event loop solo guarda referencias débiles a
+# sus tareas, así que se mantienen aquí hasta que terminan
+_reinvalidaciones = set()
+
+
+async def reinvalidar_respuestas(tags: List[str]):
+    await asyncio.sleep(CACHE_INVALIDATION_GRACE)
+    await response_cache.invalidar(tags)
+    purgar_cache_edge(tags)
+
+
+async def invalidar_respuestas_contenidos(*id_facultades: str):
+    """
+    Invalidar los listados y búsquedas que pueden cambiar al crear o borrar contenidos
+    de esas facultades. Como en la cache de referencia, se repite pasado
+    CACHE_INVALIDATION_GRACE por si entretanto se recargó desde una réplica atrasada.
+    """
+    tags = ["search"] + etiquetas_contenidos(None)
+    for id_facultad in set(id_facultades):
+        tags += etiquetas_contenidos(id_facultad)
+    await response_cache.invalidar(tags)
+    purgar_cache_edge(tags)
+    tarea = asyncio.get_running_loop().create_task(reinvalidar_respuestas(tags))
+    _reinvalidaciones.add(tarea)
+    tarea.add_done_callback(_reinvalidaciones.discard)
+
+
+# ============================================================================
+# CACHE HTTP DELANTE DE LA API (NGINX / CDN)
+# ============================================================================
+# Nginx guarda las respuestas de los listados EDGE_CACHE_TTL segundos (micro-cache, ver
+# nginx.conf): el TTL lo fija la API con X-Accel-Expires, que Nginx no reenvía al cliente.
+# Cada respuesta lleva sus etiquetas en Surrogate-Key (las mismas de la cache de respuestas)
+# para que una CDN o un Varnish con xkey pueda purgarlas: con EDGE_PURGE_URL, cada
+# invalidación envía allí un PURGE con las etiquetas. Nginx open source no purga por clave:
+# su TTL corto acota lo que puede servir desactualizado y las lecturas con token de
+# consistencia (quien acaba de escribir) no pasan por su cache.
+EDGE_CACHE_TTL = int(os.getenv("EDGE_CACHE_TTL", "5"))
+EDGE_PURGE_URL = os.getenv("EDGE_PURGE_URL", "")
+EDGE_PURGE_HEADER = os.getenv("EDGE_PURGE_HEADER", "Surrogate-Key")
+EDGE_PURGE_TIMEOUT = float(os.getenv("EDGE_PURGE_TIMEOUT", "2"))
+# Tamaño mínimo para enviar comprimidas (gzip) las respuestas cacheadas (0 = nunca)
+RESPONSE_GZIP_MIN_SIZE = int(os.getenv("RESPONSE_GZIP_MIN_SIZE", "1024"))
+RESPONSE_GZIP_CACHE_SIZE = 256
+
+
+def cabeceras_edge(tags: List[str]) -> dict:
+    """TTL para Nginx y etiquetas de purga de una respuesta cacheable."""
+    if EDGE_CACHE_TTL <= 0:
+        return {}
+    return {"X-Accel-Expires": str(EDGE_CACHE_TTL), "Surrogate-Key": " ".join(tags)}
+
+
+def purgar_cache_edge(tags):
+    """Enviar a EDGE_PURGE_URL un PURGE con las etiquetas, en un hilo y sin esperar la respuesta."""
+    if not EDGE_PURGE_URL:
+        return
+    
+    def enviar():
+        try:
+            peticion = urllib.request.Request(EDGE_PURGE_URL, method="PURGE",
+                                              headers={EDGE_PURGE_HEADER: " ".join(tags)})
+            urllib.request.urlopen(peticion, timeout=EDGE_PURGE_TIMEOUT).close()
+        except Exception as e:
+            logger.warning("No se pudo purgar la cache HTTP (%s): %s", EDGE_PURGE_URL, e)
+    
+    asyncio.get_running_loop().run_in_executor(None, enviar)
+
+
+# Cuerpos ya comprimidos por ETag: una respuesta cacheada se comprime una vez, no en
+# cada petición (y Nginx guarda esa variante comprimida sin volver a comprimirla)
+_cuerpos_gzip = OrderedDict()
+
+
+def comprimir_cuerpo(etag: str, cuerpo: bytes) -> bytes:
+    comprimido = _cuerpos_gzip.get(etag)
+    if comprimido is None:
+        comprimido = gzip.compress(cuerpo, compresslevel=6, mtime=0)
+        _cuerpos_gzip[etag] = comprimido
+        if len(_cuerpos_gzip) > RESPONSE_GZIP_CACHE_SIZE:
+            _cuerpos_gzip.popitem(last=False)
+    else:
+        _cuerpos_gzip.move_to_end(etag)
+    return comprimido
+
+
+def respuesta_cacheada(request: Request, cuerpo: bytes, estado: str, tags: List[str]) -> Response:
+    """
+    Respuesta de un cuerpo de la cache de respuestas con ETag débil (el mismo para la
+    variante comprimida), 304 si el cliente ya lo tiene, gzip si lo acepta y las
+    cabeceras de la cache HTTP.
+    """
+    etag = etag_debil(cuerpo)
+    headers = {"X-Cache": estado, "ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding",
+               **cabeceras_edge(tags)}
+    if etag_coincide(request, etag):
+        return Response(status_code=304, headers=headers)
+    if 0 < RESPONSE_GZIP_MIN_SIZE <= len(cuerpo) and "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        cuerpo = comprimir_cuerpo(etag, cuerpo)
+    return Response(content=cuerpo, media_type="application/json", headers=headers)
+
+
+async def cerrar_cache_respuestas():
+    if response_cache.backend is not None:
+        await response_cache.backend.close()
+
 
 # =========================================================
 # FUNCIONES AUXILIARES
 # =========================================================
 
+# Alfabeto base32 de Crockford (sin i, l, o, u) en minúsculas, como el resto del ID
+CROCKFORD_BASE32 = "0123456789abcdefghjkmnpqrstvwxyz"
+
+# Reintentos del INSERT si el ID generado ya existe (ON CONFLICT DO NOTHING)
+ID_INSERT_MAX_INTENTOS = 5
+
+
+def generar_sufijo_ordenable() -> str:
+    """
+    Sufijo de 26 caracteres con el formato de un ULID: 48 bits con los milisegundos
+    desde epoch seguidos de 80 bits aleatorios. Ordena por tiempo de creación y la
+    probabilidad de repetirse, incluso en el mismo milisegundo, es despreciable.
+    """
+    valor = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    return "".join(CROCKFORD_BASE32[(valor >> desplazamiento) & 31] for desplazamiento in range(125, -1, -5))
+
+
 def generar_id_contenido(id_facultad: str, tipo: str, titulo: str) -> str:
     """
     Genera un ID único para un contenido basado en:
     - ID de facultad
     - Tipo de contenido (abreviado)
-    - Hash del título para unicidad
-    - Timestamp para evitar colisiones
+    - Hash del título
+    - Sufijo ordenable por tiempo (ver `generar_sufijo_ordenable`)
+    
+    No hace falta comprobar en la base de datos si ya existe: el INSERT usa
+    ON CONFLICT y, en el caso improbable de colisión, se genera otro ID.
     """
     # Abreviar tipo de contenido
     tipo_abrev = {
@@ -196,58 +2105,93 @@ def generar_id_contenido(id_facultad: str, tipo: str, titulo: str) -> str:
     # Crear hash corto del título (primeros 8 caracteres)
     titulo_hash = hashlib.md5(titulo.encode('utf-8')).hexdigest()[:8]
     
-    # Timestamp corto (últimos 6 dígitos)
-    timestamp = str(int(datetime.now().timestamp()))[-6:]
-    
-    # Formato: {facultad}_{tipo_abrev}_{hash}_{timestamp}
-    id_contenido = f"{id_facultad.lower()}_{tipo_abrev}_{titulo_hash}_{timestamp}"
+    # Formato: {facultad}_{tipo_abrev}_{hash}_{sufijo}
+    id_contenido = f"{id_facultad.lower()}_{tipo_abrev}_{titulo_hash}_{generar_sufijo_ordenable()}"
     
     return id_contenido
 
 
-def verificar_id_unico(id_contenido: str) -> bool:
+# Configuración de búsqueda de texto completo definida en init.sql (spanish + unaccent)
+SEARCH_CONFIG = "es_unaccent"
+
+
+def construir_tsquery(texto: str) -> Optional[str]:
     """
-    Verifica si un ID de contenido ya existe en la base de datos.
-    Retorna True si el ID es único, False si ya existe.
+    Convierte el texto libre del usuario en una tsquery con coincidencia por prefijo.
+    Ej.: "democracia deepf" -> "democracia:* & deepf:*".
+    Retorna None si el texto no contiene términos buscables.
     """
-    try:
-        query = "SELECT COUNT(*) FROM contenidos WHERE id_contenido = %s"
-        with db_router.get_connection(query, force_primary=True) as conn:
-            cur = conn.cursor()
-            cur.execute(query, (id_contenido,))
-            count = cur.fetchone()[0]
-            cur.close()
-        return count == 0
-    except Exception as e:
-        logger.warning(f"Error verificando ID único: {e}")
-        return True  # En caso de error, asumir que es único
+    terminos = re.findall(r"[^\W_]+", texto.lower())
+    if not terminos:
+        return None
+    return " & ".join(f"{termino}:*" for termino in terminos)
+
 
+# Paginación y proyección de /api/contenidos
+CONTENIDOS_LIMIT_DEFAULT = int(os.getenv("CONTENIDOS_LIMIT_DEFAULT", "50"))
+CONTENIDOS_LIMIT_MAX = int(os.getenv("CONTENIDOS_LIMIT_MAX", "200"))
 
-def generar_id_contenido_unico(id_facultad: str, tipo: str, titulo: str) -> str:
+# Campos que se pueden pedir con `fields=` y su expresión SQL
+CAMPOS_CONTENIDO = {
+    "id_contenido": "c.id_contenido",
+    "id_tema": "c.id_tema",
+    "id_facultad": "c.id_facultad",
+    "tipo": "c.tipo",
+    "titulo": "c.titulo",
+    "resumen": "c.resumen",
+    "emocion_dominante": "c.emocion_dominante",
+    "emocion_intensidad": "c.emocion_intensidad",
+    "tipo_fuente": "c.tipo_fuente",
+    "origen_fuente": "c.origen_fuente",
+    "url_ver": "c.url_ver",
+    "url_descargar": "c.url_descargar",
+    "created_at": "c.created_at",
+    "facultad_nombre": "f.nombre",
+    "color_hex": "f.color_hex",
+    "tema_nombre": "t.nombre",
+    "tags": "ARRAY(SELECT ct.tag::text FROM contenido_tags ct WHERE ct.id_contenido = c.id_contenido ORDER BY ct.id)",
+}
+
+# Feed de cards desnormalizado (tabla contenidos_feed de init.sql, mantenida por triggers):
+# listados, búsqueda y exportación leen de ella la card ya unida, sin JOIN con
+# facultades/temas. Con CONTENIDOS_FEED=false se usa el JOIN en vivo sobre contenidos.
+CONTENIDOS_FEED = os.getenv("CONTENIDOS_FEED", "true").lower() in ("1", "true", "yes", "on")
+CAMPOS_FEED = {campo: f"c.{campo}" for campo in CAMPOS_CONTENIDO}
+
+
+def parsear_campos(fields: Optional[str]) -> List[str]:
     """
-    Genera un ID único para contenido, verificando que no exista en la BD.
-    Si existe, genera uno nuevo con un sufijo adicional.
+    Convierte el parámetro `fields` ("id_contenido,titulo") en la lista de campos a devolver.
+    Sin `fields` se devuelven todos. Lanza ValueError si se pide un campo desconocido.
     """
-    id_base = generar_id_contenido(id_facultad, tipo, titulo)
-    id_contenido = id_base
-    
-    # Verificar unicidad y generar nuevo si es necesario
-    intentos = 0
-    max_intentos = 10
-    
-    while not verificar_id_unico(id_contenido) and intentos < max_intentos:
-        intentos += 1
-        # Agregar sufijo numérico
-        timestamp_extra = str(int(datetime.now().timestamp()))[-4:]
-        id_contenido = f"{id_base}_{timestamp_extra}"
-    
-    if intentos >= max_intentos:
-        # Fallback: usar UUID corto
-        import uuid
-        id_contenido = f"{id_facultad.lower()}_{tipo[:3].lower()}_{uuid.uuid4().hex[:12]}"
-        logger.warning(f"Se generó ID con UUID fallback: {id_contenido}")
-    
-    return id_contenido
+    if not fields:
+        return list(CAMPOS_CONTENIDO)
+    campos = []
+    for campo in fields.split(","):
+        campo = campo.strip()
+        if not campo:
+            continue
+        if campo not in CAMPOS_CONTENIDO:
+            raise ValueError(f"Campo desconocido en fields: {campo}")
+        if campo not in campos:
+            campos.append(campo)
+    return campos or list(CAMPOS_CONTENIDO)
+
+
+def codificar_cursor(valores: list) -> str:
+    """Cursor opaco (base64 url-safe de JSON) con los valores de la última fila de la página."""
+    return base64.urlsafe_b64encode(json.dumps(valores).encode("utf-8")).decode("ascii")
+
+
+def decodificar_cursor(cursor: str, longitud: int) -> list:
+    """Inverso de `codificar_cursor`. Lanza ValueError si el cursor no es válido."""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Cursor de paginación inválido")
+    if not isinstance(valores, list) or len(valores) != longitud:
+        raise ValueError("Cursor de paginación inválido")
+    return valores
 
 
 # =========================================================
@@ -274,157 +2218,550 @@ class ContenidoCreate(BaseModel):
 # =========================================================
 
 @app.get("/api/facultades")
-def get_facultades():
-    """Obtener todas las facultades (LECTURA -> REPLICA)."""
+async def get_facultades(request: Request):
+    """Obtener todas las facultades (LECTURA -> REPLICA, con cache en memoria y ETag)."""
     try:
-        query = "SELECT id_facultad, nombre, color_hex FROM facultades ORDER BY nombre"
-        with db_router.get_connection(query) as conn:
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            cur.execute(query)
-            facultades = cur.fetchall()
-            cur.close()
-        return {"success": True, "data": facultades}
+        facultades, etag = await cargar_referencia("facultades", FACULTADES_QUERY)
+        return respuesta_condicional(request, facultades, etag, ["facultades"])
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 @app.get("/api/temas")
-def get_temas():
-    """Obtener todos los temas (LECTURA -> REPLICA)."""
+async def get_temas(request: Request):
+    """Obtener todos los temas (LECTURA -> REPLICA, con cache en memoria y ETag)."""
     try:
-        query = "SELECT id_tema, nombre, descripcion FROM temas ORDER BY nombre"
-        with db_router.get_connection(query) as conn:
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            cur.execute(query)
-            temas = cur.fetchall()
-            cur.close()
-        return {"success": True, "data": temas}
+        temas, etag = await cargar_referencia("temas", TEMAS_QUERY)
+        return respuesta_condicional(request, temas, etag, ["temas"])
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 @app.get("/api/contenidos")
-def get_contenidos(facultad: str = None, search: str = None):
-    """Obtener contenidos, opcionalmente filtrados por facultad o búsqueda (LECTURA -> REPLICA)."""
+async def get_contenidos(request: Request, facultad: str = None, search: str = None,
+                         limit: int = CONTENIDOS_LIMIT_DEFAULT, cursor: str = None, fields: str = None,
+                         include_total: bool = False):
+    """
+    Obtener contenidos, opcionalmente filtrados por facultad o búsqueda (LECTURA -> REPLICA).
+    
+    Paginación por cursor (keyset) sobre (created_at, id_contenido): la respuesta incluye
+    `next_cursor`, que se envía como `cursor` para pedir la página siguiente.
+    `fields` limita las columnas devueltas (p. ej. `fields=id_contenido,titulo`) e
+    `include_total=true` añade el número total de resultados.
+    """
     try:
-        query = """
-            SELECT 
-                c.id_contenido, c.id_tema, c.id_facultad, c.tipo, c.titulo, c.resumen,
-                c.emocion_dominante, c.emocion_intensidad, c.tipo_fuente, c.origen_fuente,
-                c.url_ver, c.url_descargar,
-                f.nombre as facultad_nombre, f.color_hex,
-                t.nombre as tema_nombre
-            FROM contenidos c
-            JOIN facultades f ON c.id_facultad = f.id_facultad
-            JOIN temas t ON c.id_tema = t.id_tema
-            WHERE 1=1
-        """
-        
-        params = []
+        limit = max(1, min(limit, CONTENIDOS_LIMIT_MAX))
+        campos = parsear_campos(fields)
+        id_facultad = facultad if facultad and facultad != "Todos" else None
         
-        if facultad and facultad != "Todos":
-            query += " AND c.id_facultad = %s"
-            params.append(facultad)
+        tsquery = construir_tsquery(search) if search else None
+        if search and not tsquery:
+            respuesta = {"success": True, "data": [], "next_cursor": None}
+            if include_total:
+                respuesta["total"] = 0
+            return respuesta
         
-        if search:
-            query += " AND (c.titulo ILIKE %s OR c.resumen ILIKE %s OR t.nombre ILIKE %s)"
-            search_param = f"%{search}%"
-            params.extend([search_param, search_param, search_param])
-        
-        query += " ORDER BY c.created_at DESC"
+        # La clave usa los parámetros normalizados: "Salud  Mental" y "salud mental"
+        # comparten entrada, igual que limit=500 y limit=200
+        clave = response_cache.clave("contenidos", {
+            "facultad": id_facultad, "tsquery": tsquery, "limit": limit,
+            "cursor": cursor, "fields": campos, "include_total": include_total,
+        })
+        tags = etiquetas_contenidos(id_facultad)
+        cuerpo, estado = await response_cache.obtener(
+            clave, tags,
+            lambda: consultar_contenidos(id_facultad, tsquery, limit, cursor, campos, include_total),
+            # Una petición con token de consistencia no puede fiarse de lo cacheado
+            leer=lsn_minimo_peticion() is None,
+        )
+        return respuesta_cacheada(request, cuerpo, estado, tags)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def tabla_contenidos() -> str:
+    """Tabla de la que leen los listados: el feed desnormalizado o contenidos."""
+    return "contenidos_feed" if CONTENIDOS_FEED else "contenidos"
+
+
+def select_contenidos(por_facultad: bool, busqueda: bool, campos: List[str], columnas_cursor: bool = True):
+    """
+    SELECT de contenidos con los `campos` pedidos y, si se indican, los filtros por
+    facultad y búsqueda, sin ORDER BY. Con `columnas_cursor` añade las columnas del cursor
+    de paginación (created_at, id_contenido y la relevancia `_rank` si hay búsqueda)
+    aunque no se pidan. Retorna (query, filtros); los filtros sirven para el COUNT y sus
+    parámetros salen de `parametros_contenidos`.
+    Con CONTENIDOS_FEED lee de contenidos_feed y no necesita ningún JOIN.
+    """
+    expresiones = CAMPOS_FEED if CONTENIDOS_FEED else CAMPOS_CONTENIDO
+    columnas = [f"{expresiones[campo]} AS {campo}" for campo in campos]
+    if columnas_cursor:
+        for campo in ("created_at", "id_contenido"):
+            if campo not in campos:
+                columnas.append(f"{expresiones[campo]} AS {campo}")
+    
+    joins = ""
+    if not CONTENIDOS_FEED:
+        if any(CAMPOS_CONTENIDO[campo].startswith("f.") for campo in campos):
+            joins += " JOIN facultades f ON c.id_facultad = f.id_facultad"
+        if any(CAMPOS_CONTENIDO[campo].startswith("t.") for campo in campos):
+            joins += " JOIN temas t ON c.id_tema = t.id_tema"
+    
+    filtros = ""
+    if por_facultad:
+        filtros += " AND c.id_facultad = %s"
+    if busqueda:
+        # Búsqueda de texto completo (índice GIN sobre search_vector), ordenada por relevancia
+        joins += f" CROSS JOIN to_tsquery('{SEARCH_CONFIG}', %s) AS busqueda"
+        filtros += " AND c.search_vector @@ busqueda"
+        if columnas_cursor:
+            columnas.append("ts_rank_cd(c.search_vector, busqueda) AS _rank")
+    
+    query = f"SELECT {', '.join(columnas)} FROM {tabla_contenidos()} c{joins} WHERE 1=1{filtros}"
+    return query, filtros
+
+
+def parametros_contenidos(id_facultad: Optional[str], tsquery: Optional[str]) -> list:
+    """Parámetros de los filtros de `select_contenidos`, en el orden en que aparecen en el SQL."""
+    return ([tsquery] if tsquery else []) + ([id_facultad] if id_facultad else [])
+
+
+@lru_cache(maxsize=DB_STATEMENT_CACHE_SIZE)
+def consultas_contenidos(tabla: str, campos: Tuple[str, ...], por_facultad: bool, busqueda: bool,
+                         con_cursor: bool) -> Tuple[Consulta, Consulta]:
+    """
+    Consultas de una página de /api/contenidos y de su COUNT para una forma de petición
+    (tabla, campos pedidos, filtros y cursor). Se construyen y declaran una vez por forma,
+    así que cada variante tiene su sentencia preparada con un nombre estable.
+    """
+    # Las columnas del cursor se leen siempre, aunque no se hayan pedido en `fields`
+    query, filtros = select_contenidos(por_facultad, busqueda, list(campos))
+    
+    if con_cursor:
+        # Con búsqueda el cursor incluye además la relevancia de la última fila
+        if busqueda:
+            query += " AND (ts_rank_cd(c.search_vector, busqueda), c.created_at, c.id_contenido) < (%s::real, %s::timestamp, %s)"
+        else:
+            query += " AND (c.created_at, c.id_contenido) < (%s::timestamp, %s)"
+    
+    if busqueda:
+        query += " ORDER BY _rank DESC, c.created_at DESC, c.id_contenido DESC"
+    else:
+        query += " ORDER BY c.created_at DESC, c.id_contenido DESC"
+    
+    count_query = f"SELECT count(*) AS total FROM {tabla} c"
+    if busqueda:
+        count_query += f" CROSS JOIN to_tsquery('{SEARCH_CONFIG}', %s) AS busqueda"
+    # Una fila extra para saber si existe una página siguiente
+    return lectura(query + " LIMIT %s"), lectura(f"{count_query} WHERE 1=1{filtros}")
+
+
+async def consultar_contenidos(id_facultad: Optional[str], tsquery: Optional[str], limit: int,
+                               cursor: Optional[str], campos: List[str], include_total: bool) -> dict:
+    """Ejecutar la consulta paginada de /api/contenidos (sin cache)."""
+    query, count_query = consultas_contenidos(tabla_contenidos(), tuple(campos), bool(id_facultad),
+                                              bool(tsquery), bool(cursor))
+    filtro_params = parametros_contenidos(id_facultad, tsquery)
+    params = list(filtro_params)
+    if cursor:
+        params.extend(decodificar_cursor(cursor, 3 if tsquery else 2))
+    params.append(limit + 1)
+    
+    # Filas como tuplas: los campos pedidos van primero en el SELECT, así que zip() con
+    # `campos` descarta las columnas que solo se leen para el cursor
+    async with db_router.get_async_connection(query) as conn:
+        with conn.cursor() as cur:
+            await cur.execute(query, params)
+            filas = cur.fetchall()
+            columnas = [col.name for col in cur.description]
+            
+            total = None
+            if include_total:
+                await cur.execute(count_query, filtro_params)
+                total = cur.fetchone()[0]
+    
+    next_cursor = None
+    if len(filas) > limit:
+        filas = filas[:limit]
+        ultimo = filas[-1]
+        valores = [ultimo[columnas.index("created_at")].isoformat(), ultimo[columnas.index("id_contenido")]]
+        if tsquery:
+            valores.insert(0, ultimo[columnas.index("_rank")])
+        next_cursor = codificar_cursor(valores)
+    
+    contenidos = [dict(zip(campos, fila)) for fila in filas]
+    
+    respuesta = {"success": True, "data": contenidos, "next_cursor": next_cursor}
+    if include_total:
+        respuesta["total"] = total
+    return respuesta
+
+
+# Exportación en streaming: filas leídas del servidor por lotes con un cursor
+# (DECLARE/FETCH) y enviadas según se leen, sin cargar el resultado completo en memoria
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "1000"))
+EXPORT_FORMATOS = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+
+def fila_json(columnas: tuple, fila: tuple) -> bytes:
+    return json_bytes(dict(zip(columnas, fila)))
+
+
+async def exportar_contenidos(id_facultad: Optional[str], tsquery: Optional[str], campos: List[str],
+                              formato: str):
+    """
+    Generador asíncrono con el cuerpo de /api/contenidos/export. Las filas se leen en lotes
+    de EXPORT_FETCH_SIZE con un cursor del servidor (las conexiones asíncronas de psycopg2
+    no admiten cursores con nombre, así que se usa DECLARE/FETCH dentro de una transacción)
+    y cada lote se envía en cuanto llega: la memoria no depende del número de filas.
+    """
+    query, _ = select_contenidos(bool(id_facultad), bool(tsquery), campos, columnas_cursor=False)
+    params = parametros_contenidos(id_facultad, tsquery)
+    if tsquery:
+        query += " ORDER BY ts_rank_cd(c.search_vector, busqueda) DESC, c.created_at DESC, c.id_contenido DESC"
+    else:
+        query += " ORDER BY c.created_at DESC, c.id_contenido DESC"
+    query = lectura(query)
+    
+    primera = True
+    if formato == "json":
+        yield b'{"success":true,"data":['
+    try:
+        async with db_router.get_async_connection(query) as conn:
+            async with conn.transaction():
+                with conn.cursor() as cur:
+                    await cur.execute_simple(f"DECLARE export_contenidos NO SCROLL CURSOR FOR {query}", params)
+                    while True:
+                        await cur.execute_simple(f"FETCH {EXPORT_FETCH_SIZE} FROM export_contenidos")
+                        filas = cur.fetchall()
+                        if not filas:
+                            break
+                        columnas = tuple(col.name for col in cur.description)
+                        if formato == "json":
+                            lote = b",".join(fila_json(columnas, fila) for fila in filas)
+                            yield lote if primera else b"," + lote
+                        else:
+                            yield b"\n".join(fila_json(columnas, fila) for fila in filas) + b"\n"
+                        primera = False
+    except Exception as e:
+        # El estado 200 ya se envió: el error se indica al final del cuerpo
+        logger.error(f"Error exportando contenidos: {str(e)}")
+        if formato == "json":
+            yield b'],"success":false,"error":' + json.dumps(str(e)).encode("utf-8") + b"}"
+        else:
+            yield json.dumps({"success": False, "error": str(e)}).encode("utf-8") + b"\n"
+        return
+    if formato == "json":
+        yield b"]}"
+
+
+@app.get("/api/contenidos/export")
+async def export_contenidos(facultad: str = None, search: str = None, fields: str = None,
+                            format: str = "ndjson"):
+    """
+    Exportar todos los contenidos que cumplen los filtros, en streaming (LECTURA -> REPLICA).
+    
+    `format=ndjson` (por defecto) envía un objeto JSON por línea; `format=json` envía
+    `{"success": true, "data": [...]}` por partes. Mismo orden y mismos filtros y `fields`
+    que /api/contenidos, sin paginación ni cache de respuestas.
+    """
+    try:
+        if format not in EXPORT_FORMATOS:
+            raise ValueError(f"Formato desconocido: {format} (ndjson o json)")
+        campos = parsear_campos(fields)
+        id_facultad = facultad if facultad and facultad != "Todos" else None
+        tsquery = construir_tsquery(search) if search else None
+        if search and not tsquery:
+            cuerpo = iter([b'{"success":true,"data":[]}' if format == "json" else b""])
+        else:
+            cuerpo = exportar_contenidos(id_facultad, tsquery, campos, format)
+        # X-Accel-Buffering: que Nginx reenvíe cada bloque sin acumular la respuesta
+        return StreamingResponse(cuerpo, media_type=EXPORT_FORMATOS[format],
+                                 headers={"X-Accel-Buffering": "no"})
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+# Conteos por faceta de /api/contenidos/facets: columna de la faceta en el GROUP BY
+# (la última, "tag", sale del array de tags de cada contenido; ver consultar_facetas)
+FACETAS_CONTENIDO = {
+    "facultad": "id_facultad",
+    "tema": "id_tema",
+    "tipo": "tipo",
+    "emocion_dominante": "emocion_dominante",
+    "tag": "tag",
+}
+FACETS_TAGS_LIMIT = int(os.getenv("FACETS_TAGS_LIMIT", "50"))
+
+
+async def consultar_facetas(id_facultad: Optional[str], tsquery: Optional[str]) -> dict:
+    """
+    Conteos de /api/contenidos/facets en una sola consulta con GROUPING SETS.
+
+    Los contenidos filtrados se leen una vez (CTE materializado, con los mismos índices que
+    el listado: por facultad o GIN de la búsqueda) y GROUPING SETS los agrupa a la vez por
+    cada faceta y por () para el total. Los tags entran ya contados (tags distintos de cada
+    contenido) como una fila por tag con su conteo: pasar una fila por tag y contenido por
+    todos los GROUPING SETS costaría más que las consultas por separado. `es_tag` separa
+    ambos tipos de fila y GROUPING() indica a qué faceta pertenece cada fila del resultado.
+    """
+    tags = "c.tags" if CONTENIDOS_FEED else CAMPOS_CONTENIDO["tags"]
+    joins = ""
+    filtros = ""
+    params = []
+    if tsquery:
+        joins += f" CROSS JOIN to_tsquery('{SEARCH_CONFIG}', %s) AS busqueda"
+        filtros += " AND c.search_vector @@ busqueda"
+        params.append(tsquery)
+    if id_facultad:
+        filtros += " AND c.id_facultad = %s"
+        params.append(id_facultad)
+    columnas = ", ".join(FACETAS_CONTENIDO.values())
+    grupos = ", ".join(f"({columna})" for columna in FACETAS_CONTENIDO.values())
+    query = lectura(f"""
+        WITH filtrados AS MATERIALIZED (
+            SELECT c.id_facultad, c.id_tema, c.tipo, c.emocion_dominante, {tags} AS tags
+            FROM {tabla_contenidos()} c{joins}
+            WHERE 1=1{filtros}
+        )
+        SELECT GROUPING({columnas}) AS grupo, {columnas},
+               coalesce(sum(n) FILTER (WHERE NOT es_tag), 0) AS contenidos,
+               coalesce(sum(n) FILTER (WHERE es_tag), 0) AS con_tag
+        FROM (
+            SELECT id_facultad, id_tema, tipo, emocion_dominante, NULL::text AS tag, 1 AS n, false AS es_tag
+            FROM filtrados
+            UNION ALL
+            SELECT NULL, NULL, NULL, NULL, t.tag, count(*), true
+            FROM filtrados CROSS JOIN LATERAL (SELECT DISTINCT unnest(filtrados.tags) AS tag) AS t
+            GROUP BY t.tag
+        ) AS filas
+        GROUP BY GROUPING SETS ({grupos}, ())
+    """)
+    
+    async with db_router.get_async_connection(query) as conn:
+        with conn.cursor() as cur:
+            await cur.execute(query, params)
+            filas = cur.fetchall()
+    
+    # GROUPING() tiene un bit por columna (la primera es el más alto) a 1 si la fila no
+    # agrupa por ella: la faceta i es la única columna con su bit a 0
+    nombres = list(FACETAS_CONTENIDO)
+    todos = (1 << len(nombres)) - 1
+    faceta_por_grupo = {todos ^ (1 << (len(nombres) - 1 - i)): i for i in range(len(nombres))}
+    facetas = {nombre: [] for nombre in nombres}
+    total = 0
+    for grupo, *valores, contenidos, con_tag in filas:
+        if grupo == todos:
+            total = int(contenidos)
+            continue
+        i = faceta_por_grupo[grupo]
+        # Las filas de tags tienen NULL en las demás columnas y viceversa: solo se cuenta
+        # el tipo de fila de cada faceta (un contenido con emoción NULL sí es un valor)
+        conteo = con_tag if nombres[i] == "tag" else contenidos
+        if conteo:
+            facetas[nombres[i]].append({"value": valores[i], "count": int(conteo)})
+    for valores in facetas.values():
+        valores.sort(key=lambda faceta: (-faceta["count"], faceta["value"] is None, faceta["value"] or ""))
+    facetas["tag"] = facetas["tag"][:FACETS_TAGS_LIMIT]
+    return {"success": True, "data": facetas, "total": total}
+
+
+@app.get("/api/contenidos/facets")
+async def get_contenidos_facets(request: Request, facultad: str = None, search: str = None):
+    """
+    Conteos por facultad, tema, tipo, emoción dominante y tag (los FACETS_TAGS_LIMIT más
+    frecuentes) de los contenidos que cumplen los mismos filtros que /api/contenidos
+    (LECTURA -> REPLICA, con cache de respuestas). `total` es el número de contenidos.
+    """
+    try:
+        id_facultad = facultad if facultad and facultad != "Todos" else None
+        tsquery = construir_tsquery(search) if search else None
+        if search and not tsquery:
+            return {"success": True, "data": {nombre: [] for nombre in FACETAS_CONTENIDO}, "total": 0}
         
-        with db_router.get_connection(query) as conn:
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            cur.execute(query, params)
-            contenidos = cur.fetchall()
-            cur.close()
-        return {"success": True, "data": contenidos}
+        # Mismas etiquetas que el listado equivalente: crear o borrar contenidos las invalida
+        clave = response_cache.clave("facets", {"facultad": id_facultad, "tsquery": tsquery})
+        tags = etiquetas_contenidos(id_facultad)
+        cuerpo, estado = await response_cache.obtener(
+            clave, tags,
+            lambda: consultar_facetas(id_facultad, tsquery),
+            leer=lsn_minimo_peticion() is None,
+        )
+        return respuesta_cacheada(request, cuerpo, estado, tags)
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+
+# Detalle con tags y listas del tema en un único viaje (ver get_contenido_detail)
+DETALLE_CONTENIDO_QUERY = lectura("""
+    SELECT 
+        c.id_contenido, c.id_tema, c.id_facultad, c.tipo, c.titulo, c.resumen,
+        c.emocion_dominante, c.emocion_intensidad, c.tipo_fuente, c.origen_fuente,
+        c.url_ver, c.url_descargar,
+        f.nombre as facultad_nombre, f.color_hex,
+        t.nombre as tema_nombre, t.descripcion as tema_descripcion,
+        ARRAY(SELECT ct.tag FROM contenido_tags ct
+              WHERE ct.id_contenido = c.id_contenido ORDER BY ct.id) as tags,
+        CASE WHEN c.id_tema = ANY(%(temas_cacheados)s) THEN NULL
+             ELSE ARRAY(SELECT kc.concepto FROM tema_key_concepts kc
+                   WHERE kc.id_tema = c.id_tema ORDER BY kc.id) END as key_concepts,
+        CASE WHEN c.id_tema = ANY(%(temas_cacheados)s) THEN NULL
+             ELSE ARRAY(SELECT ma.actor FROM tema_main_actors ma
+                   WHERE ma.id_tema = c.id_tema ORDER BY ma.id) END as main_actors,
+        CASE WHEN c.id_tema = ANY(%(temas_cacheados)s) THEN NULL
+             ELSE ARRAY(SELECT cs.caso_estudio FROM tema_case_studies cs
+                   WHERE cs.id_tema = c.id_tema ORDER BY cs.id) END as case_studies,
+        CASE WHEN c.id_tema = ANY(%(temas_cacheados)s) THEN NULL
+             ELSE ARRAY(SELECT ft.tendencia_futura FROM tema_future_trends ft
+                   WHERE ft.id_tema = c.id_tema ORDER BY ft.id) END as future_trends
+    FROM contenidos c
+    JOIN facultades f ON c.id_facultad = f.id_facultad
+    JOIN temas t ON c.id_tema = t.id_tema
+    WHERE c.id_contenido = %(id_contenido)s
+""")
+
+
 @app.get("/api/contenidos/{id_contenido}")
-def get_contenido_detail(id_contenido: str):
-    """Obtener detalles de un contenido específico con sus listas asociadas (LECTURA -> REPLICA)."""
+async def get_contenido_detail(id_contenido: str):
+    """
+    Obtener detalles de un contenido específico con sus listas asociadas (LECTURA -> REPLICA).
+    
+    Los tags y las listas del tema se agregan con subconsultas ARRAY(...) en la misma
+    query, de modo que el detalle cuesta un único viaje a la base de datos. Las listas
+    de los temas que ya están en la cache de referencia no se vuelven a leer: la query
+    recibe esos temas y devuelve NULL en su lugar.
+    """
     try:
-        with db_router.get_connection() as conn:
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # Obtener el contenido principal
-            cur.execute("""
-                SELECT 
-                    c.id_contenido, c.id_tema, c.id_facultad, c.tipo, c.titulo, c.resumen,
-                    c.emocion_dominante, c.emocion_intensidad, c.tipo_fuente, c.origen_fuente,
-                    c.url_ver, c.url_descargar,
-                    f.nombre as facultad_nombre, f.color_hex,
-                    t.nombre as tema_nombre, t.descripcion as tema_descripcion
-                FROM contenidos c
-                JOIN facultades f ON c.id_facultad = f.id_facultad
-                JOIN temas t ON c.id_tema = t.id_tema
-                WHERE c.id_contenido = %s
-            """, (id_contenido,))
-            contenido = cur.fetchone()
-            
-            if not contenido:
-                cur.close()
-                return {"success": False, "error": "Contenido no encontrado"}
-            
-            # Obtener tags
-            cur.execute("SELECT tag FROM contenido_tags WHERE id_contenido = %s", (id_contenido,))
-            tags = [row['tag'] for row in cur.fetchall()]
-            
-            # Obtener conceptos clave del tema
-            cur.execute("SELECT concepto FROM tema_key_concepts WHERE id_tema = %s", (contenido['id_tema'],))
-            key_concepts = [row['concepto'] for row in cur.fetchall()]
-            
-            # Obtener actores principales
-            cur.execute("SELECT actor FROM tema_main_actors WHERE id_tema = %s", (contenido['id_tema'],))
-            main_actors = [row['actor'] for row in cur.fetchall()]
-            
-            # Obtener casos de estudio
-            cur.execute("SELECT caso_estudio FROM tema_case_studies WHERE id_tema = %s", (contenido['id_tema'],))
-            case_studies = [row['caso_estudio'] for row in cur.fetchall()]
-            
-            # Obtener tendencias futuras
-            cur.execute("SELECT tendencia_futura FROM tema_future_trends WHERE id_tema = %s", (contenido['id_tema'],))
-            future_trends = [row['tendencia_futura'] for row in cur.fetchall()]
-            
-            cur.close()
+        listas_cacheadas = reference_cache.snapshot("tema_listas")
+        
+        async with db_router.get_async_connection(DETALLE_CONTENIDO_QUERY) as conn:
+            with conn.cursor() as cur:
+                await cur.execute(DETALLE_CONTENIDO_QUERY, {
+                    "id_contenido": id_contenido,
+                    "temas_cacheados": list(listas_cacheadas),
+                })
+                filas = filas_dict(cur)
+        
+        if not filas:
+            return {"success": False, "error": "Contenido no encontrado"}
         
-        contenido['tags'] = tags
-        contenido['key_concepts'] = key_concepts
-        contenido['main_actors'] = main_actors
-        contenido['case_studies'] = case_studies
-        contenido['future_trends'] = future_trends
+        contenido = filas[0]
+        listas = listas_cacheadas.get(contenido["id_tema"])
+        reference_cache.record(hit=listas is not None)
+        if listas is None:
+            listas = {campo: contenido[campo] for campo in TEMA_LISTAS}
+            reference_cache.set(("tema_listas", contenido["id_tema"]), listas)
+        contenido.update(listas)
         
-        return {"success": True, "data": contenido}
+        return RespuestaJSON({"success": True, "data": contenido})
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+# Contenidos relacionados: init.sql (1.11) guarda los RELACIONADOS_GUARDADOS mejores vecinos
+# de cada card, ya ordenados, en una fila de contenidos_relacionados. La API sirve los
+# RELATED_LIMIT primeros (como mucho todos los guardados).
+RELACIONADOS_GUARDADOS = 20
+RELATED_LIMIT = int(os.getenv("RELATED_LIMIT", "10"))
+
+RELACIONADOS_SQL = """
+    SELECT
+        c.id_contenido, c.id_tema, c.id_facultad, c.tipo, c.titulo, c.resumen,
+        c.facultad_nombre, c.color_hex, c.tema_nombre, c.tags, v.score
+    FROM contenidos_relacionados r
+    CROSS JOIN LATERAL unnest(r.ids, r.scores) WITH ORDINALITY AS v(id_contenido, score, posicion)
+    JOIN {tabla} c ON c.id_contenido = v.id_contenido
+    WHERE r.id_contenido = %s AND v.posicion <= %s
+    ORDER BY v.posicion
+"""
+RELACIONADOS_QUERY = lectura(RELACIONADOS_SQL.format(tabla="contenidos_feed_origen"))
+RELACIONADOS_FEED_QUERY = lectura(RELACIONADOS_SQL.format(tabla="contenidos_feed"))
+
+# Solo cuando la card no tiene lista: distinguir "no existe" de "todavía en la cola"
+RELACIONADOS_ESTADO_QUERY = lectura("""
+    SELECT EXISTS (SELECT 1 FROM contenidos WHERE id_contenido = %(id)s) AS existe,
+           EXISTS (SELECT 1 FROM contenidos_relacionados_pendientes WHERE id_contenido = %(id)s) AS pendiente
+""")
+
+
+@app.get("/api/contenidos/{id_contenido}/related")
+async def get_contenidos_relacionados(id_contenido: str, limit: int = RELATED_LIMIT):
+    """
+    Contenidos relacionados con una card, del más al menos parecido (LECTURA -> REPLICA).
+
+    Score: 1 por tag compartido, 2 si son del mismo tema y 0.5 si son de la misma facultad.
+    Las listas se precalculan en init.sql y se leen con una búsqueda por clave primaria;
+    `pending` indica que la card todavía no tiene lista (recién creada, en la cola de
+    procesar_relacionados).
+    """
+    try:
+        limit = max(1, min(limit, RELACIONADOS_GUARDADOS))
+        query = RELACIONADOS_FEED_QUERY if CONTENIDOS_FEED else RELACIONADOS_QUERY
+        async with db_router.get_async_connection(query) as conn:
+            with conn.cursor() as cur:
+                await cur.execute(query, (id_contenido, limit))
+                relacionados = filas_dict(cur)
+                if relacionados:
+                    return RespuestaJSON({"success": True, "data": relacionados, "pending": False})
+                await cur.execute(RELACIONADOS_ESTADO_QUERY, {"id": id_contenido})
+                existe, pendiente = cur.fetchone()
+
+        if not existe:
+            return {"success": False, "error": "Contenido no encontrado"}
+        return {"success": True, "data": [], "pending": pendiente}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 @app.get("/api/search")
-def search_contenidos(q: str):
+async def search_contenidos(request: Request, q: str):
     """Buscar contenidos por término (LECTURA -> REPLICA)."""
     try:
-        search_param = f"%{q}%"
-        query = """
-            SELECT 
-                c.id_contenido, c.id_tema, c.id_facultad, c.tipo, c.titulo, c.resumen,
-                f.nombre as facultad_nombre, f.color_hex,
-                t.nombre as tema_nombre
-            FROM contenidos c
-            JOIN facultades f ON c.id_facultad = f.id_facultad
-            JOIN temas t ON c.id_tema = t.id_tema
-            WHERE c.titulo ILIKE %s OR c.resumen ILIKE %s OR t.nombre ILIKE %s
-            ORDER BY c.created_at DESC
-            LIMIT 20
-        """
+        tsquery = construir_tsquery(q)
+        if not tsquery:
+            return {"success": True, "data": []}
         
-        with db_router.get_connection(query) as conn:
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            cur.execute(query, (search_param, search_param, search_param))
-            resultados = cur.fetchall()
-            cur.close()
-        return {"success": True, "data": resultados}
+        clave = response_cache.clave("search", {"tsquery": tsquery})
+        cuerpo, estado = await response_cache.obtener(clave, ["search"], lambda: buscar_contenidos(tsquery),
+                                                      leer=lsn_minimo_peticion() is None)
+        return respuesta_cacheada(request, cuerpo, estado, ["search"])
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+
+# Búsqueda de texto completo sobre título, tags, tema y resumen, ordenada por relevancia
+BUSQUEDA_QUERY = lectura(f"""
+    SELECT 
+        c.id_contenido, c.id_tema, c.id_facultad, c.tipo, c.titulo, c.resumen,
+        f.nombre as facultad_nombre, f.color_hex,
+        t.nombre as tema_nombre
+    FROM contenidos c
+    JOIN facultades f ON c.id_facultad = f.id_facultad
+    JOIN temas t ON c.id_tema = t.id_tema
+    CROSS JOIN to_tsquery('{SEARCH_CONFIG}', %s) AS busqueda
+    WHERE c.search_vector @@ busqueda
+    ORDER BY ts_rank_cd(c.search_vector, busqueda) DESC, c.created_at DESC
+    LIMIT 20
+""")
+
+BUSQUEDA_FEED_QUERY = lectura(f"""
+    SELECT 
+        c.id_contenido, c.id_tema, c.id_facultad, c.tipo, c.titulo, c.resumen,
+        c.facultad_nombre, c.color_hex, c.tema_nombre
+    FROM contenidos_feed c
+    CROSS JOIN to_tsquery('{SEARCH_CONFIG}', %s) AS busqueda
+    WHERE c.search_vector @@ busqueda
+    ORDER BY ts_rank_cd(c.search_vector, busqueda) DESC, c.created_at DESC
+    LIMIT 20
+""")
+
+
+async def buscar_contenidos(tsquery: str) -> dict:
+    """Ejecutar la búsqueda de /api/search (sin cache)."""
+    query = BUSQUEDA_FEED_QUERY if CONTENIDOS_FEED else BUSQUEDA_QUERY
+    async with db_router.get_async_connection(query) as conn:
+        with conn.cursor() as cur:
+            await cur.execute(query, (tsquery,))
+            resultados = filas_dict(cur)
+    return {"success": True, "data": resultados}
+
 @app.delete("/api/contenidos/{id_contenido}", status_code=204)
 async def delete_contenido(id_contenido: str):
     """
@@ -432,28 +2769,26 @@ async def delete_contenido(id_contenido: str):
     También elimina automáticamente los tags asociados debido a la restricción CASCADE.
     """
     try:
-        with db_router.get_connection(force_primary=True) as conn:
-            with conn.cursor() as cur:
-                # Verificar si el contenido existe
-                cur.execute(
-                    "SELECT 1 FROM contenidos WHERE id_contenido = %s",
-                    (id_contenido,)
-                )
-                if not cur.fetchone():
-                    raise HTTPException(
-                        status_code=404,
-                        detail=f"No se encontró el contenido con ID: {id_contenido}"
+        async with db_router.get_async_connection(force_primary=True) as conn:
+            async with conn.transaction():
+                with conn.cursor() as cur:
+                    # Eliminar el contenido (los tags se eliminan en cascada); la facultad
+                    # devuelta indica qué listados cacheados hay que invalidar
+                    await cur.execute(
+                        "DELETE FROM contenidos WHERE id_contenido = %s RETURNING id_facultad",
+                        (id_contenido,)
                     )
-                
-                # Eliminar el contenido (los tags se eliminan en cascada)
-                cur.execute(
-                    "DELETE FROM contenidos WHERE id_contenido = %s",
-                    (id_contenido,)
-                )
-                conn.commit()
-                
-                logger.info(f"Contenido eliminado exitosamente: {id_contenido}")
-                return None
+                    eliminado = cur.fetchone()
+                    if not eliminado:
+                        raise HTTPException(
+                            status_code=404,
+                            detail=f"No se encontró el contenido con ID: {id_contenido}"
+                        )
+            await db_router.registrar_escritura(conn)
+        
+        await invalidar_respuestas_contenidos(eliminado[0])
+        logger.info(f"Contenido eliminado exitosamente: {id_contenido}")
+        return None
                 
     except HTTPException as he:
         raise he
@@ -464,148 +2799,658 @@ async def delete_contenido(id_contenido: str):
             detail=f"Error al eliminar el contenido: {str(e)}"
         )
 
+# Borrado masivo: contenidos por lote (una transacción por lote), máximo de IDs por
+# petición y espera máxima tras cada lote a que las réplicas lo apliquen (0 = no esperar)
+DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", "1000"))
+DELETE_MAX_IDS = int(os.getenv("DELETE_MAX_IDS", "50000"))
+DELETE_REPLICATION_WAIT = float(os.getenv("DELETE_REPLICATION_WAIT", "10"))
+
+# Los tags se borran en cascada (índice idx_contenido_tags_id_contenido) y los triggers
+# de sentencia de contenidos_feed procesan cada lote de una vez
+BORRAR_IDS_QUERY = """
+    DELETE FROM contenidos
+    WHERE id_contenido = ANY(%s){filtros}
+    RETURNING id_contenido, id_facultad
+"""
+BORRAR_FILTRO_QUERY = """
+    DELETE FROM contenidos
+    WHERE id_contenido IN (SELECT id_contenido FROM contenidos WHERE 1=1{filtros} LIMIT %s)
+    RETURNING id_contenido, id_facultad
+"""
+
+
+class ContenidosDelete(BaseModel):
+    """Criterios de DELETE /api/contenidos; se combinan con AND y hace falta al menos uno."""
+    ids: Optional[List[str]] = None
+    facultad: Optional[str] = None
+    tema: Optional[str] = None
+    desde: Optional[datetime] = None
+    hasta: Optional[datetime] = None
+
+
+def filtros_borrado(criterios: ContenidosDelete):
+    """Condiciones (sin la lista de IDs) y sus parámetros; ValueError si no hay ningún criterio."""
+    filtros = ""
+    params = []
+    for condicion, valor in (("id_facultad = %s", criterios.facultad), ("id_tema = %s", criterios.tema),
+                             ("created_at >= %s", criterios.desde), ("created_at < %s", criterios.hasta)):
+        if valor is not None:
+            filtros += f" AND {condicion}"
+            params.append(valor)
+    if criterios.ids is None and not params:
+        raise ValueError("Indica `ids` o al menos un filtro (facultad, tema, desde, hasta)")
+    if criterios.ids is not None and len(criterios.ids) > DELETE_MAX_IDS:
+        raise ValueError(f"Máximo {DELETE_MAX_IDS} IDs por petición")
+    return filtros, params
+
+
+async def borrar_lote(query, params: list) -> tuple:
+    """Ejecutar un DELETE ... RETURNING en su propia transacción; retorna (filas, LSN tras el commit)."""
+    async with db_router.get_async_connection(query) as conn:
+        async with conn.transaction():
+            with conn.cursor() as cur:
+                await cur.execute(query, params)
+                filas = cur.fetchall()
+        lsn = await db_router.registrar_escritura(conn)
+    return filas, lsn
+
+
+async def borrar_contenidos(criterios: ContenidosDelete):
+    """
+    Generador asíncrono del borrado masivo: borra en lotes de DELETE_BATCH_SIZE con
+    DELETE ... RETURNING, cada lote en su transacción, así que los bloqueos duran lo que
+    un lote. Produce el progreso tras cada lote y, al final, el resumen. Entre lotes espera
+    a que las réplicas apliquen el anterior. Los listados cacheados de las facultades
+    afectadas se invalidan al terminar, aunque el borrado se interrumpa.
+    """
+    filtros, params = filtros_borrado(criterios)
+    if criterios.ids is not None:
+        ids = list(dict.fromkeys(criterios.ids))
+        query = escritura(BORRAR_IDS_QUERY.format(filtros=filtros))
+        lotes = [[ids[i:i + DELETE_BATCH_SIZE]] + params for i in range(0, len(ids), DELETE_BATCH_SIZE)]
+    else:
+        # Con filtros se repite el mismo DELETE hasta que un lote sale incompleto
+        ids = lotes = None
+        query = escritura(BORRAR_FILTRO_QUERY.format(filtros=filtros))
+    
+    inicio = time.perf_counter()
+    eliminados = set()
+    facultades = set()
+    lote = 0
+    esperas = 0.0
+    try:
+        while lotes is None or lote < len(lotes):
+            filas, lsn = await borrar_lote(query, lotes[lote] if lotes is not None else params + [DELETE_BATCH_SIZE])
+            lote += 1
+            eliminados.update(fila[0] for fila in filas)
+            facultades.update(fila[1] for fila in filas)
+            if DELETE_REPLICATION_WAIT > 0 and filas:
+                inicio_espera = time.perf_counter()
+                if not await db_router.esperar_replicacion(lsn, DELETE_REPLICATION_WAIT):
+                    logger.warning("Borrado masivo: las réplicas no aplicaron el lote %d en %.0fs, se continúa",
+                                   lote, DELETE_REPLICATION_WAIT)
+                esperas += time.perf_counter() - inicio_espera
+            yield {"batch": lote, "deleted": len(eliminados),
+                   "elapsed_ms": round((time.perf_counter() - inicio) * 1000, 1)}
+            if lotes is None and len(filas) < DELETE_BATCH_SIZE:
+                break
+    finally:
+        if facultades:
+            await invalidar_respuestas_contenidos(*facultades)
+    
+    logger.info("Borrado masivo: %d contenido(s) en %d lote(s)", len(eliminados), lote, extra={
+        "evento": "contenidos_eliminados",
+        "eliminados": len(eliminados),
+        "lotes": lote,
+        "facultades": sorted(facultades),
+        "espera_replicacion_ms": round(esperas * 1000, 1),
+        "duracion_ms": round((time.perf_counter() - inicio) * 1000, 1),
+    })
+    resumen = {"success": True, "deleted": len(eliminados), "batches": lote}
+    if ids is not None:
+        resumen["not_found"] = [id_contenido for id_contenido in ids if id_contenido not in eliminados]
+    yield resumen
+
+
+@app.delete("/api/contenidos")
+async def delete_contenidos(criterios: ContenidosDelete, request: Request):
+    """
+    Eliminar contenidos en bloque (ESCRITURA -> PRIMARY) por lista de `ids` y/o por filtros
+    (`facultad`, `tema` y rango de `created_at` con `desde` incluido y `hasta` excluido).
+    
+    Borra en lotes de DELETE_BATCH_SIZE, cada uno en su transacción, esperando entre lotes
+    a las réplicas. Con `Accept: application/x-ndjson` envía una línea de progreso por lote
+    y el resumen al final; si no, solo el resumen. Los lotes ya confirmados no se deshacen
+    si la petición se interrumpe.
+    """
+    try:
+        filtros_borrado(criterios)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+    
+    if "ndjson" in request.headers.get("accept", ""):
+        async def progreso():
+            try:
+                async for estado in borrar_contenidos(criterios):
+                    yield json_bytes(estado) + b"\n"
+            except Exception as e:
+                # El estado 200 ya se envió: el error va en la última línea
+                logger.error("Error en el borrado masivo de contenidos: %s", e)
+                yield json_bytes({"success": False, "error": str(e)}) + b"\n"
+        return StreamingResponse(progreso(), media_type="application/x-ndjson",
+                                 headers={"X-Accel-Buffering": "no"})
+    
+    try:
+        async for estado in borrar_contenidos(criterios):
+            pass
+        return estado
+    except Exception as e:
+        logger.error("Error en el borrado masivo de contenidos: %s", e)
+        return {"success": False, "error": str(e)}
+
+
+# Todos los tags de un contenido en un solo INSERT: una sentencia (y un disparo de los
+# triggers por sentencia del feed y de la cola de relacionados) en lugar de una por tag
+INSERT_TAGS_QUERY = escritura(
+    "INSERT INTO contenido_tags (id_contenido, tag) SELECT %s, unnest(%s::varchar[])"
+)
+
+
 @app.post("/api/contenidos")
-def create_contenido(contenido: ContenidoCreate):
+async def create_contenido(contenido: ContenidoCreate):
     """Crear un nuevo contenido (ESCRITURA -> PRIMARY). El ID se genera automáticamente."""
+    inicio = time.perf_counter()
     try:
-        logger.info("=" * 80)
-        logger.info("📝 NUEVA SOLICITUD DE CREACIÓN DE CONTENIDO")
-        logger.info("=" * 80)
-        logger.info(f"📚 Facultad: {contenido.id_facultad}")
-        logger.info(f"🎯 Tema: {contenido.id_tema}")
-        logger.info(f"📋 Tipo: {contenido.tipo}")
-        logger.info(f"📌 Título: {contenido.titulo}")
-        logger.info(f"📄 Resumen: {contenido.resumen[:100]}..." if len(contenido.resumen) > 100 else f"📄 Resumen: {contenido.resumen}")
-        
-        if contenido.emocion_dominante:
-            logger.info(f"😊 Emoción: {contenido.emocion_dominante} (Intensidad: {contenido.emocion_intensidad or 'N/A'})")
-        if contenido.tipo_fuente:
-            logger.info(f"📖 Fuente: {contenido.tipo_fuente} - {contenido.origen_fuente or 'N/A'}")
-        if contenido.url_ver:
-            logger.info(f"🔗 URL Ver: {contenido.url_ver}")
-        if contenido.url_descargar:
-            logger.info(f"⬇️ URL Descargar: {contenido.url_descargar}")
-        if contenido.tags and len(contenido.tags) > 0:
-            logger.info(f"🏷️ Tags: {', '.join(contenido.tags)}")
-        
-        logger.info("-" * 80)
-        logger.info("🔑 Generando ID único para el contenido...")
-        
-        # Generar ID único automáticamente
-        id_contenido = generar_id_contenido_unico(
-            contenido.id_facultad,
-            contenido.tipo,
-            contenido.titulo
-        )
-        
-        logger.info(f"✅ ID generado: {id_contenido}")
-        logger.info("-" * 80)
-        logger.info("💾 Conectando a PRIMARY database para escritura...")
-        
         # Usar PRIMARY para escritura
-        query = """
+        query = escritura("""
             INSERT INTO contenidos (
                 id_contenido, id_tema, id_facultad, tipo, titulo, resumen,
                 emocion_dominante, emocion_intensidad, tipo_fuente, origen_fuente,
                 url_ver, url_descargar
             ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (id_contenido) DO NOTHING
             RETURNING id_contenido
-        """
+        """)
         
-        with db_router.get_connection(query, force_primary=True) as conn:
+        async with db_router.get_async_connection(query) as conn:
             cur = conn.cursor()
             
-            logger.info("✅ Conexión establecida con PRIMARY database")
-            logger.info("📥 Insertando contenido principal...")
-            
-            # Insertar contenido principal
-            cur.execute(query, (
-                id_contenido,
-                contenido.id_tema,
-                contenido.id_facultad,
-                contenido.tipo,
-                contenido.titulo,
-                contenido.resumen,
-                contenido.emocion_dominante,
-                contenido.emocion_intensidad,
-                contenido.tipo_fuente,
-                contenido.origen_fuente,
-                contenido.url_ver,
-                contenido.url_descargar
-            ))
-            
-            resultado = cur.fetchone()
-            logger.info(f"✅ Contenido insertado exitosamente. ID: {resultado[0] if resultado else id_contenido}")
-            
-            # Insertar tags si existen
-            tags_insertados = 0
-            if contenido.tags and len(contenido.tags) > 0:
-                logger.info(f"🏷️ Insertando {len(contenido.tags)} tag(s)...")
-                tags_query = "INSERT INTO contenido_tags (id_contenido, tag) VALUES (%s, %s)"
-                for tag in contenido.tags:
-                    if tag.strip():  # Solo insertar tags no vacíos
-                        cur.execute(tags_query, (id_contenido, tag.strip()))
-                        tags_insertados += 1
-                        logger.info(f"   ✓ Tag insertado: '{tag.strip()}'")
+            async with conn.transaction():
+                # Insertar contenido principal con un ID generado automáticamente. No se
+                # consulta antes si existe: si colisiona, ON CONFLICT no inserta nada y
+                # se reintenta con un ID nuevo
+                for intento in range(1, ID_INSERT_MAX_INTENTOS + 1):
+                    id_contenido = generar_id_contenido(
+                        contenido.id_facultad,
+                        contenido.tipo,
+                        contenido.titulo
+                    )
+                    await cur.execute(query, (
+                        id_contenido,
+                        contenido.id_tema,
+                        contenido.id_facultad,
+                        contenido.tipo,
+                        contenido.titulo,
+                        contenido.resumen,
+                        contenido.emocion_dominante,
+                        contenido.emocion_intensidad,
+                        contenido.tipo_fuente,
+                        contenido.origen_fuente,
+                        contenido.url_ver,
+                        contenido.url_descargar
+                    ))
+                    if cur.fetchone():
+                        break
+                    logger.warning("El ID %s ya existe, generando otro (intento %d)", id_contenido, intento)
+                else:
+                    raise RuntimeError(f"No se pudo generar un ID único tras {ID_INSERT_MAX_INTENTOS} intentos")
                 
-                if tags_insertados > 0:
-                    logger.info(f"✅ {tags_insertados} tag(s) insertado(s) exitosamente")
+                # Insertar tags si existen (solo los no vacíos)
+                tags_insertados = 0
+                tags = [tag.strip() for tag in contenido.tags or [] if tag.strip()]
+                if tags:
+                    await cur.execute(INSERT_TAGS_QUERY, (id_contenido, tags))
+                    tags_insertados = cur.rowcount
             
-            conn.commit()
-            logger.info("💾 Cambios confirmados (COMMIT) en PRIMARY database")
             cur.close()
+            await db_router.registrar_escritura(conn)
         
-        logger.info("=" * 80)
-        logger.info(f"✨ CONTENIDO CREADO EXITOSAMENTE: {id_contenido}")
-        logger.info("=" * 80)
-        logger.info("")
+        await invalidar_respuestas_contenidos(contenido.id_facultad)
+        
+        # Un solo evento por petición; los campos solo se construyen si se va a registrar
+        if muestrear_log():
+            medicion = _medicion.get()
+            logger.info("Contenido creado: %s", id_contenido, extra={
+                "evento": "contenido_creado",
+                "id_contenido": id_contenido,
+                "id_facultad": contenido.id_facultad,
+                "id_tema": contenido.id_tema,
+                "tipo": contenido.tipo,
+                "titulo": contenido.titulo[:120],
+                "tags": tags_insertados,
+                "intentos_id": intento,
+                "viajes_bd": medicion.viajes if medicion else None,
+                "duracion_ms": round((time.perf_counter() - inicio) * 1000, 2),
+                "sample_rate": min(LOG_SAMPLE_RATE, 1.0),
+            })
         
         return {"success": True, "message": "Contenido creado exitosamente", "id_contenido": id_contenido}
     except psycopg2.IntegrityError as e:
-        logger.error("=" * 80)
-        logger.error("❌ ERROR DE INTEGRIDAD EN BASE DE DATOS")
-        logger.error("=" * 80)
-        logger.error(f"🔴 Error: {str(e)}")
-        logger.error("💡 Posibles causas:")
-        logger.error("   - La facultad o tema no existe en la base de datos")
-        logger.error("   - Violación de restricción de clave foránea")
-        logger.error("=" * 80)
-        logger.error("")
+        logger.error("Error de integridad al crear contenido (¿facultad o tema inexistente?): %s", e, extra={
+            "evento": "contenido_error",
+            "id_facultad": contenido.id_facultad,
+            "id_tema": contenido.id_tema,
+            "duracion_ms": round((time.perf_counter() - inicio) * 1000, 2),
+        })
         return {"success": False, "error": f"Error de integridad: Hay un problema con las claves foráneas (facultad o tema no existe)"}
     except Exception as e:
-        logger.error("=" * 80)
-        logger.error("❌ ERROR AL CREAR CONTENIDO")
-        logger.error("=" * 80)
-        logger.error(f"🔴 Error: {str(e)}")
-        logger.error("=" * 80)
-        logger.error("")
+        logger.error("Error al crear contenido: %s", e, extra={
+            "evento": "contenido_error",
+            "id_facultad": contenido.id_facultad,
+            "id_tema": contenido.id_tema,
+            "duracion_ms": round((time.perf_counter() - inicio) * 1000, 2),
+        })
         return {"success": False, "error": str(e)}
 
+# Carga masiva: contenidos por lote (una transacción por lote) y máximo por petición
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "50000"))
+
+INSERT_CONTENIDOS_LOTE = """
+    INSERT INTO contenidos (
+        id_contenido, id_tema, id_facultad, tipo, titulo, resumen,
+        emocion_dominante, emocion_intensidad, tipo_fuente, origen_fuente,
+        url_ver, url_descargar
+    ) VALUES %s
+    ON CONFLICT (id_contenido) DO NOTHING
+    RETURNING id_contenido
+"""
+
+
+async def leer_items_bulk(request: Request):
+    """
+    Genera (indice, item, error) a partir del cuerpo de la petición: un array JSON o,
+    con `Content-Type: application/x-ndjson`, un objeto JSON por línea leído según llega.
+    Lanza ValueError si el cuerpo no es un array JSON.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" not in content_type and "jsonlines" not in content_type:
+        try:
+            datos = json.loads(await request.body())
+        except ValueError:
+            raise ValueError("El cuerpo no es JSON válido")
+        if not isinstance(datos, list):
+            raise ValueError("Se esperaba un array JSON de contenidos")
+        for indice, item in enumerate(datos):
+            yield indice, item, None
+        return
+    
+    indice = 0
+    pendiente = b""
+    async for trozo in request.stream():
+        pendiente += trozo
+        *lineas, pendiente = pendiente.split(b"\n")
+        for linea in lineas:
+            if linea.strip():
+                try:
+                    yield indice, json.loads(linea), None
+                except ValueError:
+                    yield indice, None, "Línea NDJSON no es JSON válido"
+                indice += 1
+    if pendiente.strip():
+        try:
+            yield indice, json.loads(pendiente), None
+        except ValueError:
+            yield indice, None, "Línea NDJSON no es JSON válido"
+
+
+def validar_item_bulk(item, facultades: Optional[set], temas: Optional[set]) -> ContenidoCreate:
+    """Validar un elemento como ContenidoCreate y, si se conocen, su facultad y su tema."""
+    if not isinstance(item, dict):
+        raise ValueError("Cada contenido debe ser un objeto JSON")
+    try:
+        contenido = ContenidoCreate(**item)
+    except ValidationError as e:
+        raise ValueError("; ".join(
+            f"{'.'.join(str(parte) for parte in error['loc'])}: {error['msg']}" for error in e.errors()
+        ))
+    if facultades is not None and contenido.id_facultad not in facultades:
+        raise ValueError(f"La facultad {contenido.id_facultad} no existe")
+    if temas is not None and contenido.id_tema not in temas:
+        raise ValueError(f"El tema {contenido.id_tema} no existe")
+    return contenido
+
+
+async def insertar_lote(lote: list) -> dict:
+    """
+    Insertar en una sola transacción una lista de (indice, ContenidoCreate) con INSERT
+    multi-fila para contenidos y tags. Los IDs se generan en el cliente; los que
+    colisionan (ON CONFLICT) se regeneran y se reintentan. Retorna {indice: id_contenido}.
+    """
+    pendientes = {}  # id_contenido -> (indice, contenido)
+    for indice, contenido in lote:
+        pendientes[generar_id_contenido(contenido.id_facultad, contenido.tipo, contenido.titulo)] = (indice, contenido)
+    
+    insertados = {}
+    async with db_router.get_async_connection(force_primary=True) as conn:
+        async with conn.transaction():
+            with conn.cursor() as cur:
+                for _ in range(ID_INSERT_MAX_INTENTOS):
+                    filas = [
+                        (id_contenido, c.id_tema, c.id_facultad, c.tipo, c.titulo, c.resumen,
+                         c.emocion_dominante, c.emocion_intensidad, c.tipo_fuente, c.origen_fuente,
+                         c.url_ver, c.url_descargar)
+                        for id_contenido, (_, c) in pendientes.items()
+                    ]
+                    devueltos = await cur.execute_values(INSERT_CONTENIDOS_LOTE, filas,
+                                                         page_size=BULK_CHUNK_SIZE, fetch=True)
+                    for (id_contenido,) in devueltos:
+                        insertados[id_contenido] = pendientes.pop(id_contenido)
+                    if not pendientes:
+                        break
+                    pendientes = {
+                        generar_id_contenido(c.id_facultad, c.tipo, c.titulo): (indice, c)
+                        for indice, c in pendientes.values()
+                    }
+                else:
+                    raise RuntimeError(f"No se pudo generar un ID único tras {ID_INSERT_MAX_INTENTOS} intentos")
+                
+                tags = [
+                    (id_contenido, tag.strip())
+                    for id_contenido, (_, c) in insertados.items()
+                    for tag in (c.tags or [])
+                    if tag.strip()
+                ]
+                if tags:
+                    await cur.execute_values("INSERT INTO contenido_tags (id_contenido, tag) VALUES %s",
+                                             tags, page_size=BULK_CHUNK_SIZE * 4)
+        await db_router.registrar_escritura(conn)
+    
+    return {indice: id_contenido for id_contenido, (indice, _) in insertados.items()}
+
+
+async def cargar_lote_bulk(lote: list, creados: list, errores: list, facultades_afectadas: set):
+    """
+    Cargar un lote y anotar el resultado de cada elemento. Si la base de datos rechaza
+    el lote (clave foránea, longitud de un campo...), se reintenta elemento a elemento
+    para que solo fallen los elementos culpables.
+    """
+    try:
+        ids = await insertar_lote(lote)
+    except psycopg2.Error as e:
+        if len(lote) == 1:
+            errores.append({"index": lote[0][0], "error": str(e).strip().splitlines()[0]})
+            return
+        logger.warning(f"Lote de {len(lote)} contenidos rechazado, reintentando uno a uno: {str(e).strip().splitlines()[0]}")
+        for item in lote:
+            await cargar_lote_bulk([item], creados, errores, facultades_afectadas)
+        return
+    for indice, contenido in lote:
+        creados.append({"index": indice, "id_contenido": ids[indice]})
+        facultades_afectadas.add(contenido.id_facultad)
+
+
+@app.post("/api/contenidos/bulk")
+async def create_contenidos_bulk(request: Request):
+    """
+    Crear contenidos en bloque (ESCRITURA -> PRIMARY).
+    
+    Acepta un array JSON de contenidos o NDJSON (`Content-Type: application/x-ndjson`,
+    un contenido por línea). Cada elemento se valida como `ContenidoCreate` y los válidos
+    se insertan en lotes de BULK_CHUNK_SIZE, cada lote en su propia transacción.
+    La respuesta indica el ID creado o el error de cada elemento (`index` = posición en la entrada).
+    """
+    inicio = time.perf_counter()
+    creados, errores, facultades_afectadas = [], [], set()
+    total = 0
+    try:
+        # Facultades y temas conocidos para informar de claves foráneas por elemento
+        try:
+            facultades = {f["id_facultad"] for f in (await cargar_referencia("facultades", FACULTADES_QUERY))[0]}
+            temas = {t["id_tema"] for t in (await cargar_referencia("temas", TEMAS_QUERY))[0]}
+        except Exception as e:
+            logger.warning(f"No se pudieron cargar facultades/temas para validar la carga masiva: {str(e)}")
+            facultades = temas = None
+        
+        lote = []
+        async for indice, item, error in leer_items_bulk(request):
+            if indice >= BULK_MAX_ITEMS:
+                errores.append({"index": indice, "error": f"Se superó el máximo de {BULK_MAX_ITEMS} contenidos por petición; el resto no se procesó"})
+                break
+            total += 1
+            if error is None:
+                try:
+                    lote.append((indice, validar_item_bulk(item, facultades, temas)))
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                errores.append({"index": indice, "error": error})
+            if len(lote) >= BULK_CHUNK_SIZE:
+                await cargar_lote_bulk(lote, creados, errores, facultades_afectadas)
+                lote = []
+        if lote:
+            await cargar_lote_bulk(lote, creados, errores, facultades_afectadas)
+    except Exception as e:
+        logger.error("Error en la carga masiva de contenidos: %s", e, extra={
+            "evento": "carga_masiva_error",
+            "total": total,
+            "insertados": len(creados),
+            "fallidos": len(errores),
+            "duracion_ms": round((time.perf_counter() - inicio) * 1000, 2),
+        })
+        respuesta = {"success": False, "error": str(e)}
+    else:
+        respuesta = {"success": True}
+    finally:
+        if facultades_afectadas:
+            await invalidar_respuestas_contenidos(*facultades_afectadas)
+    
+    if muestrear_log():
+        logger.info("Carga masiva: %d contenido(s) creado(s), %d con error", len(creados), len(errores), extra={
+            "evento": "carga_masiva",
+            "total": total,
+            "insertados": len(creados),
+            "fallidos": len(errores),
+            "facultades": sorted(facultades_afectadas),
+            "duracion_ms": round((time.perf_counter() - inicio) * 1000, 2),
+            "sample_rate": min(LOG_SAMPLE_RATE, 1.0),
+        })
+    errores.sort(key=lambda e: e["index"])
+    respuesta.update({
+        "total": total,
+        "inserted": len(creados),
+        "failed": len(errores),
+        "created": sorted(creados, key=lambda c: c["index"]),
+        "errors": errores,
+    })
+    return respuesta
+
+# =========================================================
+# LISTAS DE RELACIONADOS EN SEGUNDO PLANO
+# =========================================================
+
+# Los triggers de init.sql solo encolan las cards creadas o modificadas: un worker con
+# RELATED_WORKER vacía la cola (contenidos_relacionados_procesar, RELATED_BATCH_SIZE cards
+# por transacción) y, cuando queda vacía, vuelve a mirarla cada RELATED_INTERVAL segundos.
+# Cada lote toma antes un advisory lock de transacción en PRIMARY: aunque todos los workers
+# (y todas las instancias de la API) tengan RELATED_WORKER, solo uno procesa a la vez y los
+# demás se limitan a intentar el lock, así que el coste en PRIMARY no crece con el número
+# de CPUs. Con una card por transacción las listas de sus vecinos quedan bloqueadas solo
+# unos milisegundos; con lotes mayores, los borrados esperan a que termine el lote entero.
+RELATED_WORKER = os.getenv("RELATED_WORKER", "true").lower() in ("1", "true", "yes", "on")
+RELATED_BATCH_SIZE = int(os.getenv("RELATED_BATCH_SIZE", "1"))
+RELATED_INTERVAL = float(os.getenv("RELATED_INTERVAL", "1"))
+
+# NULL si otro worker tiene el lock (está procesando un lote)
+PROCESAR_RELACIONADOS_QUERY = escritura("""
+    SELECT CASE WHEN pg_try_advisory_xact_lock(hashtext('contenidos_relacionados_procesar'))
+                THEN contenidos_relacionados_procesar(%s, %s) END
+""")
+
+relacionados_stats = {"processed": 0, "batches": 0, "busy": 0, "errors": 0, "last_batch_ms": None}
+_tarea_relacionados = None
+
+
+async def procesar_relacionados():
+    """Procesar la cola de listas de relacionados mientras viva el worker."""
+    while True:
+        procesadas = 0
+        try:
+            inicio = time.perf_counter()
+            async with db_router.get_async_connection(PROCESAR_RELACIONADOS_QUERY) as conn:
+                with conn.cursor() as cur:
+                    await cur.execute(PROCESAR_RELACIONADOS_QUERY, (RELATED_BATCH_SIZE, RELACIONADOS_GUARDADOS))
+                    procesadas = cur.fetchone()[0]
+            if procesadas is None:
+                relacionados_stats["busy"] += 1
+                procesadas = 0
+            elif procesadas:
+                relacionados_stats["processed"] += procesadas
+                relacionados_stats["batches"] += 1
+                relacionados_stats["last_batch_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        except psycopg2.errors.LockNotAvailable:
+            # Un borrado tenía bloqueada alguna lista (lock_timeout de la función): el lote
+            # se deshizo y sus cards siguen en la cola
+            relacionados_stats["errors"] += 1
+        except Exception as e:
+            relacionados_stats["errors"] += 1
+            logger.warning(f"Error procesando contenidos relacionados: {str(e)}")
+        if procesadas < RELATED_BATCH_SIZE:
+            await asyncio.sleep(RELATED_INTERVAL)
+
+
+@app.on_event("startup")
+async def iniciar_relacionados():
+    global _tarea_relacionados
+    if RELATED_WORKER:
+        _tarea_relacionados = asyncio.get_running_loop().create_task(procesar_relacionados())
+
+
+async def detener_relacionados():
+    global _tarea_relacionados
+    if _tarea_relacionados is not None:
+        _tarea_relacionados.cancel()
+        try:
+            await _tarea_relacionados
+        except asyncio.CancelledError:
+            pass
+        _tarea_relacionados = None
+
+
+# =========================================================
+# CALENTAMIENTO AL ARRANCAR
+# =========================================================
+
+arranque = {"ready": not API_WARMUP, "warmup_ms": None, "prepared": 0, "attempts": 0}
+_tarea_calentamiento = None
+
+
+async def calentar_api():
+    """
+    Cargar facultades y temas en la cache de referencia, preparar las consultas frecuentes
+    en cada conexión abierta y ejecutar una vez la primera página del listado.
+    """
+    inicio = time.perf_counter()
+    arranque["attempts"] += 1
+    await cargar_referencia("facultades", FACULTADES_QUERY)
+    await cargar_referencia("temas", TEMAS_QUERY)
+    busqueda = BUSQUEDA_FEED_QUERY if CONTENIDOS_FEED else BUSQUEDA_QUERY
+    relacionados = RELACIONADOS_FEED_QUERY if CONTENIDOS_FEED else RELACIONADOS_QUERY
+    arranque["prepared"] = await db_router.calentar([FACULTADES_QUERY, TEMAS_QUERY, DETALLE_CONTENIDO_QUERY,
+                                                     busqueda, relacionados])
+    await consultar_contenidos(None, None, CONTENIDOS_LIMIT_DEFAULT, None, parsear_campos(None), False)
+    arranque["warmup_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+    arranque["ready"] = True
+    logger.info("API lista", extra={"evento": "api_lista", "pid": os.getpid(), "warmup_ms": arranque["warmup_ms"],
+                                    "sentencias_preparadas": arranque["prepared"]})
+
+
+async def reintentar_calentamiento():
+    """Repetir el calentamiento hasta que la base de datos responda."""
+    while not arranque["ready"]:
+        await asyncio.sleep(API_WARMUP_RETRY)
+        try:
+            await calentar_api()
+        except Exception as e:
+            logger.warning(f"Calentamiento fallido (intento {arranque['attempts']}), se reintentará: {str(e)}")
+
+
+# Registrado después de abrir_pools e iniciar_listener_cache, así que se ejecuta tras ellos
+@app.on_event("startup")
+async def iniciar_calentamiento():
+    """Calentar la API antes de aceptar peticiones; si la base de datos no responde, seguir en segundo plano."""
+    global _tarea_calentamiento
+    if not API_WARMUP:
+        return
+    try:
+        await calentar_api()
+    except Exception as e:
+        logger.warning(f"Calentamiento fallido, /api/health responderá 503 hasta completarlo: {str(e)}")
+        _tarea_calentamiento = asyncio.get_running_loop().create_task(reintentar_calentamiento())
+
+
+async def detener_calentamiento():
+    global _tarea_calentamiento
+    if _tarea_calentamiento is not None:
+        _tarea_calentamiento.cancel()
+        try:
+            await _tarea_calentamiento
+        except asyncio.CancelledError:
+            pass
+        _tarea_calentamiento = None
+
+
+# Un solo manejador de parada para fijar el orden: las tareas en segundo plano usan los
+# pools, así que se cancelan (y se espera a que terminen) antes de cerrarlos
+@app.on_event("shutdown")
+async def detener_api():
+    """Detener las tareas en segundo plano y después cerrar los pools, dejando terminar las conexiones en uso."""
+    await detener_calentamiento()
+    await detener_relacionados()
+    await detener_listener_cache()
+    await cerrar_cache_respuestas()
+    await db_router.close(API_SHUTDOWN_TIMEOUT)
+
+
 @app.get("/api/health")
-def health_check():
-    """Verificar la salud de la API y las conexiones a las bases de datos."""
+async def health_check():
+    """
+    Verificar la salud de la API y las conexiones a las bases de datos. Responde 503
+    ("starting") hasta que el worker termina el calentamiento.
+    """
     try:
         health_status = {
-            "status": "healthy",
+            "status": "healthy" if arranque["ready"] else "starting",
+            "ready": arranque["ready"],
+            "pid": os.getpid(),
+            "warmup": {clave: arranque[clave] for clave in ("warmup_ms", "prepared", "attempts")},
             "primary": "unknown",
             "replica": "unknown"
         }
         
         # Verificar PRIMARY
         try:
-            with db_router.get_connection(force_primary=True) as conn:
-                cur = conn.cursor()
-                cur.execute("SELECT 1")
-                cur.close()
+            async with db_router.get_async_connection(force_primary=True) as conn:
+                await conn.execute("SELECT 1")
             health_status["primary"] = "connected"
         except Exception as e:
             health_status["primary"] = f"disconnected: {str(e)}"
             health_status["status"] = "unhealthy"
         
         # Verificar REPLICA
-        replica_available = db_router.check_replica_health()
+        replica_available = await db_router.check_replica_health_async()
         health_status["replica"] = "connected" if replica_available else "disconnected"
         
+        # Estadísticas de los pools de conexiones y de las caches
+        health_status["pools"] = db_router.pool_stats()
+        health_status["replica_status"] = db_router.replica_status()
+        health_status["prepared_statements"] = SentenciasPreparadas.stats()
+        health_status["cache"] = reference_cache.stats()
+        health_status["response_cache"] = response_cache.stats()
+        health_status["related_worker"] = dict(relacionados_stats, enabled=RELATED_WORKER)
+        
+        if not arranque["ready"]:
+            return JSONResponse(status_code=503, content=health_status)
         return health_status
     except Exception as e:
         return {
@@ -614,3 +3459,17 @@ def health_check():
             "primary": "unknown",
             "replica": "unknown"
         }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas en formato Prometheus: peticiones por endpoint y sentencias/conexiones por destino."""
+    if not _metricas:
+        raise HTTPException(status_code=503, detail="Métricas desactivadas o prometheus_client no instalado")
+    registro = prometheus_client.REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Varios workers: cada uno escribe sus métricas en ese directorio y aquí se suman
+        from prometheus_client import multiprocess
+        registro = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    return Response(content=prometheus_client.generate_latest(registro), media_type=prometheus_client.CONTENT_TYPE_LATEST)
@@ -0,0 +1,101 @@
+"""
+Borrado de muchos contenidos: DELETE /api/contenidos/{id} uno a uno frente al borrado
+masivo DELETE /api/contenidos por lista de IDs y por filtro (rango de created_at),
+en lotes de DELETE_BATCH_SIZE.
+
+Antes de cada modo crea --rows contenidos sintéticos ("bench_del_...", con 3 tags cada uno
+y fechas del año 2001 para poder filtrarlos) y los borra con el modo correspondiente.
+Muestra contenidos borrados por segundo, el número de transacciones y la duración del
+lote más lento (una petición en el modo uno a uno: cota de lo que se mantienen los
+bloqueos), y verifica que el feed de cards queda consistente.
+
+Uso (con las variables DB_* apuntando a PRIMARY):
+    python benchmarks/bulk_delete.py --rows 20000 --batch 1000
+"""
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from comun import ejecutar
+import app  # noqa: E402
+
+DESDE = datetime(2001, 1, 1)
+HASTA = datetime(2002, 1, 1)
+
+
+async def crear(rows):
+    id_tema, id_facultad = (await ejecutar("SELECT id_tema, id_facultad FROM contenidos LIMIT 1"))[0]
+    await ejecutar("""
+        INSERT INTO contenidos (id_contenido, id_tema, id_facultad, tipo, titulo, resumen, created_at)
+        SELECT 'bench_del_' || g, %s, %s, 'Debate', 'bench_del contenido ' || g, 'Resumen',
+               %s::timestamp + make_interval(secs => g)
+        FROM generate_series(1, %s) AS g
+    """, (id_tema, id_facultad, DESDE, rows))
+    await ejecutar("""
+        INSERT INTO contenido_tags (id_contenido, tag)
+        SELECT 'bench_del_' || g, tag FROM generate_series(1, %s) AS g, unnest(ARRAY['uno', 'dos', 'tres']) AS tag
+    """, (rows,))
+    return [f"bench_del_{g}" for g in range(1, rows + 1)]
+
+
+async def uno_a_uno(ids):
+    duraciones = []
+    for id_contenido in ids:
+        inicio = time.perf_counter()
+        await app.delete_contenido(id_contenido)
+        duraciones.append(time.perf_counter() - inicio)
+    return len(ids), max(duraciones)
+
+
+async def masivo(criterios):
+    anterior = 0.0
+    lote_maximo = 0.0
+    async for estado in app.borrar_contenidos(criterios):
+        if "elapsed_ms" in estado:
+            lote_maximo = max(lote_maximo, estado["elapsed_ms"] / 1000 - anterior)
+            anterior = estado["elapsed_ms"] / 1000
+        else:
+            return estado["batches"], lote_maximo
+
+
+async def main_async(args):
+    app.DELETE_BATCH_SIZE = args.batch
+    await app.db_router.open()
+    try:
+        modos = [
+            ("uno a uno", lambda ids: uno_a_uno(ids[:args.single_rows])),
+            ("masivo (ids)", lambda ids: masivo(app.ContenidosDelete(ids=ids))),
+            ("masivo (filtro)", lambda ids: masivo(app.ContenidosDelete(desde=DESDE, hasta=HASTA))),
+        ]
+        for nombre, modo in modos:
+            ids = await crear(args.rows)
+            inicio = time.perf_counter()
+            transacciones, maxima = await modo(ids)
+            duracion = time.perf_counter() - inicio
+            borrados = args.rows - (await ejecutar("SELECT count(*) FROM contenidos WHERE id_contenido LIKE 'bench_del_%%'"))[0][0]
+            diferencias = (await ejecutar("SELECT count(*) FROM contenidos_feed_diferencias()"))[0][0]
+            await ejecutar("DELETE FROM contenidos WHERE id_contenido LIKE 'bench_del_%%'")
+            print(f"{nombre:<16} {borrados:>7} borrados  {borrados / duracion:9.0f} contenidos/s   "
+                  f"{transacciones:>6} transacciones   lote máx.={maxima * 1000:7.1f} ms   "
+                  f"diferencias en el feed={diferencias}")
+    finally:
+        await ejecutar("DELETE FROM contenidos WHERE id_contenido LIKE 'bench_del_%%'")
+        await app.db_router.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="Contenidos creados (y borrados) por modo")
+    parser.add_argument("--batch", type=int, default=1000, help="DELETE_BATCH_SIZE del borrado masivo")
+    parser.add_argument("--single-rows", type=int, default=2000,
+                        help="Contenidos que se borran uno a uno (el resto se limpia al final)")
+    args = parser.parse_args()
+
+    logging.getLogger("app").setLevel(logging.ERROR)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Throughput de carga de contenidos contra una API en marcha: N peticiones
+POST /api/contenidos (una card por petición, en paralelo) frente a
+POST /api/contenidos/bulk con un array JSON y con NDJSON en streaming.
+
+Muestra filas/segundo y errores por modo. Los contenidos creados llevan el
+título "bench_bulk ..." y se borran al terminar (con las variables DB_*
+apuntando a la base de datos de la API).
+
+Uso:
+    python benchmarks/bulk_insert.py --url http://localhost:8000 --rows 5000
+"""
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from comun import conexion_primary
+
+TAGS = ["democracia", "salud", "economia", "clima", "educacion", "tecnologia"]
+
+
+def peticion(url, cuerpo, content_type="application/json"):
+    req = urllib.request.Request(url, data=cuerpo, headers={"Content-Type": content_type}, method="POST")
+    with urllib.request.urlopen(req, timeout=600) as respuesta:
+        return json.loads(respuesta.read())
+
+
+def obtener(url):
+    with urllib.request.urlopen(url, timeout=30) as respuesta:
+        return json.loads(respuesta.read())["data"]
+
+
+def generar_contenidos(n, facultades, temas):
+    return [
+        {
+            "id_tema": temas[i % len(temas)],
+            "id_facultad": facultades[i % len(facultades)],
+            "tipo": "Debate",
+            "titulo": f"bench_bulk contenido {i}",
+            "resumen": f"Contenido sintético {i} para medir la carga masiva",
+            "tags": [TAGS[i % len(TAGS)], TAGS[(i + 1) % len(TAGS)], TAGS[(i + 3) % len(TAGS)]],
+        }
+        for i in range(n)
+    ]
+
+
+def modo_individual(base, contenidos, concurrencia):
+    def crear(contenido):
+        return peticion(f"{base}/api/contenidos", json.dumps(contenido).encode("utf-8"))["success"]
+
+    with ThreadPoolExecutor(concurrencia) as executor:
+        resultados = list(executor.map(crear, contenidos))
+    return resultados.count(True), resultados.count(False)
+
+
+def modo_array(base, contenidos, _):
+    respuesta = peticion(f"{base}/api/contenidos/bulk", json.dumps(contenidos).encode("utf-8"))
+    return respuesta["inserted"], respuesta["failed"]
+
+
+def modo_ndjson(base, contenidos, _):
+    # Cuerpo iterable: urllib lo envía con Transfer-Encoding: chunked
+    lineas = (json.dumps(contenido).encode("utf-8") + b"\n" for contenido in contenidos)
+    respuesta = peticion(f"{base}/api/contenidos/bulk", lineas, "application/x-ndjson")
+    return respuesta["inserted"], respuesta["failed"]
+
+
+def limpiar():
+    with conexion_primary() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM contenidos WHERE titulo LIKE 'bench_bulk %'")
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="URL base de la API")
+    parser.add_argument("--rows", type=int, default=5000, help="Contenidos por modo")
+    parser.add_argument("--concurrency", type=int, default=20, help="Peticiones en paralelo (modo individual)")
+    args = parser.parse_args()
+
+    facultades = [f["id_facultad"] for f in obtener(f"{args.url}/api/facultades")]
+    temas = [t["id_tema"] for t in obtener(f"{args.url}/api/temas")]
+    contenidos = generar_contenidos(args.rows, facultades, temas)
+    limpiar()
+
+    print(f"{args.rows} contenidos por modo ({args.url})")
+    for nombre, modo in (("individual", modo_individual), ("bulk-json", modo_array), ("bulk-ndjson", modo_ndjson)):
+        inicio = time.perf_counter()
+        insertados, fallidos = modo(args.url, contenidos, args.concurrency)
+        duracion = time.perf_counter() - inicio
+        print(f"{nombre:<12} {insertados / duracion:>9.1f} filas/s   {duracion:7.2f}s   "
+              f"insertados={insertados}  errores={fallidos}")
+        limpiar()
+
+
+if __name__ == "__main__":
+    main()
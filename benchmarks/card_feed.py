@@ -0,0 +1,125 @@
+"""
+Listados y búsqueda de cards: JOIN en vivo (contenidos + facultades + temas + tags)
+frente al feed desnormalizado contenidos_feed (CONTENIDOS_FEED).
+
+Añade contenidos sintéticos con tags (título "bench_feed ...") hasta --rows filas y
+llama N veces a las mismas funciones que usan /api/contenidos (primera página, filtro
+por facultad, página profunda por cursor y búsqueda) y /api/search, sin la cache de
+respuestas. Muestra la latencia por consulta en cada modo y verifica que ambos modos
+devuelven las mismas cards. Los contenidos sintéticos se borran al terminar.
+
+Uso (con las variables DB_* apuntando a la base de datos):
+    python benchmarks/card_feed.py --rows 50000 --runs 300
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+from comun import ejecutar, percentil
+import app  # noqa: E402
+
+TERMINOS = ["salud", "democracia", "clima", "energía", "privacidad", "algoritmos"]
+TAGS = ["democracia", "salud", "economia", "clima", "educacion", "tecnologia"]
+CAMPOS = app.parsear_campos(None)
+
+
+async def completar_hasta(total):
+    actuales = (await ejecutar("SELECT count(*) FROM contenidos"))[0][0]
+    if actuales >= total:
+        return
+    inicio = time.perf_counter()
+    await ejecutar("""
+        INSERT INTO contenidos (id_contenido, id_tema, id_facultad, tipo, titulo, resumen, created_at)
+        SELECT 'bench_feed_' || g, t.id_tema, t.id_facultad, 'Debate',
+               'bench_feed contenido ' || g || ' sobre ' || (%s::text[])[1 + g %% 6],
+               repeat('Resumen sintético para medir el feed de cards. ', 3),
+               now() - make_interval(secs => g)
+        FROM generate_series(%s, %s) AS g
+        CROSS JOIN LATERAL (SELECT id_tema, id_facultad FROM contenidos
+                            WHERE id_contenido NOT LIKE 'bench_feed_%%'
+                            ORDER BY id_contenido OFFSET g %% 20 LIMIT 1) t
+    """, (TERMINOS, actuales, total - 1))
+    await ejecutar("""
+        INSERT INTO contenido_tags (id_contenido, tag)
+        SELECT c.id_contenido, (%s::text[])[1 + (n + length(c.id_contenido)) %% 6]
+        FROM contenidos c CROSS JOIN generate_series(0, 2) AS n
+        WHERE c.id_contenido LIKE 'bench_feed_%%'
+    """, (TAGS,))
+    await ejecutar("ANALYZE contenidos")
+    await ejecutar("ANALYZE contenidos_feed")
+    print(f"{total - actuales} contenidos sintéticos (con el feed mantenido por triggers) "
+          f"en {time.perf_counter() - inicio:.1f}s")
+
+
+async def cursor_profundo(profundidad):
+    """next_cursor de la página que empieza tras `profundidad` filas."""
+    respuesta = await app.consultar_contenidos(None, None, profundidad, None, ["id_contenido"], False)
+    return respuesta["next_cursor"]
+
+
+def consultas(facultades, cursor):
+    """(nombre, corrutina que ejecuta la consulta) de cada tipo medido."""
+    return [
+        ("listado", lambda i: app.consultar_contenidos(None, None, 50, None, CAMPOS, False)),
+        ("facultad", lambda i: app.consultar_contenidos(facultades[i % len(facultades)], None, 50,
+                                                        None, CAMPOS, False)),
+        ("profunda", lambda i: app.consultar_contenidos(None, None, 50, cursor, CAMPOS, False)),
+        ("listado+search", lambda i: app.consultar_contenidos(
+            None, app.construir_tsquery(TERMINOS[i % len(TERMINOS)]), 50, None, CAMPOS, False)),
+        ("/api/search", lambda i: app.buscar_contenidos(app.construir_tsquery(TERMINOS[i % len(TERMINOS)]))),
+    ]
+
+
+async def main_async(args):
+    await app.db_router.open()
+    try:
+        await completar_hasta(args.rows)
+        facultades = [fila[0] for fila in await ejecutar("SELECT id_facultad FROM facultades")]
+        diferencias = (await ejecutar("SELECT count(*) FROM contenidos_feed_diferencias()"))[0][0]
+        print(f"diferencias feed/JOIN antes de medir: {diferencias}")
+
+        resultados = {}
+        for modo, feed in (("join", False), ("feed", True)):
+            app.CONTENIDOS_FEED = feed
+            cursor = await cursor_profundo(min(args.rows // 2, 20000))
+            for nombre, consulta in consultas(facultades, cursor):
+                for i in range(min(args.runs, 20)):  # calentar pools, sentencias y caché de páginas
+                    await consulta(i)
+                latencias = []
+                for i in range(args.runs):
+                    inicio = time.perf_counter()
+                    respuesta = await consulta(i)
+                    latencias.append(time.perf_counter() - inicio)
+                resultados[(modo, nombre)] = (latencias, respuesta["data"])
+
+        print(f"{args.runs} llamadas por consulta, {args.rows} contenidos")
+        for nombre, _ in consultas(facultades, None):
+            lineas = []
+            for modo in ("join", "feed"):
+                latencias, _ = resultados[(modo, nombre)]
+                lineas.append(f"{modo}: p50={percentil(latencias, 50) * 1000:7.3f}ms "
+                              f"p95={percentil(latencias, 95) * 1000:7.3f}ms")
+            media_join = statistics.mean(resultados[("join", nombre)][0])
+            media_feed = statistics.mean(resultados[("feed", nombre)][0])
+            iguales = resultados[("join", nombre)][1] == resultados[("feed", nombre)][1]
+            print(f"{nombre:<15} {'   '.join(lineas)}   x{media_join / media_feed:5.2f}"
+                  f"{'' if iguales else '   ¡RESULTADOS DISTINTOS!'}")
+    finally:
+        await ejecutar("DELETE FROM contenidos WHERE id_contenido LIKE 'bench_feed_%%'")
+        await app.db_router.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="Contenidos en la tabla durante la medición")
+    parser.add_argument("--runs", type=int, default=300, help="Llamadas por consulta y modo")
+    args = parser.parse_args()
+
+    logging.getLogger("app").setLevel(logging.ERROR)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
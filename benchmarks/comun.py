@@ -0,0 +1,55 @@
+"""
+Utilidades compartidas por los benchmarks.
+
+Importar este módulo añade la raíz del repositorio a sys.path, de modo que los scripts
+de benchmarks/ pueden hacer `import app` al ejecutarse como `python benchmarks/x.py`:
+
+    import comun  # noqa: F401  (raíz del repositorio en sys.path)
+    import app  # noqa: E402
+"""
+import os
+import statistics
+import sys
+from contextlib import contextmanager
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por el método del rango más cercano."""
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))]
+
+
+def latencias_ms(valores, percentiles=(50, 95), decimales=2):
+    """Resumen de latencias en segundos como "p50=  1.23ms  p95=  4.56ms  media=  2.00ms"."""
+    ancho = decimales + 5
+    partes = [f"p{p}={percentil(valores, p) * 1000:{ancho}.{decimales}f}ms" for p in percentiles]
+    partes.append(f"media={statistics.mean(valores) * 1000:{ancho}.{decimales}f}ms")
+    return "  ".join(partes)
+
+
+async def ejecutar(sql, params=None):
+    """Ejecutar una sentencia en PRIMARY con el router de la API; retorna las filas o None."""
+    # app se importa al usarla: load_test.py y edge_cache.py no necesitan sus dependencias
+    import app
+
+    async with app.db_router.get_async_connection(force_primary=True) as conn:
+        with conn.cursor() as cur:
+            await cur.execute(sql, params)
+            return cur.fetchall() if cur.description else None
+
+
+@contextmanager
+def conexion_primary():
+    """Conexión psycopg2 síncrona a PRIMARY (preparar datos, verificar); se cierra al salir."""
+    import app
+    import psycopg2
+
+    conn = psycopg2.connect(**app.db_router.primary_connect_kwargs)
+    try:
+        yield conn
+    finally:
+        conn.close()
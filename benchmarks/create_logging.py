@@ -0,0 +1,143 @@
+"""
+Contenidos creados por segundo con POST /api/contenidos según el logging: el anterior
+(~20 logger.info con f-strings por petición más uno por tag, escritos de forma síncrona
+en el hilo de la petición) frente al actual (un evento estructurado por petición, en
+cola y escrito por el hilo del QueueListener), con y sin muestreo.
+
+Llama a create_contenido con --concurrency peticiones simultáneas y escribe el log en un
+archivo temporal (E/S real, como stdout redirigido a un colector). Los contenidos creados
+("bench_log ...") se borran al terminar.
+
+Uso (con las variables DB_* apuntando a PRIMARY):
+    python benchmarks/create_logging.py --requests 2000 --concurrency 8
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+
+import comun  # noqa: F401  (raíz del repositorio en sys.path)
+import app  # noqa: E402
+
+TAGS = ["democracia", "salud", "clima", "energía"]
+
+
+def logs_anteriores(contenido, id_contenido):
+    """Las llamadas a logger.info que hacía create_contenido antes de este cambio."""
+    logger = app.logger
+    logger.info("=" * 80)
+    logger.info("📝 NUEVA SOLICITUD DE CREACIÓN DE CONTENIDO")
+    logger.info("=" * 80)
+    logger.info(f"📚 Facultad: {contenido.id_facultad}")
+    logger.info(f"🎯 Tema: {contenido.id_tema}")
+    logger.info(f"📋 Tipo: {contenido.tipo}")
+    logger.info(f"📌 Título: {contenido.titulo}")
+    logger.info(f"📄 Resumen: {contenido.resumen[:100]}..." if len(contenido.resumen) > 100 else f"📄 Resumen: {contenido.resumen}")
+    logger.info(f"😊 Emoción: {contenido.emocion_dominante} (Intensidad: {contenido.emocion_intensidad or 'N/A'})")
+    logger.info(f"🏷️ Tags: {', '.join(contenido.tags)}")
+    logger.info("-" * 80)
+    logger.info("💾 Conectando a PRIMARY database para escritura...")
+    logger.info("✅ Conexión establecida con PRIMARY database")
+    logger.info("📥 Insertando contenido principal...")
+    logger.info(f"✅ Contenido insertado exitosamente. ID: {id_contenido}")
+    logger.info(f"🏷️ Insertando {len(contenido.tags)} tag(s)...")
+    for tag in contenido.tags:
+        logger.info(f"   ✓ Tag insertado: '{tag.strip()}'")
+    logger.info(f"✅ {len(contenido.tags)} tag(s) insertado(s) exitosamente")
+    logger.info("💾 Cambios confirmados (COMMIT) en PRIMARY database")
+    logger.info("=" * 80)
+    logger.info(f"✨ CONTENIDO CREADO EXITOSAMENTE: {id_contenido}")
+    logger.info("=" * 80)
+    logger.info("")
+
+
+def configurar_anterior(destino):
+    """logging.basicConfig de antes: StreamHandler síncrono con formato de texto."""
+    app.detener_logging()
+    raiz = logging.getLogger()
+    for handler in raiz.handlers[:]:
+        raiz.removeHandler(handler)
+    handler = logging.StreamHandler(destino)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                                           datefmt='%Y-%m-%d %H:%M:%S'))
+    raiz.addHandler(handler)
+    raiz.setLevel(logging.INFO)
+
+
+async def crear(id_tema, id_facultad, i, anterior):
+    contenido = app.ContenidoCreate(
+        id_tema=id_tema, id_facultad=id_facultad, tipo="Debate",
+        titulo=f"bench_log contenido {i}",
+        resumen="Resumen sintético para medir el coste del logging al crear contenidos. " * 2,
+        emocion_dominante="Curiosidad", emocion_intensidad=0.5, tags=TAGS,
+    )
+    respuesta = await app.create_contenido(contenido)
+    if not respuesta["success"]:
+        raise RuntimeError(respuesta["error"])
+    if anterior:
+        logs_anteriores(contenido, respuesta["id_contenido"])
+
+
+async def medir(args, id_tema, id_facultad, anterior):
+    semaforo = asyncio.Semaphore(args.concurrency)
+
+    async def una(i):
+        async with semaforo:
+            await crear(id_tema, id_facultad, i, anterior)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una(i) for i in range(args.requests)))
+    return time.perf_counter() - inicio
+
+
+async def main_async(args):
+    await app.db_router.open()
+    try:
+        async with app.db_router.get_async_connection(force_primary=True) as conn:
+            with conn.cursor() as cur:
+                await cur.execute("SELECT id_tema, id_facultad FROM contenidos LIMIT 1")
+                id_tema, id_facultad = cur.fetchone()
+
+        modos = [
+            ("anterior (texto, síncrono)", True, None, 0.0),
+            ("actual (json, en cola)", False, "json", 1.0),
+            (f"actual (json, muestreo {args.sample_rate})", False, "json", args.sample_rate),
+        ]
+        for nombre, anterior, formato, muestreo in modos:
+            with tempfile.TemporaryFile("w+", encoding="utf-8") as destino:
+                if anterior:
+                    configurar_anterior(destino)
+                else:
+                    app.configurar_logging(destino, formato)
+                # En el modo anterior no se emite el evento nuevo
+                app.LOG_SAMPLE_RATE = muestreo
+                await medir(args, id_tema, id_facultad, anterior)  # calentar
+                duracion = await medir(args, id_tema, id_facultad, anterior)
+                app.detener_logging()  # vacía la cola antes de contar
+                destino.flush()
+                tamano = destino.tell()
+                destino.seek(0)
+                lineas = sum(1 for _ in destino)
+            print(f"{nombre:<32} {args.requests / duracion:8.1f} creados/s   "
+                  f"{duracion / args.requests * 1000:6.2f} ms/creado   "
+                  f"log: {lineas / (2 * args.requests):5.1f} líneas/creado, {tamano / (2 * args.requests):6.0f} B/creado")
+    finally:
+        app.configurar_logging()
+        async with app.db_router.get_async_connection(force_primary=True) as conn:
+            with conn.cursor() as cur:
+                await cur.execute("DELETE FROM contenidos WHERE titulo LIKE 'bench_log %%'")
+        await app.db_router.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Contenidos creados por modo")
+    parser.add_argument("--concurrency", type=int, default=8, help="Peticiones simultáneas")
+    parser.add_argument("--sample-rate", type=float, default=0.1, help="LOG_SAMPLE_RATE del tercer modo")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Micro-cache de Nginx delante de la API: peticiones/s y peticiones que llegan a la API
+con las lecturas calientes de la UI (facultades, temas, listado de cada facultad,
+facetas y búsqueda), atacando directamente la API y a través de Nginx.
+
+Cada hilo mantiene una conexión keep-alive, acepta gzip y repite al azar las mismas
+URLs, como muchos usuarios navegando a la vez. Por modo muestra peticiones/s, p50/p99,
+bytes por respuesta, la distribución de la cabecera X-Edge-Cache (HIT, MISS, UPDATING...)
+y cuántas peticiones llegaron a la API, según el incremento de http_requests_total en
+/metrics (que solo publica el puerto de la API, no Nginx).
+
+Uso (con docker-compose: Nginx en el puerto 80, API en el 8000):
+    python benchmarks/edge_cache.py --url http://localhost --api-url http://localhost:8000 --duration 20
+"""
+import argparse
+import collections
+import http.client
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+
+from comun import percentil
+
+METRICA_PETICIONES = re.compile(r'^http_requests_total\{([^}]*)\} ([0-9.e+]+)$', re.MULTILINE)
+
+
+def conectar(base):
+    url = urllib.parse.urlsplit(base)
+    return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+
+
+def obtener(base, ruta):
+    conn = conectar(base)
+    try:
+        conn.request("GET", ruta)
+        respuesta = conn.getresponse()
+        return respuesta.status, respuesta.read()
+    finally:
+        conn.close()
+
+
+def peticiones_api(api_url):
+    """Total de peticiones GET /api/* atendidas por la API según /metrics (None si no hay métricas)."""
+    try:
+        status, cuerpo = obtener(api_url, "/metrics")
+    except OSError:
+        return None
+    if status != 200:
+        return None
+    return sum(float(valor) for etiquetas, valor in METRICA_PETICIONES.findall(cuerpo.decode("utf-8"))
+               if 'method="GET"' in etiquetas and 'endpoint="/api/' in etiquetas)
+
+
+def rutas(base, search):
+    _, cuerpo = obtener(base, "/api/facultades")
+    facultades = [f["id_facultad"] for f in json.loads(cuerpo)["data"]]
+    return (["/api/facultades", "/api/temas", "/api/contenidos?facultad=Todos", "/api/contenidos/facets",
+             "/api/search?q=" + urllib.parse.quote(search)]
+            + [f"/api/contenidos?facultad={f}" for f in facultades]
+            + [f"/api/contenidos/facets?facultad={f}" for f in facultades])
+
+
+def trabajador(base, lista, semilla, hasta, registros):
+    rng = random.Random(semilla)
+    conn = None
+    while time.monotonic() < hasta:
+        ruta = rng.choice(lista)
+        inicio = time.monotonic()
+        try:
+            if conn is None:
+                conn = conectar(base)
+            conn.request("GET", ruta, headers={"Accept-Encoding": "gzip"})
+            respuesta = conn.getresponse()
+            cuerpo = respuesta.read()
+            registros.append((time.monotonic() - inicio, respuesta.status,
+                              respuesta.getheader("X-Edge-Cache", "-"), len(cuerpo)))
+        except (OSError, http.client.HTTPException):
+            if conn is not None:
+                conn.close()
+            conn = None
+            registros.append((time.monotonic() - inicio, 0, "-", 0))
+
+
+def medir(nombre, base, api_url, lista, args):
+    antes = peticiones_api(api_url)
+    registros = []
+    hasta = time.monotonic() + args.duration
+    hilos = [threading.Thread(target=trabajador, args=(base, lista, args.seed * 1000 + i, hasta, registros))
+             for i in range(args.concurrency)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    despues = peticiones_api(api_url)
+
+    latencias = [latencia for latencia, _, _, _ in registros]
+    errores = sum(1 for _, status, _, _ in registros if not 200 <= status < 300)
+    estados = collections.Counter(estado for _, _, estado, _ in registros)
+    llegadas = f"{despues - antes:8.0f}" if antes is not None and despues is not None else "       ?"
+    print(f"{nombre:<12} {len(registros) / args.duration:9.0f} req/s   "
+          f"p50={percentil(latencias, 50) * 1000:7.2f} ms   p99={percentil(latencias, 99) * 1000:7.2f} ms   "
+          f"{sum(b for _, _, _, b in registros) / len(registros):7.0f} B/resp   errores={errores}   "
+          f"peticiones a la API={llegadas} de {len(registros)}")
+    print(f"{'':<12} X-Edge-Cache: " + ", ".join(f"{estado}={n}" for estado, n in estados.most_common()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost", help="URL base de Nginx")
+    parser.add_argument("--api-url", default="http://localhost:8000", help="URL base de la API (y de /metrics)")
+    parser.add_argument("--duration", type=float, default=20, help="Segundos por modo")
+    parser.add_argument("--concurrency", type=int, default=50, help="Hilos con peticiones en paralelo")
+    parser.add_argument("--search", default="salud", help="Texto de la búsqueda repetida")
+    parser.add_argument("--seed", type=int, default=1, help="Semilla de la elección de URLs")
+    parser.add_argument("--only", choices=["api", "nginx"], help="Medir solo un modo")
+    args = parser.parse_args()
+
+    lista = rutas(args.api_url, args.search)
+    print(f"{len(lista)} URLs, {args.concurrency} hilos, {args.duration:.0f} s por modo")
+    for nombre, base in (("api directa", args.api_url), ("nginx", args.url)):
+        if args.only and not nombre.startswith(args.only):
+            continue
+        medir(nombre, base, args.api_url, lista, args)
+
+
+if __name__ == "__main__":
+    main()
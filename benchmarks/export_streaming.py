@@ -0,0 +1,96 @@
+"""
+Memoria y tiempo hasta el primer byte al exportar muchos contenidos: fetchall() de
+todas las filas + serialización completa (como /api/contenidos sin paginar) frente
+al streaming de /api/contenidos/export (DECLARE/FETCH por lotes).
+
+Añade contenidos sintéticos (título "bench_export ...") hasta cada tamaño pedido,
+mide el pico de memoria de Python (tracemalloc) de cada modo y los borra al terminar.
+
+Uso (con las variables DB_* apuntando a la base de datos):
+    python benchmarks/export_streaming.py --rows 10000,50000,100000
+"""
+import argparse
+import asyncio
+import logging
+import time
+import tracemalloc
+
+from comun import ejecutar
+from psycopg2.extras import RealDictCursor  # noqa: E402
+
+import app  # noqa: E402
+
+
+async def completar_hasta(total):
+    """Insertar contenidos sintéticos hasta que la tabla tenga `total` filas."""
+    actuales = (await ejecutar("SELECT count(*) FROM contenidos"))[0][0]
+    if actuales >= total:
+        return
+    id_tema, id_facultad = (await ejecutar("SELECT id_tema, id_facultad FROM contenidos LIMIT 1"))[0]
+    await ejecutar("""
+        INSERT INTO contenidos (id_contenido, id_tema, id_facultad, tipo, titulo, resumen)
+        SELECT 'bench_export_' || g, %s, %s, 'Debate', 'bench_export contenido ' || g,
+               repeat('Resumen sintético para medir la exportación. ', 6)
+        FROM generate_series(%s, %s) AS g
+    """, (id_tema, id_facultad, actuales, total - 1))
+
+
+async def modo_fetchall(campos):
+    """Todas las filas en una lista de dicts y un único cuerpo JSON."""
+    query, params, _, _ = app.select_contenidos(None, None, campos, columnas_cursor=False)
+    async with app.db_router.get_async_connection(query) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            await cur.execute(query + " ORDER BY c.created_at DESC, c.id_contenido DESC", params)
+            filas = cur.fetchall()
+    cuerpo = app.serializar_respuesta({"success": True, "data": filas})
+    yield cuerpo
+
+
+async def modo_streaming(campos):
+    async for parte in app.exportar_contenidos(None, None, campos, "ndjson"):
+        yield parte
+
+
+async def medir(modo, campos):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    primer_byte = None
+    enviados = 0
+    async for parte in modo(campos):
+        if primer_byte is None:
+            primer_byte = time.perf_counter() - inicio
+        enviados += len(parte)
+    duracion = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico, primer_byte, duracion, enviados
+
+
+async def main_async(args):
+    await app.db_router.open()
+    campos = app.parsear_campos(None)
+    try:
+        for total in sorted(int(n) for n in args.rows.split(",")):
+            await completar_hasta(total)
+            for nombre, modo in (("fetchall", modo_fetchall), ("streaming", modo_streaming)):
+                pico, primer_byte, duracion, enviados = await medir(modo, campos)
+                print(f"{total:>8} filas  {nombre:<10} pico={pico / 2**20:8.1f} MiB  "
+                      f"primer byte={primer_byte * 1000:8.1f}ms  total={duracion:6.2f}s  "
+                      f"cuerpo={enviados / 2**20:7.1f} MiB")
+    finally:
+        await ejecutar("DELETE FROM contenidos WHERE titulo LIKE 'bench_export %%'")
+        await app.db_router.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10000,50000,100000", help="Tamaños de la exportación, separados por comas")
+    args = parser.parse_args()
+
+    logging.getLogger("app").setLevel(logging.ERROR)
+    print(f"EXPORT_FETCH_SIZE={app.EXPORT_FETCH_SIZE}")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Conteos por faceta: lo que costaría hoy obtenerlos desde la UI frente a
+/api/contenidos/facets (una consulta con GROUPING SETS).
+
+- "por valor": una llamada a /api/contenidos con include_total=true por cada facultad
+  (el único filtro por faceta que ofrece el listado), como haría la UI para sus botones.
+- "por faceta": una consulta GROUP BY por faceta (facultad, tema, tipo, emoción y tag).
+- "grouping sets": consultar_facetas, una sola pasada para todas las facetas.
+
+Se mide sin la cache de respuestas, con y sin búsqueda, y se comprueba que los conteos
+por facultad coinciden. Usar con datos a escala (benchmarks/synthetic_data.py).
+
+Uso (con las variables DB_* apuntando a la base de datos):
+    python benchmarks/facets.py --runs 20 --search salud
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+import comun  # noqa: F401  (raíz del repositorio en sys.path)
+import app  # noqa: E402
+
+
+async def ejecutar(sql, params=None):
+    async with app.db_router.get_async_connection(app.lectura(sql)) as conn:
+        with conn.cursor() as cur:
+            await cur.execute(sql, params)
+            return cur.fetchall()
+
+
+async def por_valor(facultades, tsquery):
+    conteos = {}
+    for id_facultad in facultades:
+        respuesta = await app.consultar_contenidos(id_facultad, tsquery, 1, None, ["id_contenido"], True)
+        conteos[id_facultad] = respuesta["total"]
+    return conteos
+
+
+async def por_faceta(facultades, tsquery):
+    tabla = app.tabla_contenidos()
+    busqueda = f" CROSS JOIN to_tsquery('{app.SEARCH_CONFIG}', %s) AS busqueda" if tsquery else ""
+    filtro = " WHERE c.search_vector @@ busqueda" if tsquery else ""
+    params = [tsquery] if tsquery else []
+    conteos = {}
+    for nombre, columna in app.FACETAS_CONTENIDO.items():
+        if nombre == "tag":
+            sql = (f"SELECT t.tag, count(*) FROM {tabla} c{busqueda} "
+                   f"CROSS JOIN LATERAL (SELECT DISTINCT unnest(c.tags) AS tag) t{filtro} GROUP BY 1")
+        else:
+            sql = f"SELECT c.{columna}, count(*) FROM {tabla} c{busqueda}{filtro} GROUP BY 1"
+        filas = await ejecutar(sql, params)
+        if nombre == "facultad":
+            conteos = dict(filas)
+    return conteos
+
+
+async def grouping_sets(facultades, tsquery):
+    respuesta = await app.consultar_facetas(None, tsquery)
+    return {faceta["value"]: faceta["count"] for faceta in respuesta["data"]["facultad"]}
+
+
+async def main_async(args):
+    await app.db_router.open()
+    app.CONTENIDOS_FEED = True
+    try:
+        facultades = [fila[0] for fila in await ejecutar("SELECT id_facultad FROM facultades ORDER BY 1")]
+        total = (await ejecutar("SELECT count(*) FROM contenidos"))[0][0]
+        print(f"{total} contenidos, {len(facultades)} facultades, {args.runs} repeticiones")
+        for etiqueta, tsquery in (("sin filtro", None), (f"search={args.search}", app.construir_tsquery(args.search))):
+            referencia = None
+            for nombre, funcion in (("por valor", por_valor), ("por faceta", por_faceta),
+                                    ("grouping sets", grouping_sets)):
+                conteos = await funcion(facultades, tsquery)  # calentar
+                latencias = []
+                for _ in range(args.runs):
+                    inicio = time.perf_counter()
+                    await funcion(facultades, tsquery)
+                    latencias.append(time.perf_counter() - inicio)
+                conteos = {clave: valor for clave, valor in conteos.items() if valor}
+                referencia = referencia if referencia is not None else conteos
+                print(f"{etiqueta:<16} {nombre:<14} media={statistics.mean(latencias) * 1000:8.2f} ms   "
+                      f"min={min(latencias) * 1000:8.2f} ms"
+                      f"{'' if conteos == referencia else '   ¡CONTEOS POR FACULTAD DISTINTOS!'}")
+    finally:
+        await app.db_router.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="Repeticiones por modo")
+    parser.add_argument("--search", default="salud", help="Texto de búsqueda del segundo escenario")
+    args = parser.parse_args()
+
+    logging.getLogger("app").setLevel(logging.ERROR)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Verificación del feed de cards (contenidos_feed) frente al JOIN en vivo.
+
+Sin opciones, lista las diferencias actuales (contenidos_feed_diferencias()) y termina
+con código 1 si las hay; con --repair además las corrige (contenidos_feed_reconstruir()).
+
+Con --exercise ejecuta, dentro de una transacción que se deshace al final, las escrituras
+que mantienen el feed los triggers de init.sql y verifica el feed tras cada una:
+alta de contenidos, alta/cambio/baja de tags, cambio de id y de título, renombrar un tema,
+cambiar el color de una facultad y borrar contenidos.
+
+Uso (con las variables DB_* apuntando a la base de datos):
+    python benchmarks/feed_consistency.py --exercise
+    python benchmarks/feed_consistency.py --repair
+"""
+import argparse
+import sys
+
+from comun import conexion_primary
+
+
+def diferencias(cur):
+    cur.execute("SELECT id_contenido, problema FROM contenidos_feed_diferencias() ORDER BY 1")
+    return cur.fetchall()
+
+
+def ejercitar(cur):
+    """Escrituras de prueba; retorna [(paso, diferencias)]."""
+    cur.execute("SELECT id_tema, id_facultad FROM contenidos LIMIT 1")
+    id_tema, id_facultad = cur.fetchone()
+    pasos = [
+        ("alta de contenidos", """
+            INSERT INTO contenidos (id_contenido, id_tema, id_facultad, tipo, titulo, resumen)
+            VALUES ('feed_check_1', %(tema)s, %(facultad)s, 'Debate', 'feed_check uno', 'Resumen'),
+                   ('feed_check_2', %(tema)s, %(facultad)s, 'Debate', 'feed_check dos', 'Resumen')
+        """),
+        ("alta de tags", """
+            INSERT INTO contenido_tags (id_contenido, tag)
+            VALUES ('feed_check_1', 'uno'), ('feed_check_1', 'dos'), ('feed_check_2', 'tres')
+        """),
+        ("cambio de tags", "UPDATE contenido_tags SET tag = 'cuatro' WHERE id_contenido = 'feed_check_1' AND tag = 'dos'"),
+        ("baja de tags", "DELETE FROM contenido_tags WHERE id_contenido = 'feed_check_2'"),
+        ("cambio de título", "UPDATE contenidos SET titulo = 'feed_check uno (editado)' WHERE id_contenido = 'feed_check_1'"),
+        ("cambio de id", "UPDATE contenidos SET id_contenido = 'feed_check_3' WHERE id_contenido = 'feed_check_2'"),
+        ("renombrar tema", "UPDATE temas SET nombre = nombre || ' (feed_check)' WHERE id_tema = %(tema)s"),
+        ("color de facultad", "UPDATE facultades SET color_hex = '#123456' WHERE id_facultad = %(facultad)s"),
+        ("borrar contenidos", "DELETE FROM contenidos WHERE id_contenido LIKE 'feed_check_%%'"),
+    ]
+    resultados = []
+    for nombre, sql in pasos:
+        cur.execute(sql, {"tema": id_tema, "facultad": id_facultad})
+        resultados.append((nombre, diferencias(cur)))
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repair", action="store_true", help="Corregir las diferencias encontradas")
+    parser.add_argument("--exercise", action="store_true", help="Verificar los triggers con escrituras de prueba")
+    args = parser.parse_args()
+
+    errores = 0
+    with conexion_primary() as conn:
+        with conn.cursor() as cur:
+            actuales = diferencias(cur)
+            cur.execute("SELECT count(*) FROM contenidos_feed")
+            print(f"contenidos_feed: {cur.fetchone()[0]} cards, {len(actuales)} diferencias")
+            for id_contenido, problema in actuales[:20]:
+                print(f"  {problema:<9} {id_contenido}")
+            if actuales and args.repair:
+                cur.execute("SELECT contenidos_feed_reconstruir()")
+                print(f"reparadas: {cur.fetchone()[0]}, diferencias restantes: {len(diferencias(cur))}")
+                conn.commit()
+            elif actuales:
+                errores += 1
+
+            if args.exercise:
+                for paso, encontradas in ejercitar(cur):
+                    print(f"{paso:<20} {'OK' if not encontradas else f'{len(encontradas)} diferencias: {encontradas}'}")
+                    errores += bool(encontradas)
+                conn.rollback()
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Creación concurrente de contenidos: esquema de IDs anterior (SELECT de verificación
+en PRIMARY + INSERT) frente al actual (sufijo ordenable + INSERT ... ON CONFLICT).
+
+Lanza N creaciones en paralelo por cada esquema, todas con el mismo título para
+forzar el peor caso del esquema anterior (hash del título + segundos), y muestra
+latencia por creación, IDs regenerados por colisión (el SELECT de verificación o el
+ON CONFLICT DO NOTHING los detectan), errores (IntegrityError u otros) y filas
+insertadas. La clave primaria impide que queden IDs duplicados en la tabla: las
+colisiones se ven en los reintentos y los errores. El esquema actual se mide a
+través del endpoint `create_contenido`, el mismo código que sirve la API, y el
+benchmark falla si tiene algún error o si no inserta una fila por creación.
+
+Uso (con las variables DB_* apuntando a la base de datos):
+    python benchmarks/id_generation.py --creates 5000 --concurrency 100
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import datetime
+
+from comun import latencias_ms
+import psycopg2  # noqa: E402
+
+import app  # noqa: E402
+
+TITULO = "bench_id colisiones"
+
+
+def resumen(nombre, latencias, duracion, reintentos, errores, filas):
+    print(
+        f"{nombre:<9} {len(latencias) / duracion:>8.1f} creates/s   "
+        f"{latencias_ms(latencias)}  "
+        f"reintentos={reintentos}  integrity_errors={errores['integrity']}  "
+        f"otros_errores={errores['otros']}  filas={filas}/{len(latencias)}"
+    )
+
+
+def datos_contenido(facultad, tema):
+    return app.ContenidoCreate(
+        id_tema=tema, id_facultad=facultad, tipo="Debate",
+        titulo=TITULO, resumen="Contenido generado por benchmarks/id_generation.py",
+    )
+
+
+async def crear_anterior(contenido, contador):
+    """Reproducción del flujo anterior: ID con segundos + hasta 10 SELECT de verificación."""
+    id_base = (f"{contenido.id_facultad.lower()}_deb_"
+               f"{hashlib.md5(contenido.titulo.encode('utf-8')).hexdigest()[:8]}_"
+               f"{str(int(datetime.now().timestamp()))[-6:]}")
+    id_contenido = id_base
+    check = "SELECT COUNT(*) FROM contenidos WHERE id_contenido = %s"
+    for _ in range(10):
+        async with app.db_router.get_async_connection(check, force_primary=True) as conn:
+            with conn.cursor() as cur:
+                await cur.execute(check, (id_contenido,))
+                if cur.fetchone()[0] == 0:
+                    break
+        contador["reintentos"] += 1
+        id_contenido = f"{id_base}_{str(int(datetime.now().timestamp()))[-4:]}"
+    async with app.db_router.get_async_connection(force_primary=True) as conn:
+        async with conn.transaction():
+            with conn.cursor() as cur:
+                await cur.execute(
+                    "INSERT INTO contenidos (id_contenido, id_tema, id_facultad, tipo, titulo, resumen) "
+                    "VALUES (%s, %s, %s, %s, %s, %s)",
+                    (id_contenido, contenido.id_tema, contenido.id_facultad,
+                     contenido.tipo, contenido.titulo, contenido.resumen),
+                )
+    return id_contenido
+
+
+async def crear_actual(contenido, contador):
+    respuesta = await app.create_contenido(contenido)
+    if not respuesta["success"]:
+        # create_contenido convierte el IntegrityError en una respuesta de error
+        if respuesta["error"].startswith("Error de integridad"):
+            raise psycopg2.IntegrityError(respuesta["error"])
+        raise RuntimeError(respuesta["error"])
+    return respuesta["id_contenido"]
+
+
+def contar_ids_generados(contador):
+    """
+    Cuenta los IDs que genera create_contenido: cada uno de más sobre el número de
+    creaciones es un reintento tras un ON CONFLICT DO NOTHING que no insertó nada.
+    """
+    generar = app.generar_id_contenido
+
+    def generar_contando(*args):
+        contador["generados"] += 1
+        return generar(*args)
+
+    app.generar_id_contenido = generar_contando
+    return generar
+
+
+async def ejecutar(crear, contenido, total, concurrencia):
+    semaforo = asyncio.Semaphore(concurrencia)
+    latencias = []
+    contador = {"reintentos": 0, "generados": 0}
+    errores = {"integrity": 0, "otros": 0}
+
+    async def una_creacion():
+        async with semaforo:
+            inicio = time.perf_counter()
+            try:
+                await crear(contenido, contador)
+            except psycopg2.IntegrityError:
+                errores["integrity"] += 1
+            except Exception:
+                errores["otros"] += 1
+            latencias.append(time.perf_counter() - inicio)
+
+    generar = contar_ids_generados(contador)
+    inicio = time.perf_counter()
+    try:
+        await asyncio.gather(*(una_creacion() for _ in range(total)))
+    finally:
+        app.generar_id_contenido = generar
+    duracion = time.perf_counter() - inicio
+    reintentos = contador["reintentos"] + max(0, contador["generados"] - total)
+    return latencias, duracion, reintentos, errores, await contar_filas()
+
+
+async def contar_filas():
+    async with app.db_router.get_async_connection(force_primary=True) as conn:
+        with conn.cursor() as cur:
+            await cur.execute("SELECT count(*) FROM contenidos WHERE titulo = %s", (TITULO,))
+            return cur.fetchone()[0]
+
+
+async def limpiar():
+    async with app.db_router.get_async_connection(force_primary=True) as conn:
+        await conn.execute("DELETE FROM contenidos WHERE titulo = %s", (TITULO,))
+
+
+async def main_async(args):
+    await app.db_router.open()
+    try:
+        async with app.db_router.get_async_connection(force_primary=True) as conn:
+            with conn.cursor() as cur:
+                await cur.execute("SELECT id_facultad FROM facultades ORDER BY id_facultad LIMIT 1")
+                facultad = cur.fetchone()[0]
+                await cur.execute("SELECT id_tema FROM temas ORDER BY id_tema LIMIT 1")
+                tema = cur.fetchone()[0]
+        contenido = datos_contenido(facultad, tema)
+
+        await limpiar()
+        for nombre, crear in (("anterior", crear_anterior), ("actual", crear_actual)):
+            latencias, duracion, reintentos, errores, filas = await ejecutar(
+                crear, contenido, args.creates, args.concurrency)
+            resumen(nombre, latencias, duracion, reintentos, errores, filas)
+            await limpiar()
+        # errores y filas son los del esquema actual, el último medido
+        if errores["integrity"] or errores["otros"] or filas != args.creates:
+            raise SystemExit(f"El esquema actual tuvo {errores['integrity'] + errores['otros']} errores "
+                             f"e insertó {filas} de {args.creates} contenidos")
+    finally:
+        await app.db_router.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--creates", type=int, default=5000, help="Creaciones por esquema")
+    parser.add_argument("--concurrency", type=int, default=100, help="Creaciones en vuelo")
+    args = parser.parse_args()
+
+    # Los logs detallados de create_contenido dominarían el tiempo medido
+    logging.getLogger("app").setLevel(logging.ERROR)
+    print(f"{args.creates} creaciones por esquema, concurrencia={args.concurrency}")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
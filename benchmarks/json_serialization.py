@@ -0,0 +1,98 @@
+"""
+Peticiones/segundo de /api/contenidos con páginas grandes: canal anterior (RealDictCursor
++ jsonable_encoder + json.dumps) frente al actual (tuplas + dicts compactos + orjson).
+
+Cada petición ejecuta la misma consulta paginada que el endpoint (sin cache de respuestas)
+y serializa el cuerpo. Se muestra req/s y el tiempo de serialización por petición para
+cada tamaño de página. Añade contenidos sintéticos ("bench_json ...") si hacen falta
+filas y los borra al terminar.
+
+Uso (con las variables DB_* apuntando a la base de datos):
+    python benchmarks/json_serialization.py --rows 1000,10000 --requests 50
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from comun import ejecutar
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from psycopg2.extras import RealDictCursor  # noqa: E402
+
+import app  # noqa: E402
+
+
+async def completar_hasta(total):
+    actuales = (await ejecutar("SELECT count(*) FROM contenidos"))[0][0]
+    if actuales >= total:
+        return
+    id_tema, id_facultad = (await ejecutar("SELECT id_tema, id_facultad FROM contenidos LIMIT 1"))[0]
+    await ejecutar("""
+        INSERT INTO contenidos (id_contenido, id_tema, id_facultad, tipo, titulo, resumen,
+                                emocion_dominante, emocion_intensidad)
+        SELECT 'bench_json_' || g, %s, %s, 'Debate', 'bench_json contenido ' || g,
+               repeat('Resumen sintético para medir la serialización. ', 4), 'Curiosidad', 0.5
+        FROM generate_series(%s, %s) AS g
+    """, (id_tema, id_facultad, actuales, total - 1))
+
+
+async def pagina_anterior(campos, limit):
+    """Reproducción del canal anterior: filas RealDictRow y jsonable_encoder."""
+    query, params, _, _ = app.select_contenidos(None, None, campos)
+    query += " ORDER BY c.created_at DESC, c.id_contenido DESC LIMIT %s"
+    async with app.db_router.get_async_connection(query) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            await cur.execute(query, params + [limit + 1])
+            contenidos = cur.fetchall()
+    contenidos = contenidos[:limit]
+    inicio = time.perf_counter()
+    cuerpo = json.dumps(jsonable_encoder({"success": True, "data": contenidos, "next_cursor": None}),
+                        ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    return cuerpo, time.perf_counter() - inicio
+
+
+async def pagina_actual(campos, limit):
+    respuesta = await app.consultar_contenidos(None, None, limit, None, campos, False)
+    inicio = time.perf_counter()
+    cuerpo = app.serializar_respuesta(respuesta)
+    return cuerpo, time.perf_counter() - inicio
+
+
+async def main_async(args):
+    await app.db_router.open()
+    campos = app.parsear_campos(None)
+    try:
+        tamanos = sorted(int(n) for n in args.rows.split(","))
+        await completar_hasta(max(tamanos) + 1)
+        for limit in tamanos:
+            for nombre, pagina in (("anterior", pagina_anterior), ("actual", pagina_actual)):
+                await pagina(campos, limit)  # calentar
+                serializacion = 0.0
+                inicio = time.perf_counter()
+                for _ in range(args.requests):
+                    cuerpo, segundos = await pagina(campos, limit)
+                    serializacion += segundos
+                duracion = time.perf_counter() - inicio
+                print(f"{limit:>6} filas  {nombre:<9} {args.requests / duracion:8.1f} req/s   "
+                      f"{duracion / args.requests * 1000:8.2f} ms/req   "
+                      f"serialización={serializacion / args.requests * 1000:7.2f} ms/req   "
+                      f"cuerpo={len(cuerpo) / 1024:7.1f} KiB")
+    finally:
+        await ejecutar("DELETE FROM contenidos WHERE titulo LIKE 'bench_json %%'")
+        await app.db_router.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="1000,10000", help="Filas por página, separadas por comas")
+    parser.add_argument("--requests", type=int, default=50, help="Peticiones por modo y tamaño")
+    args = parser.parse_args()
+
+    logging.getLogger("app").setLevel(logging.ERROR)
+    print(f"serializador: {'orjson' if app.orjson is not None else 'json'}")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Prueba de carga de la API completa (nginx/API/PRIMARY/réplicas) con cargas de trabajo
+guionizadas y una línea base en JSON para detectar regresiones entre ejecuciones.
+
+Cada hilo mantiene una conexión HTTP keep-alive y elige la siguiente operación según la
+mezcla (--mix), durante --duration segundos (descartando los --warmup primeros):
+
+- browse: GET /api/contenidos de una facultad; a veces sigue el next_cursor anterior
+- search: GET /api/search con una palabra de los títulos existentes
+- detail: GET /api/contenidos/{id} de un contenido existente
+- create: POST /api/contenidos (título "load_test ...")
+- delete: DELETE /api/contenidos/{id} de un contenido creado por la propia prueba
+
+Por operación y en total muestra peticiones/s, p50/p95/p99, tasa de errores y viajes a
+la base de datos por petición (cabecera X-DB-Round-Trips). Con --output guarda el
+resultado en JSON; con --baseline lo compara con un resultado anterior y termina con
+código 1 si hay regresiones (peticiones/s, p50 o p95 peores que --tolerance, p99 peor
+que el doble, más errores o más viajes a la base de datos). Los contenidos creados se borran al terminar.
+
+Uso:
+    python benchmarks/synthetic_data.py --contenidos 100000
+    python benchmarks/load_test.py --url http://localhost:8000 --duration 60 --output baseline.json
+    python benchmarks/load_test.py --url http://localhost:8000 --duration 60 --baseline baseline.json
+"""
+import argparse
+import collections
+import http.client
+import json
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timezone
+
+from comun import percentil
+
+MEZCLAS = {
+    "mixed": "browse=55,search=15,detail=25,create=3,delete=2",
+    "read": "browse=60,search=15,detail=25",
+    "write": "browse=20,detail=20,create=35,delete=25",
+}
+OPERACIONES = ["browse", "search", "detail", "create", "delete"]
+
+# Sin cache de respuestas: un token de consistencia "0/0" no espera a ninguna réplica
+# pero hace que la API resuelva la lectura contra la base de datos
+CABECERAS_SIN_CACHE = {"X-Consistency-Token": "0/0"}
+
+
+def parsear_mezcla(texto):
+    mezcla = {}
+    for parte in MEZCLAS.get(texto, texto).split(","):
+        nombre, _, peso = parte.partition("=")
+        nombre = nombre.strip()
+        if nombre not in OPERACIONES:
+            raise ValueError(f"Operación desconocida en --mix: {nombre}")
+        mezcla[nombre] = float(peso)
+    return mezcla
+
+
+class Cliente:
+    """Conexión HTTP keep-alive de un hilo; se reconecta tras cualquier error."""
+
+    def __init__(self, base):
+        url = urllib.parse.urlsplit(base)
+        self.host, self.port = url.hostname, url.port or 80
+        self.conn = None
+
+    def peticion(self, metodo, ruta, cuerpo=None, cabeceras=None):
+        """Retorna (status, cuerpo JSON o None, viajes a la BD o None); status 0 si falla la red."""
+        cabeceras = dict(cabeceras or {})
+        datos = None
+        if cuerpo is not None:
+            datos = json.dumps(cuerpo).encode("utf-8")
+            cabeceras["Content-Type"] = "application/json"
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.conn.request(metodo, ruta, body=datos, headers=cabeceras)
+            respuesta = self.conn.getresponse()
+            contenido = respuesta.read()
+            viajes = respuesta.getheader("X-DB-Round-Trips")
+            return (respuesta.status, json.loads(contenido) if contenido else None,
+                    int(viajes) if viajes is not None else None)
+        except (OSError, http.client.HTTPException, ValueError):
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+            return 0, None, None
+
+
+class Carga:
+    """Estado compartido por los hilos: datos de referencia e ids creados por la prueba."""
+
+    def __init__(self, base, bypass_cache):
+        self.base = base
+        self.lectura = CABECERAS_SIN_CACHE if bypass_cache else {}
+        cliente = Cliente(base)
+        self.facultades = [f["id_facultad"] for f in cliente.peticion("GET", "/api/facultades")[1]["data"]]
+        self.temas = [t["id_tema"] for t in cliente.peticion("GET", "/api/temas")[1]["data"]]
+        self.ids = []
+        palabras = set()
+        for facultad in self.facultades:
+            _, respuesta, _ = cliente.peticion(
+                "GET", f"/api/contenidos?facultad={facultad}&fields=id_contenido,titulo&limit=200")
+            for contenido in respuesta["data"]:
+                self.ids.append(contenido["id_contenido"])
+                palabras.update(re.findall(r"[^\W\d_]{5,}", contenido["titulo"].lower()))
+        if not self.ids:
+            raise SystemExit("La base de datos no tiene contenidos: ejecuta antes synthetic_data.py")
+        # Términos de búsqueda y de los contenidos creados
+        self.palabras = sorted(palabras)
+        self.creados = collections.deque()
+
+    def ejecutar(self, operacion, cliente, rng, estado):
+        """Una operación; retorna (operación realizada, status, viajes a la BD)."""
+        if operacion == "delete":
+            try:
+                id_contenido = self.creados.popleft()
+            except IndexError:
+                operacion = "create"  # Aún no hay nada que borrar
+            else:
+                status, _, viajes = cliente.peticion("DELETE", f"/api/contenidos/{id_contenido}")
+                return operacion, status, viajes
+
+        if operacion == "create":
+            n = rng.randrange(10**9)
+            status, respuesta, viajes = cliente.peticion("POST", "/api/contenidos", {
+                "id_tema": rng.choice(self.temas),
+                "id_facultad": rng.choice(self.facultades),
+                "tipo": "Debate",
+                "titulo": f"load_test {rng.choice(self.palabras)} {n}",
+                "resumen": f"Contenido creado por la prueba de carga sobre {rng.choice(self.palabras)}",
+                "tags": [rng.choice(self.palabras) for _ in range(3)],
+            })
+            if respuesta and respuesta.get("success"):
+                self.creados.append(respuesta["id_contenido"])
+            return operacion, status, viajes
+
+        if operacion == "browse":
+            # Tres de cada diez veces, la página siguiente de la facultad anterior
+            facultad, cursor = estado.get("browse", (None, None))
+            if cursor and rng.random() < 0.3:
+                ruta = f"/api/contenidos?facultad={facultad}&limit=20&cursor={urllib.parse.quote(cursor)}"
+            else:
+                facultad = rng.choice(self.facultades)
+                ruta = f"/api/contenidos?facultad={facultad}&limit=20"
+            status, respuesta, viajes = cliente.peticion("GET", ruta, cabeceras=self.lectura)
+            estado["browse"] = (facultad, (respuesta or {}).get("next_cursor"))
+            return operacion, status, viajes
+
+        if operacion == "search":
+            termino = urllib.parse.quote(rng.choice(self.palabras))
+            status, _, viajes = cliente.peticion("GET", f"/api/search?q={termino}", cabeceras=self.lectura)
+            return operacion, status, viajes
+
+        status, _, viajes = cliente.peticion("GET", f"/api/contenidos/{rng.choice(self.ids)}")
+        return operacion, status, viajes
+
+    def limpiar(self):
+        cliente = Cliente(self.base)
+        while self.creados:
+            cliente.peticion("DELETE", f"/api/contenidos/{self.creados.popleft()}")
+
+
+def trabajador(carga, mezcla, semilla, desde, hasta, registros):
+    rng = random.Random(semilla)
+    cliente = Cliente(carga.base)
+    nombres, pesos = list(mezcla), list(mezcla.values())
+    estado = {}
+    while True:
+        inicio = time.monotonic()
+        if inicio >= hasta:
+            break
+        operacion, status, viajes = carga.ejecutar(rng.choices(nombres, pesos)[0], cliente, rng, estado)
+        if inicio >= desde:
+            registros.append((operacion, time.monotonic() - inicio, 200 <= status < 300, viajes))
+
+
+def resumir(registros, duracion):
+    latencias = [latencia for _, latencia, _, _ in registros]
+    viajes = [v for _, _, ok, v in registros if ok and v is not None]
+    errores = sum(1 for _, _, ok, _ in registros if not ok)
+    return {
+        "requests": len(registros),
+        "rps": round(len(registros) / duracion, 2),
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 3),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 3),
+        "error_rate": round(errores / len(registros), 5),
+        "db_round_trips": round(sum(viajes) / len(viajes), 3) if viajes else None,
+    }
+
+
+def comparar(actual, base, tolerancia, suelo_ms):
+    """Regresiones de `actual` frente a `base` (mismo formato que --output)."""
+    regresiones = []
+    for nombre, metricas in [("total", actual["total"])] + sorted(actual["operations"].items()):
+        anterior = base["total"] if nombre == "total" else base["operations"].get(nombre)
+        if anterior is None:
+            continue
+        if metricas["rps"] < anterior["rps"] * (1 - tolerancia):
+            regresiones.append(f"{nombre}: rps {anterior['rps']} -> {metricas['rps']}")
+        # La p99 de unos pocos miles de peticiones es ruidosa: se le admite el doble de variación
+        for clave, margen in (("p50_ms", tolerancia), ("p95_ms", tolerancia), ("p99_ms", 2 * tolerancia)):
+            if (metricas[clave] > anterior[clave] * (1 + margen)
+                    and metricas[clave] - anterior[clave] > suelo_ms):
+                regresiones.append(f"{nombre}: {clave} {anterior[clave]} -> {metricas[clave]}")
+        if metricas["error_rate"] > anterior["error_rate"] + 0.01:
+            regresiones.append(f"{nombre}: error_rate {anterior['error_rate']} -> {metricas['error_rate']}")
+        if (metricas["db_round_trips"] is not None and anterior["db_round_trips"] is not None
+                and metricas["db_round_trips"] > anterior["db_round_trips"] + 0.05):
+            regresiones.append(f"{nombre}: db_round_trips {anterior['db_round_trips']} -> {metricas['db_round_trips']}")
+    return regresiones
+
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def imprimir(resultado, base=None):
+    print(f"{'operación':<8} {'peticiones':>10} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'errores':>8} {'viajes BD':>9}")
+    for nombre, metricas in sorted(resultado["operations"].items()) + [("total", resultado["total"])]:
+        viajes = "-" if metricas["db_round_trips"] is None else f"{metricas['db_round_trips']:.2f}"
+        linea = (f"{nombre:<8} {metricas['requests']:>10} {metricas['rps']:>9.1f} {metricas['p50_ms']:>8.2f} "
+                 f"{metricas['p95_ms']:>8.2f} {metricas['p99_ms']:>8.2f} {metricas['error_rate'] * 100:>7.2f}% "
+                 f"{viajes:>9}")
+        anterior = base and (base["total"] if nombre == "total" else base["operations"].get(nombre))
+        if anterior:
+            linea += (f"   base: {anterior['rps']:.1f} req/s, p95 {anterior['p95_ms']:.2f} ms "
+                      f"({(metricas['rps'] / anterior['rps'] - 1) * 100:+.1f}% req/s)")
+        print(linea)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="URL base de la API (o de nginx)")
+    parser.add_argument("--duration", type=float, default=60, help="Segundos medidos")
+    parser.add_argument("--warmup", type=float, default=5, help="Segundos iniciales que no se miden")
+    parser.add_argument("--concurrency", type=int, default=20, help="Hilos con peticiones en paralelo")
+    parser.add_argument("--mix", default="mixed",
+                        help=f"Mezcla: {', '.join(MEZCLAS)} o pesos explícitos (browse=60,detail=40)")
+    parser.add_argument("--bypass-cache", action="store_true", help="Lecturas sin la cache de respuestas")
+    parser.add_argument("--seed", type=int, default=1, help="Semilla de la elección de operaciones")
+    parser.add_argument("--output", help="Guardar el resultado en este fichero JSON")
+    parser.add_argument("--baseline", help="Resultado JSON anterior con el que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Variación admitida en req/s y latencias respecto a la base (0.15 = 15%%)")
+    parser.add_argument("--latency-floor-ms", type=float, default=1.0,
+                        help="Diferencia mínima de latencia (ms) para considerarla regresión")
+    args = parser.parse_args()
+
+    try:
+        mezcla = parsear_mezcla(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    carga = Carga(args.url, args.bypass_cache)
+    print(f"{args.url}: {len(carga.facultades)} facultades, {len(carga.temas)} temas, "
+          f"{len(carga.ids)} contenidos para el detalle; mezcla {mezcla}, {args.concurrency} hilos")
+
+    registros = []
+    inicio = time.monotonic()
+    desde, hasta = inicio + args.warmup, inicio + args.warmup + args.duration
+    hilos = [threading.Thread(target=trabajador, args=(carga, mezcla, args.seed * 1000 + i, desde, hasta, registros))
+             for i in range(args.concurrency)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    carga.limpiar()
+
+    if not registros:
+        raise SystemExit("No se completó ninguna petición")
+    por_operacion = collections.defaultdict(list)
+    for registro in registros:
+        por_operacion[registro[0]].append(registro)
+    resultado = {
+        "meta": {
+            "url": args.url, "duration": args.duration, "warmup": args.warmup,
+            "concurrency": args.concurrency, "mix": mezcla, "bypass_cache": args.bypass_cache,
+            "seed": args.seed, "commit": commit_actual(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "total": resumir(registros, args.duration),
+        "operations": {nombre: resumir(lista, args.duration) for nombre, lista in por_operacion.items()},
+    }
+
+    base = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            base = json.load(f)
+    imprimir(resultado, base)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"resultado guardado en {args.output}")
+    if base is not None:
+        regresiones = comparar(resultado, base, args.tolerance, args.latency_floor_ms)
+        if base["meta"].get("mix") != mezcla or base["meta"].get("concurrency") != args.concurrency:
+            print("aviso: la base se midió con otra mezcla o concurrencia")
+        for regresion in regresiones:
+            print(f"REGRESIÓN {regresion}")
+        if regresiones:
+            sys.exit(1)
+        print(f"sin regresiones frente a {args.baseline} (tolerancia {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Sentencias preparadas: las queries calientes de la API (listado de /api/contenidos,
+detalle y /api/search) ejecutadas como SQL normal frente a PREPARE/EXECUTE.
+
+Cada modo llama N veces a las mismas funciones que usan los endpoints (sin la cache
+de respuestas) con parámetros variados y muestra la latencia por llamada. Si la base
+de datos tiene pg_stat_statements (shared_preload_libraries, con
+pg_stat_statements.track_planning=on) se reinician sus estadísticas antes de cada modo
+y se muestran el tiempo de planificación y de ejecución que registra PostgreSQL. Sin
+pg_stat_statements, el tiempo de planificación se mide con EXPLAIN (ANALYZE, SUMMARY).
+
+Uso (con las variables DB_* apuntando a la base de datos, p. ej. docker compose):
+    python benchmarks/prepared_statements.py --runs 2000
+"""
+import argparse
+import asyncio
+import logging
+import re
+import statistics
+import time
+
+from comun import latencias_ms
+import psycopg2  # noqa: E402
+
+import app  # noqa: E402
+
+TERMINOS = ["salud", "democracia", "clima", "inteligencia artificial", "energía", "privacidad"]
+CAMPOS = app.parsear_campos(None)
+
+
+async def consultar(conn, sql, params=None):
+    with conn.cursor() as cur:
+        await cur.execute(sql, params)
+        return cur.fetchall() if cur.description else None
+
+
+async def pg_stat_statements(conn) -> bool:
+    """Preparar pg_stat_statements si el servidor lo tiene cargado."""
+    try:
+        await consultar(conn, "CREATE EXTENSION IF NOT EXISTS pg_stat_statements")
+        await consultar(conn, "SELECT pg_stat_statements_reset()")
+        return (await consultar(conn, "SHOW pg_stat_statements.track_planning"))[0][0] == "on"
+    except psycopg2.Error:
+        return False
+
+
+async def estadisticas_servidor(conn):
+    filas = await consultar(conn, """
+        SELECT sum(plans), sum(total_plan_time), sum(calls), sum(total_exec_time)
+        FROM pg_stat_statements
+        WHERE query ILIKE '%%FROM contenidos c%%' AND query NOT ILIKE '%%pg_stat_statements%%'
+    """)
+    return filas[0]
+
+
+async def llamadas(ids, facultades, n):
+    """Una ronda de llamadas a las queries calientes; retorna la latencia de cada una."""
+    latencias = []
+    for i in range(n):
+        inicio = time.perf_counter()
+        tipo = i % 3
+        if tipo == 0:
+            await app.consultar_contenidos(facultades[i % len(facultades)], None, 20, None, CAMPOS, False)
+        elif tipo == 1:
+            resultado = await app.get_contenido_detail(ids[i % len(ids)])
+            assert resultado["success"], resultado
+        else:
+            await app.buscar_contenidos(app.construir_tsquery(TERMINOS[i % len(TERMINOS)]))
+        latencias.append(time.perf_counter() - inicio)
+    return latencias
+
+
+async def tiempo_planificacion(conn, ids, repeticiones):
+    """Planning Time medio de EXPLAIN (ANALYZE) con SQL normal y con EXECUTE de la sentencia preparada."""
+    consulta = app.DETALLE_CONTENIDO_QUERY
+    texto, argumentos = app.sql_preparable(consulta)
+    await consultar(conn, f"PREPARE bench_detalle AS {texto}")
+    resultados = {}
+    for modo, sql in (("sql", consulta), ("preparada", f"EXECUTE bench_detalle{argumentos}")):
+        tiempos = []
+        for i in range(repeticiones):
+            plan = await consultar(conn, "EXPLAIN (ANALYZE, SUMMARY) " + sql,
+                                   {"id_contenido": ids[i % len(ids)], "temas_cacheados": []})
+            texto_plan = "\n".join(fila[0] for fila in plan)
+            tiempos.append(float(re.search(r"Planning Time: ([\d.]+) ms", texto_plan).group(1)))
+        resultados[modo] = statistics.mean(tiempos[5:] or tiempos)
+    await consultar(conn, "DEALLOCATE bench_detalle")
+    return resultados
+
+
+async def main_async(args):
+    await app.db_router.open()
+    conn = await app.AsyncConnection.connect(**app.db_router.primary_connect_kwargs)
+    try:
+        ids = [fila[0] for fila in await consultar(conn, "SELECT id_contenido FROM contenidos LIMIT 200")]
+        facultades = [fila[0] for fila in await consultar(conn, "SELECT id_facultad FROM facultades")]
+        con_stats = await pg_stat_statements(conn)
+        if not con_stats:
+            print("pg_stat_statements no disponible (o sin track_planning): solo latencia y EXPLAIN")
+
+        for modo, preparadas in (("sql", False), ("preparada", True)):
+            app.DB_PREPARED_STATEMENTS = preparadas
+            await llamadas(ids, facultades, min(args.runs, 60))  # calentar pools y sentencias
+            if con_stats:
+                await consultar(conn, "SELECT pg_stat_statements_reset()")
+            latencias = await llamadas(ids, facultades, args.runs)
+            linea = f"{modo:<10} {latencias_ms(latencias, decimales=3)}"
+            if con_stats:
+                planes, plan_ms, ejecuciones, exec_ms = await estadisticas_servidor(conn)
+                linea += (f"   planificaciones={int(planes or 0)}/{int(ejecuciones or 0)}  "
+                          f"plan={float(plan_ms or 0) / max(ejecuciones or 1, 1):6.3f}ms/llamada  "
+                          f"exec={float(exec_ms or 0) / max(ejecuciones or 1, 1):6.3f}ms/llamada")
+            print(linea)
+
+        planificacion = await tiempo_planificacion(conn, ids, 50)
+        print(f"EXPLAIN detalle: Planning Time sql={planificacion['sql']:.3f}ms  "
+              f"preparada={planificacion['preparada']:.3f}ms")
+        print(f"registro: {app.SentenciasPreparadas.stats()}")
+    finally:
+        conn.close()
+        await app.db_router.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=2000, help="Llamadas por modo (listado, detalle y búsqueda alternados)")
+    args = parser.parse_args()
+
+    logging.getLogger("app").setLevel(logging.ERROR)
+    print(f"{args.runs} llamadas por modo")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Coste por petición de decidir el destino (réplica o PRIMARY) de cada query.
+
+Compara, sobre las queries reales de la API:
+- el clasificador anterior (re.sub + upper + búsqueda de palabras clave en cada llamada)
+- el fallback actual `clasificar_sql` (regex memorizada con lru_cache) para SQL sin declarar
+- las `Consulta` declaradas con `lectura(...)`/`escritura(...)` (destino fijado al definirlas)
+
+También lista los casos que el clasificador anterior enrutaba mal. No necesita base de datos.
+
+Uso:
+    python benchmarks/query_routing.py --calls 200000
+"""
+import argparse
+import re
+import time
+
+import comun  # noqa: F401  (raíz del repositorio en sys.path)
+import app  # noqa: E402
+
+CONSULTAS = [app.FACULTADES_QUERY, app.TEMAS_QUERY, app.DETALLE_CONTENIDO_QUERY, app.BUSQUEDA_QUERY]
+
+# SQL con su destino correcto (True = lectura)
+CASOS = [
+    ("SELECT * FROM contenidos WHERE id_contenido = %s", True),
+    ("SELECT * FROM contenidos WHERE id_contenido = %s FOR UPDATE", False),
+    ("SELECT id_tema FROM temas FOR SHARE", False),
+    ("WITH nuevo AS (INSERT INTO contenido_tags (id_contenido, tag) VALUES (%s, %s) RETURNING id) SELECT * FROM nuevo", False),
+    ("WITH borrados AS (DELETE FROM contenidos WHERE id_facultad = %s RETURNING 1) SELECT count(*) FROM borrados", False),
+    ("SELECT titulo FROM contenidos WHERE titulo = 'update de la política'", True),
+    ("-- listado\nSELECT id_facultad FROM facultades", True),
+    ("INSERT INTO contenidos (id_contenido) VALUES (%s)", False),
+]
+
+
+def clasificador_anterior(query):
+    """Copia del `_is_read_query` anterior."""
+    normalized = re.sub(r'\s+', ' ', query.strip().upper())
+    if normalized.startswith('SELECT'):
+        return True
+    write_keywords = ['INSERT', 'UPDATE', 'DELETE', 'CREATE', 'DROP', 'ALTER', 'TRUNCATE']
+    for keyword in write_keywords:
+        if normalized.startswith(keyword) or f' {keyword} ' in normalized:
+            return False
+    return True
+
+
+def medir(nombre, clasificar, consultas, llamadas):
+    inicio = time.perf_counter()
+    for i in range(llamadas):
+        clasificar(consultas[i % len(consultas)])
+    duracion = time.perf_counter() - inicio
+    print(f"{nombre:<22} {duracion / llamadas * 1e6:8.3f} µs/llamada")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000, help="Clasificaciones por variante")
+    args = parser.parse_args()
+
+    router = app.DatabaseRouter()
+    sin_declarar = [str(consulta) for consulta in CONSULTAS]
+
+    print(f"{args.calls} clasificaciones por variante, {len(CONSULTAS)} queries de la API")
+    medir("anterior (regex)", clasificador_anterior, sin_declarar, args.calls)
+    medir("fallback memorizado", router._is_read_query, sin_declarar, args.calls)
+    medir("Consulta declarada", router._is_read_query, CONSULTAS, args.calls)
+
+    print("\nCasos mal enrutados por el clasificador anterior:")
+    for sql, es_lectura in CASOS:
+        anterior, actual = clasificador_anterior(sql), app.clasificar_sql(sql)
+        if anterior != es_lectura or actual != es_lectura:
+            destino = lambda lectura: "réplica" if lectura else "PRIMARY"  # noqa: E731
+            print(f"  {' '.join(sql.split())[:70]:<70} anterior={destino(anterior):<8} "
+                  f"actual={destino(actual):<8} correcto={destino(es_lectura)}")
+
+
+if __name__ == "__main__":
+    main()
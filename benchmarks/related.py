@@ -0,0 +1,188 @@
+"""
+Contenidos relacionados precalculados (contenidos_relacionados, sección 1.11 de init.sql):
+coste de mantener las listas al crear y borrar cards y latencia de
+GET /api/contenidos/{id}/related.
+
+- Construcción (--build): vacía la cola contenidos_relacionados_pendientes (la migración de
+  una base existente encola todas sus cards) y muestra cards procesadas por segundo.
+- Altas: crea --rows cards "bench_rel_..." copiando tema, facultad y tags de cards al azar
+  (vecinas reales de las existentes). Mide el INSERT (el trigger solo encola la card) y lo
+  que cuesta después procesar cada una: calcular su lista y entrar en las de sus vecinos.
+- Bajas: borra esas cards una a una. El DELETE las saca en la misma transacción de las
+  listas en las que entraron; después se recalculan las listas que se quedan cortas.
+- Lectura: --runs lecturas de la lista de cards al azar con la misma función que
+  /api/contenidos/{id}/related, frente a calcular la lista en el momento
+  (contenidos_relacionados_calcular + feed).
+
+Al final comprueba con contenidos_relacionados_diferencias que --check listas tocadas, al
+azar, coinciden con las calculadas desde cero. Las altas y bajas necesitan la cola vacía:
+sin --build, con cards pendientes solo se mide la lectura.
+
+Uso (con las variables DB_* apuntando a PRIMARY):
+    python benchmarks/related.py --rows 200 --runs 500 --build
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+
+from comun import ejecutar, latencias_ms
+import app  # noqa: E402
+
+N = app.RELACIONADOS_GUARDADOS
+
+
+async def pendientes():
+    return (await ejecutar("SELECT count(*) FROM contenidos_relacionados_pendientes"))[0][0]
+
+
+async def procesar(lote):
+    return (await ejecutar("SELECT contenidos_relacionados_procesar(%s, %s)", (lote, N)))[0][0]
+
+
+async def construir(lote):
+    total = await pendientes()
+    print(f"Construcción: {total} cards en la cola")
+    procesadas = 0
+    inicio = ultimo = time.perf_counter()
+    while True:
+        n = await procesar(lote)
+        procesadas += n
+        if n == 0:
+            break
+        if time.perf_counter() - ultimo > 30:
+            ultimo = time.perf_counter()
+            ritmo = procesadas / (ultimo - inicio)
+            print(f"  {procesadas}/{total}  {ritmo:6.1f} cards/s  quedan ~{(total - procesadas) / ritmo / 60:.0f} min")
+    duracion = time.perf_counter() - inicio
+    if procesadas:
+        print(f"Construcción: {procesadas} cards en {duracion:.0f} s   {procesadas / duracion:6.1f} cards/s   "
+              f"{duracion / procesadas * 1000:6.1f} ms/card")
+
+
+async def altas(rows, rng):
+    bases = [fila[0] for fila in await ejecutar(
+        "SELECT id_contenido FROM contenidos WHERE id_contenido NOT LIKE 'bench_rel_%%'")]
+    ids, inserts = [], []
+    for i in range(rows):
+        id_contenido = f"bench_rel_{i}"
+        inicio = time.perf_counter()
+        await ejecutar("""
+            WITH card AS (
+                INSERT INTO contenidos (id_contenido, id_tema, id_facultad, tipo, titulo, resumen)
+                SELECT %(id)s, id_tema, id_facultad, tipo, 'bench_rel ' || titulo, resumen
+                FROM contenidos WHERE id_contenido = %(base)s
+                RETURNING id_contenido
+            )
+            INSERT INTO contenido_tags (id_contenido, tag)
+            SELECT card.id_contenido, t.tag
+            FROM card, contenido_tags t WHERE t.id_contenido = %(base)s
+        """, {"id": id_contenido, "base": rng.choice(bases)})
+        inserts.append(time.perf_counter() - inicio)
+        ids.append(id_contenido)
+
+    procesos = []
+    while True:
+        inicio = time.perf_counter()
+        if await procesar(1) == 0:
+            break
+        procesos.append(time.perf_counter() - inicio)
+    listas = (await ejecutar("""
+        SELECT count(*) FROM contenidos_relacionados r, unnest(r.ids) AS v(id)
+        WHERE v.id LIKE 'bench_rel_%%'
+    """))[0][0]
+    print(f"Alta      INSERT card+tags   {latencias_ms(inserts, (50, 99))}")
+    print(f"          procesar la card   {latencias_ms(procesos, (50, 99))}   "
+          f"entra en {listas / rows:5.1f} listas de media")
+    return ids
+
+
+async def bajas(ids):
+    borrados, tocadas = [], []
+    for id_contenido in ids:
+        listas = (await ejecutar("SELECT count(*) FROM contenidos_relacionados WHERE ids && ARRAY[%s]",
+                                 (id_contenido,)))[0][0]
+        inicio = time.perf_counter()
+        await ejecutar("DELETE FROM contenidos WHERE id_contenido = %s", (id_contenido,))
+        borrados.append(time.perf_counter() - inicio)
+        tocadas.append(listas)
+
+    encoladas = await pendientes()
+    inicio = time.perf_counter()
+    while await procesar(1):
+        pass
+    print(f"Baja      DELETE             {latencias_ms(borrados, (50, 99))}   "
+          f"sale de {statistics.mean(tocadas):5.1f} listas de media")
+    print(f"          listas cortas recalculadas: {encoladas} en {time.perf_counter() - inicio:.2f} s")
+
+
+async def lectura(runs, rng):
+    muestra = [fila[0] for fila in await ejecutar(
+        "SELECT id_contenido FROM contenidos_relacionados TABLESAMPLE SYSTEM (5) LIMIT %s", (runs,))]
+    precalculadas, en_el_momento = [], []
+    for id_contenido in rng.sample(muestra, len(muestra)):
+        inicio = time.perf_counter()
+        await app.get_contenidos_relacionados(id_contenido, app.RELATED_LIMIT)
+        precalculadas.append(time.perf_counter() - inicio)
+    for id_contenido in muestra[:max(1, runs // 10)]:
+        inicio = time.perf_counter()
+        await ejecutar("""
+            SELECT c.id_contenido, c.titulo, c.tema_nombre, v.score
+            FROM contenidos_relacionados_calcular(%s, %s) v
+            JOIN contenidos_feed c ON c.id_contenido = v.id_relacionado
+        """, (id_contenido, app.RELATED_LIMIT))
+        en_el_momento.append(time.perf_counter() - inicio)
+    print(f"Lectura   precalculada       {latencias_ms(precalculadas, (50, 99))}   ({len(precalculadas)} cards)")
+    print(f"          en el momento      {latencias_ms(en_el_momento, (50, 99))}   ({len(en_el_momento)} cards)")
+
+
+async def main_async(args):
+    rng = random.Random(args.seed)
+    await app.db_router.open()
+    try:
+        cards, listas = (await ejecutar(
+            "SELECT (SELECT count(*) FROM contenidos), (SELECT count(*) FROM contenidos_relacionados)"))[0]
+        print(f"{cards} cards, {listas} listas de relacionados, {await pendientes()} en la cola")
+        if args.build:
+            await construir(args.build_batch)
+
+        inicio = (await ejecutar("SELECT clock_timestamp()"))[0][0]
+        if await pendientes():
+            print("La cola no está vacía: se omiten altas y bajas (usar --build)")
+        else:
+            ids = await altas(args.rows, rng)
+            await bajas(ids)
+        await lectura(args.runs, rng)
+
+        tocadas, diferencias = (await ejecutar("""
+            WITH muestra AS (
+                SELECT id_contenido FROM contenidos_relacionados WHERE updated_at >= %s
+                ORDER BY random() LIMIT %s
+            )
+            SELECT (SELECT count(*) FROM muestra),
+                   (SELECT count(*) FROM contenidos_relacionados_diferencias(ARRAY(SELECT id_contenido FROM muestra)))
+        """, (inicio, args.check)))[0]
+        print(f"Listas tocadas que no coinciden con el cálculo desde cero: {diferencias} de {tocadas} revisadas")
+    finally:
+        await ejecutar("DELETE FROM contenidos WHERE id_contenido LIKE 'bench_rel_%%'")
+        await app.db_router.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200, help="Cards creadas y borradas")
+    parser.add_argument("--runs", type=int, default=500, help="Lecturas de listas precalculadas")
+    parser.add_argument("--build", action="store_true", help="Vaciar antes la cola de cards pendientes")
+    parser.add_argument("--build-batch", type=int, default=20, help="Cards por transacción al construir")
+    parser.add_argument("--check", type=int, default=200, help="Listas tocadas que se verifican al final")
+    parser.add_argument("--seed", type=int, default=1, help="Semilla de la elección de cards")
+    args = parser.parse_args()
+
+    logging.getLogger("app").setLevel(logging.ERROR)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Inyección de fallos en las réplicas de lectura contra una API en marcha.
+
+Mantiene un flujo constante de lecturas (GET /api/contenidos, saltándose la cache
+de respuestas) mientras para una réplica con --stop-cmd y, pasados --down segundos,
+la vuelve a arrancar con --start-cmd. Consulta /api/health en paralelo para medir:
+
+- tasa de errores antes, durante y después de la caída
+- tiempo hasta que la réplica sale del balanceo (expulsión)
+- tiempo hasta que vuelve a recibir lecturas tras arrancarla (readmisión)
+
+Uso (docker compose):
+    python benchmarks/replica_failover.py --url http://localhost:8000 \\
+        --replica db-replica-2:5432 \\
+        --stop-cmd "docker compose stop db-replica-2" \\
+        --start-cmd "docker compose start db-replica-2"
+"""
+import argparse
+import json
+import shlex
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Un token de consistencia "0/0" no obliga a esperar a ninguna réplica, pero hace que
+# la API no sirva la lectura desde la cache de respuestas: todas llegan a la base de datos
+CABECERAS_LECTURA = {"X-Consistency-Token": "0/0"}
+
+
+def leer(url):
+    req = urllib.request.Request(url, headers=CABECERAS_LECTURA)
+    try:
+        with urllib.request.urlopen(req, timeout=10) as respuesta:
+            return json.loads(respuesta.read()).get("success", False)
+    except (urllib.error.URLError, OSError, ValueError):
+        return False
+
+
+def estado_replica(base, nombre):
+    try:
+        with urllib.request.urlopen(f"{base}/api/health", timeout=10) as respuesta:
+            estado = json.loads(respuesta.read())
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+    for replica in estado.get("replica_status", {}).get("replicas", []):
+        if replica["name"] == nombre:
+            return replica
+    return None
+
+
+class Carga:
+    """Hilos que leen sin parar y anotan (instante, éxito) de cada petición."""
+
+    def __init__(self, base, concurrencia):
+        self.url = f"{base}/api/contenidos?limit=20"
+        self.concurrencia = concurrencia
+        self.resultados = []
+        self._parar = threading.Event()
+        self._executor = ThreadPoolExecutor(concurrencia)
+
+    def _bucle(self):
+        while not self._parar.is_set():
+            ok = leer(self.url)
+            self.resultados.append((time.monotonic(), ok))
+
+    def iniciar(self):
+        for _ in range(self.concurrencia):
+            self._executor.submit(self._bucle)
+
+    def detener(self):
+        self._parar.set()
+        self._executor.shutdown(wait=True)
+
+    def tramo(self, desde, hasta):
+        oks = [ok for instante, ok in self.resultados if desde <= instante < hasta]
+        return len(oks), oks.count(False)
+
+
+def esperar_estado(base, nombre, disponible, limite):
+    """Segundos hasta que la réplica tiene `available == disponible` (None si no llega)."""
+    inicio = time.monotonic()
+    while time.monotonic() - inicio < limite:
+        replica = estado_replica(base, nombre)
+        if replica is not None and replica["available"] == disponible:
+            return time.monotonic() - inicio
+        time.sleep(0.1)
+    return None
+
+
+def ejecutar(comando):
+    subprocess.run(shlex.split(comando), check=True, stdout=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="URL base de la API")
+    parser.add_argument("--replica", required=True, help="Réplica a tumbar, como aparece en /api/health (host:puerto)")
+    parser.add_argument("--stop-cmd", required=True, help="Comando que para la réplica")
+    parser.add_argument("--start-cmd", required=True, help="Comando que la vuelve a arrancar")
+    parser.add_argument("--down", type=float, default=10, help="Segundos que la réplica permanece parada")
+    parser.add_argument("--warmup", type=float, default=5, help="Segundos de carga antes de la caída")
+    parser.add_argument("--concurrency", type=int, default=20, help="Lecturas en paralelo")
+    parser.add_argument("--timeout", type=float, default=60, help="Máximo a esperar la expulsión/readmisión")
+    args = parser.parse_args()
+
+    replica = estado_replica(args.url, args.replica)
+    if replica is None:
+        parser.error(f"{args.replica} no aparece en replica_status de /api/health")
+    if not replica["available"]:
+        parser.error(f"{args.replica} ya está fuera de servicio")
+
+    carga = Carga(args.url, args.concurrency)
+    carga.iniciar()
+    try:
+        inicio = time.monotonic()
+        time.sleep(args.warmup)
+
+        caida = time.monotonic()
+        ejecutar(args.stop_cmd)
+        expulsion = esperar_estado(args.url, args.replica, False, args.timeout)
+        time.sleep(max(0.0, args.down - (time.monotonic() - caida)))
+
+        arranque = time.monotonic()
+        ejecutar(args.start_cmd)
+        readmision = esperar_estado(args.url, args.replica, True, args.timeout)
+        recuperada = time.monotonic()
+        time.sleep(args.warmup)
+        fin = time.monotonic()
+    finally:
+        carga.detener()
+
+    reads = estado_replica(args.url, args.replica)
+    print(f"Réplica {args.replica}, {args.concurrency} lecturas en paralelo, parada {args.down:.0f}s")
+    for nombre, desde, hasta in (("antes", inicio, caida), ("caída", caida, arranque),
+                                 ("recuperación", arranque, recuperada), ("después", recuperada, fin)):
+        total, errores = carga.tramo(desde, hasta)
+        tasa = errores / total * 100 if total else 0.0
+        print(f"{nombre:<13} {total / max(hasta - desde, 1e-9):>8.1f} lecturas/s   "
+              f"peticiones={total:<6} errores={errores:<4} ({tasa:.2f}%)")
+    print(f"expulsión:  {'no detectada' if expulsion is None else f'{expulsion:.2f}s tras pararla'}")
+    print(f"readmisión: {'no detectada' if readmision is None else f'{readmision:.2f}s tras arrancarla'}")
+    if reads is not None:
+        print(f"lecturas servidas por la réplica: {reads['reads']}  expulsiones: {reads['ejections']}")
+
+
+if __name__ == "__main__":
+    main()
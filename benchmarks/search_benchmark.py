@@ -0,0 +1,132 @@
+"""
+Benchmark de búsqueda: ILIKE '%q%' (implementación anterior) frente a la
+búsqueda de texto completo (search_vector + índice GIN).
+
+1. Genera contenidos sintéticos (por defecto 100.000, IDs con prefijo `bench_`)
+   con tags, a partir de los temas y facultades existentes.
+2. Ejecuta cada término de búsqueda con ambas queries y muestra p50/p95.
+3. Con --cleanup elimina los contenidos sintéticos al terminar.
+
+Uso (con las variables DB_PRIMARY_* apuntando a la base de datos):
+    python benchmarks/search_benchmark.py --rows 100000 --runs 20 --cleanup
+"""
+import argparse
+import time
+
+from comun import conexion_primary
+from app import SEARCH_CONFIG, construir_tsquery  # noqa: E402
+
+PALABRAS = [
+    "democracia", "algoritmo", "clima", "energía", "migración", "justicia", "mercado",
+    "inteligencia", "artificial", "salud", "mental", "océano", "regulación", "privacidad",
+    "economía", "política", "digital", "sostenibilidad", "ética", "terapia", "redes",
+    "desinformación", "elecciones", "infraestructura", "computación", "educación",
+]
+TAGS = ["IA", "clima", "equidad", "privacidad", "geopolítica", "salud mental", "energía", "derecho"]
+
+TERMINOS = ["democracia", "inteligencia artificial", "clim", "regulación privacidad", "terapia", "xyzzy"]
+
+QUERY_ILIKE = """
+    SELECT c.id_contenido, c.titulo, f.nombre, t.nombre
+    FROM contenidos c
+    JOIN facultades f ON c.id_facultad = f.id_facultad
+    JOIN temas t ON c.id_tema = t.id_tema
+    WHERE c.titulo ILIKE %s OR c.resumen ILIKE %s OR t.nombre ILIKE %s
+    ORDER BY c.created_at DESC
+    LIMIT 20
+"""
+
+QUERY_FTS = f"""
+    SELECT c.id_contenido, c.titulo, f.nombre, t.nombre
+    FROM contenidos c
+    JOIN facultades f ON c.id_facultad = f.id_facultad
+    JOIN temas t ON c.id_tema = t.id_tema
+    CROSS JOIN to_tsquery('{SEARCH_CONFIG}', %s) AS busqueda
+    WHERE c.search_vector @@ busqueda
+    ORDER BY ts_rank_cd(c.search_vector, busqueda) DESC, c.created_at DESC
+    LIMIT 20
+"""
+
+
+def generar_contenidos(conn, filas):
+    """Insertar `filas` contenidos sintéticos (y 2 tags por contenido) en una transacción."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM contenidos WHERE id_contenido LIKE 'bench\\_%%'")
+        existentes = cur.fetchone()[0]
+        if existentes >= filas:
+            return existentes
+        cur.execute("""
+            WITH temas_arr AS (
+                SELECT array_agg(id_tema ORDER BY id_tema) AS ids,
+                       array_agg(upper(split_part(id_tema, '_', 1)) ORDER BY id_tema) AS facs
+                FROM temas
+            )
+            INSERT INTO contenidos (id_contenido, id_tema, id_facultad, tipo, titulo, resumen, created_at)
+            SELECT
+                'bench_' || g,
+                ids[1 + g %% array_length(ids, 1)],
+                facs[1 + g %% array_length(ids, 1)],
+                (ARRAY['Debate', 'Analisis', 'Estudio'])[1 + g %% 3],
+                'Estudio ' || g || ' sobre ' || p[1 + g %% %(n)s] || ' y ' || p[1 + (g / 7) %% %(n)s],
+                repeat(p[1 + (g / 3) %% %(n)s] || ' ' || p[1 + (g / 11) %% %(n)s] || ' '
+                       || p[1 + (g / 13) %% %(n)s] || ' análisis de contexto. ', 8),
+                now() - (g || ' seconds')::interval
+            FROM generate_series(%(desde)s, %(hasta)s) AS g,
+                 temas_arr,
+                 (SELECT %(palabras)s::text[] AS p) AS vocab
+        """, {"n": len(PALABRAS), "palabras": PALABRAS, "desde": existentes + 1, "hasta": filas})
+        cur.execute("""
+            INSERT INTO contenido_tags (id_contenido, tag)
+            SELECT 'bench_' || g, t[1 + (g + k) %% %(n)s]
+            FROM generate_series(%(desde)s, %(hasta)s) AS g,
+                 generate_series(0, 1) AS k,
+                 (SELECT %(tags)s::text[] AS t) AS tags
+        """, {"n": len(TAGS), "tags": TAGS, "desde": existentes + 1, "hasta": filas})
+        cur.execute("ANALYZE contenidos")
+        cur.execute("ANALYZE contenido_tags")
+    conn.commit()
+    return filas
+
+
+def medir(conn, query, params, runs):
+    latencias = []
+    with conn.cursor() as cur:
+        for _ in range(runs):
+            inicio = time.perf_counter()
+            cur.execute(query, params)
+            cur.fetchall()
+            latencias.append(time.perf_counter() - inicio)
+    latencias.sort()
+    p50 = latencias[len(latencias) // 2]
+    p95 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))]
+    return p50 * 1000, p95 * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Contenidos sintéticos a generar")
+    parser.add_argument("--runs", type=int, default=20, help="Repeticiones por término")
+    parser.add_argument("--cleanup", action="store_true", help="Eliminar los contenidos sintéticos al terminar")
+    args = parser.parse_args()
+
+    with conexion_primary() as conn:
+        inicio = time.perf_counter()
+        total = generar_contenidos(conn, args.rows)
+        print(f"{total} contenidos sintéticos listos ({time.perf_counter() - inicio:.1f}s)\n")
+
+        print(f"{'término':<26}{'ILIKE p50':>12}{'ILIKE p95':>12}{'FTS p50':>12}{'FTS p95':>12}")
+        for termino in TERMINOS:
+            like = f"%{termino}%"
+            ilike = medir(conn, QUERY_ILIKE, (like, like, like), args.runs)
+            fts = medir(conn, QUERY_FTS, (construir_tsquery(termino),), args.runs)
+            print(f"{termino:<26}{ilike[0]:>10.2f}ms{ilike[1]:>10.2f}ms{fts[0]:>10.2f}ms{fts[1]:>10.2f}ms")
+
+        if args.cleanup:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM contenidos WHERE id_contenido LIKE 'bench\\_%'")
+            conn.commit()
+            print("\nContenidos sintéticos eliminados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Ruta síncrona a la base de datos (pools de hilos), solo para los benchmarks: la API es
+`async def` y usa los `AsyncConnectionPool` de `app.db_router`.
+
+- `ConnectionPool`: pool de conexiones psycopg2 acotado y seguro entre hilos.
+- `RouterSincrono`: un `ConnectionPool` por servidor con el reparto de `app.db_router`
+  (escrituras a PRIMARY, lecturas a una réplica en servicio).
+
+benchmarks/sync_vs_async.py compara esta ruta con la asíncrona.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+import psycopg2
+
+import comun  # noqa: F401  (raíz del repositorio en sys.path)
+from app import (  # noqa: E402
+    DB_POOL_MAX_LIFETIME,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_POOL_VALIDATE_AFTER,
+    DatabaseRouter,
+    PoolTimeoutError,
+)
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones psycopg2 acotado y seguro entre hilos.
+
+    - Mantiene entre `min_size` y `max_size` conexiones abiertas.
+    - `getconn` espera como máximo `timeout` segundos a que se libere una conexión.
+    - Las conexiones que superan `max_lifetime` se reciclan y las que llevan más de
+      `validate_after` segundos inactivas se validan con `SELECT 1` antes de entregarse.
+    - Al devolver una conexión se hace ROLLBACK de cualquier transacción abierta.
+    """
+
+    def __init__(self, name: str, connect_kwargs: dict, min_size: int = DB_POOL_MIN_SIZE,
+                 max_size: int = DB_POOL_MAX_SIZE, timeout: float = DB_POOL_TIMEOUT,
+                 max_lifetime: float = DB_POOL_MAX_LIFETIME,
+                 validate_after: float = DB_POOL_VALIDATE_AFTER):
+        self.name = name
+        self._connect_kwargs = connect_kwargs
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.validate_after = validate_after
+
+        self._cond = threading.Condition()
+        self._idle = deque()      # (conn, created_at, last_used)
+        self._in_use = {}         # id(conn) -> created_at
+        self._size = 0            # conexiones abiertas + en proceso de apertura
+        self._waiting = 0
+        self._closed = False
+
+        # Estadísticas
+        self._checkouts = 0
+        self._timeouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _connect(self):
+        conn = psycopg2.connect(**self._connect_kwargs)
+        with self._cond:
+            self._created += 1
+        return conn
+
+    def _is_usable(self, conn, created_at: float, last_used: float) -> bool:
+        """Validar una conexión inactiva antes de entregarla."""
+        if conn.closed:
+            return False
+        now = time.monotonic()
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            return False
+        if self.validate_after is not None and now - last_used > self.validate_after:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def prefill(self):
+        """Abrir las conexiones mínimas (`min_size`)."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            self.putconn(conn, _created_at=time.monotonic(), _new=True)
+
+    def getconn(self, timeout: Optional[float] = None):
+        """Obtener una conexión del pool, esperando como máximo `timeout` segundos."""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            candidate = None
+            must_connect = False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise ConnectionError(f"Pool {self.name} cerrado")
+                    if self._idle:
+                        candidate = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        must_connect = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"Timeout ({timeout}s) esperando conexión del pool {self.name} "
+                            f"({self._size}/{self.max_size} en uso)"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if must_connect:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                created_at = time.monotonic()
+            else:
+                conn, created_at, last_used = candidate
+                if not self._is_usable(conn, created_at, last_used):
+                    # Conexión muerta o demasiado antigua: reciclar y volver a intentar
+                    self._close_quietly(conn)
+                    with self._cond:
+                        self._size -= 1
+                        self._discarded += 1
+                        self._cond.notify()
+                    continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._in_use[id(conn)] = created_at
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            return conn
+
+    def putconn(self, conn, discard: bool = False, _created_at: Optional[float] = None,
+                _new: bool = False):
+        """Devolver una conexión al pool (o descartarla si está rota)."""
+        with self._cond:
+            created_at = _created_at if _new else self._in_use.pop(id(conn), None)
+        if created_at is None:
+            created_at = time.monotonic()
+
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        if conn.closed:
+            discard = True
+
+        with self._cond:
+            if discard or self._closed:
+                self._size -= 1
+                self._discarded += 1
+            else:
+                self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+        if discard or self._closed:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Context manager que toma y devuelve una conexión del pool."""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.putconn(conn, discard=True)
+            raise
+        except BaseException:
+            self.putconn(conn)
+            raise
+        else:
+            self.putconn(conn)
+
+    def discard_idle(self):
+        """Cerrar las conexiones inactivas (p. ej. tras caerse el servidor) sin cerrar el pool."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._discarded += len(idle)
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._close_quietly(conn)
+
+    def close(self):
+        """Cerrar todas las conexiones inactivas y rechazar nuevas solicitudes."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> dict:
+        """Estadísticas del pool para dimensionarlo bajo carga."""
+        with self._cond:
+            return {
+                "size": self._size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "discarded": self._discarded,
+                "wait_time_avg_ms": round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "wait_time_max_ms": round(self._wait_max * 1000, 3),
+            }
+
+
+class RouterSincrono:
+    """
+    Conexiones síncronas repartidas como en `DatabaseRouter`: las escrituras (y con
+    `force_primary`, todas) van a PRIMARY y las lecturas a la réplica que elige el router,
+    o a PRIMARY si no hay ninguna en servicio. No vigila las réplicas: usa su estado tal
+    como lo deja el router.
+    """
+
+    def __init__(self, router: Optional[DatabaseRouter] = None):
+        self.router = router or DatabaseRouter()
+        self._primary = ConnectionPool("primary", self.router.primary_connect_kwargs)
+        self._replicas = {r.name: ConnectionPool(f"replica {r.name}", r.connect_kwargs)
+                          for r in self.router.replicas}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self, query: Optional[str] = None, force_primary: bool = False):
+        """Tomar una conexión del pool que corresponde a `query` y devolverla al salir."""
+        replica = None
+        if not force_primary and (query is None or self.router._is_read_query(query)):
+            with self._lock:
+                replica = self.router._elegir_replica()
+                if replica is not None:
+                    replica.outstanding += 1
+                    replica.reads += 1
+        pool = self._primary if replica is None else self._replicas[replica.name]
+        try:
+            with pool.connection() as conn:
+                yield conn
+        finally:
+            if replica is not None:
+                with self._lock:
+                    replica.outstanding -= 1
+
+    def close(self):
+        self._primary.close()
+        for pool in self._replicas.values():
+            pool.close()
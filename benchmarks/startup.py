@@ -0,0 +1,183 @@
+"""
+Arranque y escalado de la API lanzada con scripts/api-entrypoint.sh.
+
+- Arranque en frío: lanza la API (sin y con API_WARMUP) y mide cuándo empieza a aceptar
+  conexiones (/metrics, que no usa la base de datos), cuándo da su primera respuesta
+  correcta de /api/contenidos y la latencia de la primera petición de cada tipo
+  (facultades, temas, listado, búsqueda y detalle) frente a la segunda (medianas de
+  --runs arranques).
+- Escalado: con --workers 1,2,4 lanza la API con cada número de workers y mide
+  peticiones/s con --concurrency hilos de lecturas sin cache de respuestas (token de
+  consistencia "0/0", como load_test.py --bypass-cache). Con menos CPUs que workers el
+  resultado no escala: usar una máquina con al menos tantos núcleos como workers.
+
+Cada instancia se detiene con SIGTERM (parada ordenada) y se mide cuánto tarda en salir.
+
+Uso (con las variables DB_* apuntando a la base de datos):
+    python benchmarks/startup.py --port 8077 --workers 1,2,4 --duration 15
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+from comun import RAIZ
+
+CABECERAS_SIN_CACHE = {"X-Consistency-Token": "0/0"}
+
+
+def peticion(port, ruta, cabeceras=None, conn=None):
+    """Retorna (status, cuerpo JSON o None, segundos); status 0 si la API aún no acepta conexiones."""
+    propia = conn is None
+    conn = conn or http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    inicio = time.perf_counter()
+    try:
+        conn.request("GET", ruta, headers=cabeceras or {})
+        respuesta = conn.getresponse()
+        cuerpo = respuesta.read()
+        es_json = respuesta.getheader("Content-Type", "").startswith("application/json")
+        return respuesta.status, json.loads(cuerpo) if es_json else None, time.perf_counter() - inicio
+    except (OSError, http.client.HTTPException, ValueError):
+        return 0, None, time.perf_counter() - inicio
+    finally:
+        if propia:
+            conn.close()
+
+
+def lanzar(port, workers, warmup):
+    entorno = dict(os.environ, API_WORKERS=str(workers), API_WARMUP="true" if warmup else "false",
+                   LOG_LEVEL="WARNING")
+    entorno.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    return subprocess.Popen(["bash", os.path.join(RAIZ, "scripts", "api-entrypoint.sh"), "--port", str(port)],
+                            cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def esperar(port, ruta, limite=60):
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < limite:
+        status, _, _ = peticion(port, ruta)
+        if status == 200:
+            return time.perf_counter() - inicio
+        time.sleep(0.01)
+    raise SystemExit(f"La API no respondió a {ruta} en {limite}s")
+
+
+def detener(proceso):
+    inicio = time.perf_counter()
+    proceso.send_signal(signal.SIGTERM)
+    proceso.wait(timeout=60)
+    return time.perf_counter() - inicio
+
+
+def rutas(id_contenido):
+    return [("listado", "/api/contenidos?facultad=Todos"), ("facultades", "/api/facultades"),
+            ("temas", "/api/temas"), ("búsqueda", "/api/search?q=salud"),
+            ("detalle", f"/api/contenidos/{urllib.parse.quote(id_contenido)}")]
+
+
+def arrancar_una_vez(args, warmup, id_contenido):
+    """Lanza la API, hace la primera y la segunda petición de cada tipo y la detiene."""
+    medidas = {}
+    proceso = lanzar(args.port, 1, warmup)
+    try:
+        medidas["acepta"] = esperar(args.port, "/metrics")
+        for nombre, ruta in rutas(id_contenido):
+            status, _, primera = peticion(args.port, ruta, CABECERAS_SIN_CACHE)
+            _, _, segunda = peticion(args.port, ruta, CABECERAS_SIN_CACHE)
+            if nombre == "listado":
+                # Desde el lanzamiento hasta la primera respuesta correcta del listado
+                medidas["listo"] = medidas["acepta"] + primera if status == 200 else esperar(args.port, ruta)
+            medidas[nombre] = (primera, segunda)
+    finally:
+        medidas["parada"] = detener(proceso)
+    return medidas
+
+
+def arranque_en_frio(args):
+    # Una instancia previa, sin medir: el detalle necesita un id existente
+    proceso = lanzar(args.port, 1, False)
+    try:
+        esperar(args.port, "/metrics")
+        id_contenido = peticion(args.port, "/api/search?q=salud")[1]["data"][0]["id_contenido"]
+    finally:
+        detener(proceso)
+
+    for warmup in (False, True):
+        ejecuciones = [arrancar_una_vez(args, warmup, id_contenido) for _ in range(args.runs)]
+
+        def mediana(clave, i=None):
+            return statistics.median(e[clave] if i is None else e[clave][i] for e in ejecuciones)
+
+        primeras = [f"{nombre}={mediana(nombre, 0) * 1000:.1f}/{mediana(nombre, 1) * 1000:.1f}"
+                    for nombre, _ in rutas(id_contenido)]
+        print(f"API_WARMUP={str(warmup).lower():<5}  acepta conexiones en {mediana('acepta'):5.2f} s   "
+              f"primer listado en {mediana('listo'):5.2f} s   parada en {mediana('parada'):5.2f} s")
+        print(f"{'':<18} ms 1.ª/2.ª petición: {'  '.join(primeras)}")
+
+
+def trabajador(port, rutas, semilla, hasta, contador):
+    rng = random.Random(semilla)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    completadas = errores = 0
+    while time.monotonic() < hasta:
+        status, _, _ = peticion(port, rng.choice(rutas), CABECERAS_SIN_CACHE, conn)
+        if status == 200:
+            completadas += 1
+        else:
+            errores += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.close()
+    contador.append((completadas, errores))
+
+
+def escalado(args):
+    print(f"{os.cpu_count()} CPUs visibles")
+    base = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        proceso = lanzar(args.port, workers, True)
+        try:
+            esperar(args.port, "/api/health")
+            id_contenido = peticion(args.port, "/api/search?q=salud")[1]["data"][0]["id_contenido"]
+            lista = [ruta for _, ruta in rutas(id_contenido)]
+            contador = []
+            hasta = time.monotonic() + args.duration
+            hilos = [threading.Thread(target=trabajador, args=(args.port, lista, i, hasta, contador))
+                     for i in range(args.concurrency)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+        finally:
+            detener(proceso)
+        rps = sum(c for c, _ in contador) / args.duration
+        base = base or rps
+        print(f"{workers:>3} worker(s)  {rps:9.1f} req/s   x{rps / base:5.2f}   "
+              f"errores={sum(e for _, e in contador)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8077, help="Puerto en el que lanzar la API")
+    parser.add_argument("--runs", type=int, default=5, help="Arranques en frío por modo (se muestran medianas)")
+    parser.add_argument("--workers", default="1,2,4", help="Números de workers del escalado")
+    parser.add_argument("--duration", type=float, default=15, help="Segundos por número de workers")
+    parser.add_argument("--concurrency", type=int, default=32, help="Hilos con peticiones en paralelo")
+    parser.add_argument("--skip-scaling", action="store_true", help="Medir solo el arranque en frío")
+    args = parser.parse_args()
+
+    arranque_en_frio(args)
+    if not args.skip_scaling:
+        escalado(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Comparación de carga: ruta síncrona (ConnectionPool + threadpool, benchmarks/sincrono.py)
+frente a la ruta asíncrona (AsyncConnectionPool + event loop) del DatabaseRouter.
+
+Ejecuta la query del listado de contenidos con N peticiones concurrentes por
+cada ruta y muestra RPS y latencias p50/p95/p99. La ruta síncrona usa un
+threadpool de 40 hilos, el mismo límite que el threadpool de uvicorn/anyio.
+
+Uso (con las variables DB_* apuntando a la base de datos):
+    python benchmarks/sync_vs_async.py --requests 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from comun import latencias_ms
+from psycopg2.extras import RealDictCursor  # noqa: E402
+from sincrono import RouterSincrono  # noqa: E402
+
+from app import DatabaseRouter  # noqa: E402
+
+QUERY = """
+    SELECT
+        c.id_contenido, c.id_tema, c.id_facultad, c.tipo, c.titulo, c.resumen,
+        f.nombre as facultad_nombre, f.color_hex,
+        t.nombre as tema_nombre
+    FROM contenidos c
+    JOIN facultades f ON c.id_facultad = f.id_facultad
+    JOIN temas t ON c.id_tema = t.id_tema
+    ORDER BY c.created_at DESC
+    LIMIT 50
+"""
+
+THREADPOOL_SIZE = 40
+
+
+def resumen(nombre, latencias, duracion):
+    print(
+        f"{nombre:<6} {len(latencias) / duracion:>10.1f} req/s   "
+        f"{latencias_ms(latencias, (50, 95, 99))}"
+    )
+
+
+def ejecutar_sync(router, total):
+    def una_peticion(_):
+        inicio = time.perf_counter()
+        with router.connection(QUERY) as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(QUERY)
+            cur.fetchall()
+            cur.close()
+        return time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(THREADPOOL_SIZE) as executor:
+        latencias = list(executor.map(una_peticion, range(total)))
+    return latencias, time.perf_counter() - inicio
+
+
+async def ejecutar_async(router, total, concurrencia):
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def una_peticion():
+        async with semaforo:
+            inicio = time.perf_counter()
+            async with router.get_async_connection(QUERY) as conn:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    await cur.execute(QUERY)
+                    cur.fetchall()
+            return time.perf_counter() - inicio
+
+    await router.open()
+    inicio = time.perf_counter()
+    latencias = await asyncio.gather(*(una_peticion() for _ in range(total)))
+    duracion = time.perf_counter() - inicio
+    await router.close()
+    return latencias, duracion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Peticiones por ruta")
+    parser.add_argument("--concurrency", type=int, default=200, help="Peticiones en vuelo (ruta async)")
+    args = parser.parse_args()
+
+    print(f"{args.requests} peticiones, concurrencia async={args.concurrency}, threadpool sync={THREADPOOL_SIZE}")
+
+    router = RouterSincrono()
+    latencias, duracion = ejecutar_sync(router, args.requests)
+    router.close()
+    resumen("sync", latencias, duracion)
+
+    router = DatabaseRouter()
+    latencias, duracion = asyncio.run(ejecutar_async(router, args.requests, args.concurrency))
+    resumen("async", latencias, duracion)
+
+
+if __name__ == "__main__":
+    main()
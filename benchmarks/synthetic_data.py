@@ -0,0 +1,157 @@
+"""
+Generador de datos sintéticos para las pruebas de carga: escala el esquema de init.sql
+a 10^4–10^6 contenidos repartidos entre las facultades existentes, con sus tags, y crea
+los temas que hacen falta con sus listas (key concepts, actores, casos de estudio y
+tendencias).
+
+Los datos se generan en PostgreSQL por lotes (una transacción por lote) y de forma
+reproducible (setseed). Todas las filas llevan el prefijo "syn_" en su id: volver a
+ejecutar el generador solo añade las que falten hasta --contenidos, y --clean las borra.
+
+Uso (con las variables DB_* apuntando a PRIMARY):
+    python benchmarks/synthetic_data.py --contenidos 100000
+    python benchmarks/synthetic_data.py --clean
+"""
+import argparse
+import time
+
+from comun import conexion_primary
+
+# Vocabulario de títulos, resúmenes y tags (load_test.py busca las palabras de los títulos)
+PALABRAS = [
+    "democracia", "salud", "clima", "energía", "privacidad", "algoritmos", "elecciones",
+    "migración", "educación", "vivienda", "empleo", "inflación", "agua", "biodiversidad",
+    "ciberseguridad", "desinformación", "pandemias", "urbanismo", "transporte", "alimentación",
+    "pobreza", "desigualdad", "género", "juventud", "envejecimiento", "robótica", "genómica",
+    "vacunas", "océanos", "bosques", "minería", "litio", "hidrógeno", "baterías", "redes",
+    "satélites", "datos", "ética", "regulación", "mercados", "comercio", "aranceles",
+    "diplomacia", "conflictos", "seguridad", "justicia", "corrupción", "transparencia",
+    "participación", "ciudadanía", "cultura", "patrimonio", "turismo", "deporte", "música",
+    "cine", "periodismo", "plataformas", "criptomonedas", "bancos", "impuestos", "pensiones",
+]
+TIPOS = ["Debate", "Analisis", "Estudio"]
+EMOCIONES = ["Curiosidad", "Preocupación", "Esperanza", "Miedo", "Interés", "Duda", "Riesgo", "Conflicto"]
+FUENTES = ["paper", "informe", "noticia", "entrevista"]
+
+
+def crear_temas(cur, n_temas):
+    cur.execute("""
+        INSERT INTO temas (id_tema, nombre, descripcion)
+        SELECT 'syn_tema_' || n,
+               initcap((%(p)s::text[])[1 + n %% cardinality(%(p)s::text[])]) || ' y '
+                   || (%(p)s::text[])[1 + (n * 7) %% cardinality(%(p)s::text[])] || ' (' || n || ')',
+               'Tema sintético para pruebas de carga'
+        FROM generate_series(0, %(n)s - 1) AS n
+        ON CONFLICT (id_tema) DO NOTHING
+        RETURNING id_tema
+    """, {"p": PALABRAS, "n": n_temas})
+    nuevos = [fila[0] for fila in cur.fetchall()]
+    if not nuevos:
+        return 0
+    for tabla, columna, cantidad in (("tema_key_concepts", "concepto", 5), ("tema_main_actors", "actor", 4),
+                                     ("tema_case_studies", "caso_estudio", 3),
+                                     ("tema_future_trends", "tendencia_futura", 3)):
+        cur.execute(f"""
+            INSERT INTO {tabla} (id_tema, {columna})
+            SELECT t.id_tema, initcap((%(p)s::text[])[1 + floor(random() * cardinality(%(p)s::text[]))::int])
+                              || ' ' || i
+            FROM unnest(%(temas)s::text[]) AS t(id_tema) CROSS JOIN generate_series(1, %(c)s) AS i
+        """, {"p": PALABRAS, "temas": nuevos, "c": cantidad})
+    return len(nuevos)
+
+
+def crear_contenidos(cur, inicio, fin, n_temas, facultades):
+    """Contenidos syn_<inicio>..syn_<fin-1> y sus tags (3 a 5 por contenido)."""
+    params = {"p": PALABRAS, "tipos": TIPOS, "emociones": EMOCIONES, "fuentes": FUENTES,
+              "facultades": facultades, "inicio": inicio, "fin": fin - 1, "temas": n_temas}
+    cur.execute("""
+        INSERT INTO contenidos (id_contenido, id_tema, id_facultad, tipo, titulo, resumen, created_at,
+                                emocion_dominante, emocion_intensidad, tipo_fuente, origen_fuente, url_ver)
+        SELECT 'syn_' || lpad(g::text, 7, '0'),
+               'syn_tema_' || (g %% %(temas)s),
+               -- Cada tema pertenece siempre a la misma facultad
+               (%(facultades)s::text[])[1 + (g %% %(temas)s) %% cardinality(%(facultades)s::text[])],
+               (%(tipos)s::text[])[1 + g %% 3],
+               '¿Cómo afectan ' || p1 || ' y ' || p2 || ' a ' || p3 || '? (' || g || ')',
+               'Análisis de ' || p1 || ', ' || p2 || ' y ' || p3 || ' con datos recientes. '
+                   || repeat('Contexto, actores y escenarios posibles. ', 3),
+               now() - random() * interval '365 days',
+               (%(emociones)s::text[])[1 + g %% 8],
+               round((0.1 + random() * 0.9)::numeric, 2),
+               (%(fuentes)s::text[])[1 + g %% 4],
+               'sintetico',
+               'https://example.org/contenidos/' || g
+        FROM generate_series(%(inicio)s, %(fin)s) AS g
+        -- `0 * g` correlaciona la subconsulta para que random() se evalúe en cada fila
+        CROSS JOIN LATERAL (
+            SELECT (%(p)s::text[])[1 + floor(random() * cardinality(%(p)s::text[]))::int + 0 * g] AS p1,
+                   (%(p)s::text[])[1 + floor(random() * cardinality(%(p)s::text[]))::int + 0 * g] AS p2,
+                   (%(p)s::text[])[1 + floor(random() * cardinality(%(p)s::text[]))::int + 0 * g] AS p3
+        ) AS palabras
+    """, params)
+    cur.execute("""
+        INSERT INTO contenido_tags (id_contenido, tag)
+        SELECT 'syn_' || lpad(g::text, 7, '0'),
+               (%(p)s::text[])[1 + floor(random() * cardinality(%(p)s::text[]))::int]
+        FROM generate_series(%(inicio)s, %(fin)s) AS g
+        CROSS JOIN LATERAL generate_series(1, 3 + g %% 3) AS n
+    """, params)
+
+
+def limpiar(conn):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM contenidos WHERE id_contenido LIKE 'syn\\_%'")
+        contenidos = cur.rowcount
+        # Las listas de cada tema se borran en cascada
+        cur.execute("DELETE FROM temas WHERE id_tema LIKE 'syn\\_tema\\_%'")
+        temas = cur.rowcount
+    conn.commit()
+    print(f"borrados {contenidos} contenidos y {temas} temas sintéticos")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contenidos", type=int, default=100000, help="Contenidos sintéticos a tener en total")
+    parser.add_argument("--por-tema", type=int, default=100, help="Contenidos por tema (define cuántos temas se crean)")
+    parser.add_argument("--batch", type=int, default=20000, help="Contenidos por lote (una transacción por lote)")
+    parser.add_argument("--clean", action="store_true", help="Borrar los datos sintéticos y terminar")
+    args = parser.parse_args()
+
+    with conexion_primary() as conn:
+        if args.clean:
+            limpiar(conn)
+            return
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT setseed(0.42)")
+            cur.execute("SELECT id_facultad FROM facultades ORDER BY id_facultad")
+            facultades = [fila[0] for fila in cur.fetchall()]
+            cur.execute("SELECT count(*) FROM contenidos WHERE id_contenido LIKE 'syn\\_%'")
+            existentes = cur.fetchone()[0]
+            n_temas = max(1, args.contenidos // args.por_tema)
+            temas = crear_temas(cur, n_temas)
+        conn.commit()
+        print(f"{len(facultades)} facultades, {n_temas} temas sintéticos ({temas} nuevos), "
+              f"{existentes} contenidos sintéticos existentes")
+
+        inicio_total = time.perf_counter()
+        for inicio in range(existentes, args.contenidos, args.batch):
+            fin = min(inicio + args.batch, args.contenidos)
+            inicio_lote = time.perf_counter()
+            with conn.cursor() as cur:
+                crear_contenidos(cur, inicio, fin, n_temas, facultades)
+            conn.commit()
+            print(f"  {fin:>8}/{args.contenidos} contenidos  "
+                  f"({(fin - inicio) / (time.perf_counter() - inicio_lote):,.0f} filas/s)")
+
+        with conn.cursor() as cur:
+            for tabla in ("contenidos", "contenido_tags", "contenidos_feed", "temas"):
+                cur.execute(f"ANALYZE {tabla}")
+            cur.execute("SELECT count(*) FROM contenidos")
+            total = cur.fetchone()[0]
+        conn.commit()
+        print(f"listo en {time.perf_counter() - inicio_total:.1f}s: {total} contenidos en la tabla")
+
+
+if __name__ == "__main__":
+    main()
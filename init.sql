@@ -84,6 +84,689 @@ CREATE TABLE IF NOT EXISTS contenido_tags (
         ON UPDATE CASCADE ON DELETE CASCADE
 );
 
+-- 1.6 Índices de claves foráneas
+-- El detalle de un contenido lee sus tags y las listas de su tema en una sola query;
+-- la búsqueda de texto completo también recalcula su documento leyendo los tags.
+CREATE INDEX IF NOT EXISTS idx_contenido_tags_id_contenido ON contenido_tags (id_contenido);
+-- Borrado masivo por tema (DELETE /api/contenidos) y ON DELETE/UPDATE de temas
+CREATE INDEX IF NOT EXISTS idx_contenidos_id_tema ON contenidos (id_tema);
+CREATE INDEX IF NOT EXISTS idx_tema_key_concepts_id_tema ON tema_key_concepts (id_tema);
+CREATE INDEX IF NOT EXISTS idx_tema_main_actors_id_tema ON tema_main_actors (id_tema);
+CREATE INDEX IF NOT EXISTS idx_tema_case_studies_id_tema ON tema_case_studies (id_tema);
+CREATE INDEX IF NOT EXISTS idx_tema_future_trends_id_tema ON tema_future_trends (id_tema);
+
+-- 1.7 Búsqueda de texto completo (tsvector + GIN)
+-- Configuración en español que además ignora acentos ("democracia" ~ "democrácia")
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = spanish);
+        ALTER TEXT SEARCH CONFIGURATION es_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+    END IF;
+END $$;
+
+ALTER TABLE contenidos ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+-- Documento de búsqueda: título (A), tags y nombre del tema (B), resumen (C)
+CREATE OR REPLACE FUNCTION contenido_search_document(
+    p_id_contenido VARCHAR, p_id_tema VARCHAR, p_titulo TEXT, p_resumen TEXT
+) RETURNS tsvector
+LANGUAGE sql STABLE AS $$
+    SELECT setweight(to_tsvector('es_unaccent', coalesce(p_titulo, '')), 'A')
+        || setweight(to_tsvector('es_unaccent', coalesce(
+               (SELECT string_agg(tag, ' ') FROM contenido_tags WHERE id_contenido = p_id_contenido), '')), 'B')
+        || setweight(to_tsvector('es_unaccent', coalesce(
+               (SELECT nombre FROM temas WHERE id_tema = p_id_tema), '')), 'B')
+        || setweight(to_tsvector('es_unaccent', coalesce(p_resumen, '')), 'C');
+$$;
+
+CREATE OR REPLACE FUNCTION contenidos_search_vector_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := contenido_search_document(NEW.id_contenido, NEW.id_tema, NEW.titulo, NEW.resumen);
+    RETURN NEW;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_contenidos_search_vector ON contenidos;
+CREATE TRIGGER trg_contenidos_search_vector
+    BEFORE INSERT OR UPDATE OF id_tema, titulo, resumen ON contenidos
+    FOR EACH ROW EXECUTE FUNCTION contenidos_search_vector_trigger();
+
+-- Los tags forman parte del documento: recalcular los contenidos afectados una vez por sentencia
+CREATE OR REPLACE FUNCTION contenido_tags_search_vector_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE contenidos c
+           SET search_vector = contenido_search_document(c.id_contenido, c.id_tema, c.titulo, c.resumen)
+         WHERE c.id_contenido IN (SELECT DISTINCT id_contenido FROM tags_nuevos);
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE contenidos c
+           SET search_vector = contenido_search_document(c.id_contenido, c.id_tema, c.titulo, c.resumen)
+         WHERE c.id_contenido IN (SELECT DISTINCT id_contenido FROM tags_viejos);
+    ELSE
+        UPDATE contenidos c
+           SET search_vector = contenido_search_document(c.id_contenido, c.id_tema, c.titulo, c.resumen)
+         WHERE c.id_contenido IN (SELECT id_contenido FROM tags_nuevos
+                                  UNION SELECT id_contenido FROM tags_viejos);
+    END IF;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_contenido_tags_search_ins ON contenido_tags;
+CREATE TRIGGER trg_contenido_tags_search_ins
+    AFTER INSERT ON contenido_tags REFERENCING NEW TABLE AS tags_nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenido_tags_search_vector_trigger();
+
+DROP TRIGGER IF EXISTS trg_contenido_tags_search_del ON contenido_tags;
+CREATE TRIGGER trg_contenido_tags_search_del
+    AFTER DELETE ON contenido_tags REFERENCING OLD TABLE AS tags_viejos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenido_tags_search_vector_trigger();
+
+DROP TRIGGER IF EXISTS trg_contenido_tags_search_upd ON contenido_tags;
+CREATE TRIGGER trg_contenido_tags_search_upd
+    AFTER UPDATE ON contenido_tags REFERENCING OLD TABLE AS tags_viejos NEW TABLE AS tags_nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenido_tags_search_vector_trigger();
+
+-- El nombre del tema también es buscable
+CREATE OR REPLACE FUNCTION temas_search_vector_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE contenidos c
+       SET search_vector = contenido_search_document(c.id_contenido, c.id_tema, c.titulo, c.resumen)
+     WHERE c.id_tema = NEW.id_tema;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_temas_search_vector ON temas;
+CREATE TRIGGER trg_temas_search_vector
+    AFTER UPDATE OF nombre ON temas
+    FOR EACH ROW WHEN (OLD.nombre IS DISTINCT FROM NEW.nombre)
+    EXECUTE FUNCTION temas_search_vector_trigger();
+
+CREATE INDEX IF NOT EXISTS idx_contenidos_search_vector ON contenidos USING GIN (search_vector);
+
+-- Migración de bases existentes: calcular el documento de las filas anteriores a esta sección
+UPDATE contenidos
+   SET search_vector = contenido_search_document(id_contenido, id_tema, titulo, resumen)
+ WHERE search_vector IS NULL;
+
+-- 1.8 Índices para la paginación por cursor de /api/contenidos
+-- ORDER BY created_at DESC, id_contenido DESC con (created_at, id_contenido) < (cursor)
+CREATE INDEX IF NOT EXISTS idx_contenidos_created_at_id
+    ON contenidos (created_at, id_contenido);
+CREATE INDEX IF NOT EXISTS idx_contenidos_facultad_created_at_id
+    ON contenidos (id_facultad, created_at, id_contenido);
+
+-- 1.9 Notificaciones de invalidación de la cache de referencia de la API
+-- Cada escritura en los datos de referencia emite NOTIFY cache_invalidation con el nombre
+-- de la tabla; la API escucha el canal en PRIMARY e invalida su cache en memoria.
+CREATE OR REPLACE FUNCTION notificar_invalidacion_cache() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('cache_invalidation', TG_TABLE_NAME);
+    RETURN NULL;
+END $$;
+
+DO $$
+DECLARE
+    tabla TEXT;
+BEGIN
+    FOREACH tabla IN ARRAY ARRAY['facultades', 'temas', 'tema_key_concepts', 'tema_main_actors',
+                                 'tema_case_studies', 'tema_future_trends']
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_cache_invalidation ON %I', tabla, tabla);
+        EXECUTE format('CREATE TRIGGER trg_%s_cache_invalidation
+                            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I
+                            FOR EACH STATEMENT EXECUTE FUNCTION notificar_invalidacion_cache()',
+                       tabla, tabla);
+    END LOOP;
+END $$;
+
+-- 1.10 Feed de cards desnormalizado (contenidos_feed)
+-- /api/contenidos, /api/search y la exportación leen de esta tabla la proyección de la card
+-- ya unida (nombre y color de la facultad, nombre del tema, array de tags) en lugar de
+-- repetir el JOIN con facultades/temas en cada petición. Los triggers la mantienen al día
+-- en la misma transacción que modifica las tablas base.
+CREATE TABLE IF NOT EXISTS contenidos_feed (
+    id_contenido        VARCHAR(100) PRIMARY KEY,
+    id_tema             VARCHAR(100) NOT NULL,
+    id_facultad         VARCHAR(10)  NOT NULL,
+    tipo                VARCHAR(50)  NOT NULL,
+    titulo              VARCHAR(255) NOT NULL,
+    resumen             TEXT NOT NULL,
+    created_at          TIMESTAMP NOT NULL,
+    emocion_dominante   VARCHAR(50) NULL,
+    emocion_intensidad  DECIMAL(3,2) NULL,
+    tipo_fuente         VARCHAR(50) NULL,
+    origen_fuente       VARCHAR(100) NULL,
+    url_ver             VARCHAR(255) NULL,
+    url_descargar       VARCHAR(255) NULL,
+    facultad_nombre     VARCHAR(100) NOT NULL,
+    color_hex           VARCHAR(7)   NULL,
+    tema_nombre         VARCHAR(150) NOT NULL,
+    tags                TEXT[] NOT NULL DEFAULT '{}',
+    search_vector       tsvector NULL
+);
+
+-- Mismos recorridos que 1.7 y 1.8: orden del feed, filtro por facultad y búsqueda
+CREATE INDEX IF NOT EXISTS idx_contenidos_feed_created_at_id
+    ON contenidos_feed (created_at, id_contenido);
+CREATE INDEX IF NOT EXISTS idx_contenidos_feed_facultad_created_at_id
+    ON contenidos_feed (id_facultad, created_at, id_contenido);
+CREATE INDEX IF NOT EXISTS idx_contenidos_feed_search_vector
+    ON contenidos_feed USING GIN (search_vector);
+
+-- La proyección calculada con el JOIN en vivo (mismas columnas y orden que la tabla)
+CREATE OR REPLACE VIEW contenidos_feed_origen AS
+SELECT c.id_contenido, c.id_tema, c.id_facultad, c.tipo, c.titulo, c.resumen, c.created_at,
+       c.emocion_dominante, c.emocion_intensidad, c.tipo_fuente, c.origen_fuente,
+       c.url_ver, c.url_descargar,
+       f.nombre AS facultad_nombre, f.color_hex, t.nombre AS tema_nombre,
+       ARRAY(SELECT ct.tag::text FROM contenido_tags ct
+             WHERE ct.id_contenido = c.id_contenido ORDER BY ct.id) AS tags,
+       c.search_vector
+FROM contenidos c
+JOIN facultades f ON c.id_facultad = f.id_facultad
+JOIN temas t ON c.id_tema = t.id_tema;
+
+-- Recalcular las filas del feed de los contenidos indicados (las que ya no existen no se tocan)
+CREATE OR REPLACE FUNCTION contenidos_feed_refrescar(p_ids VARCHAR[]) RETURNS void
+LANGUAGE sql AS $$
+    INSERT INTO contenidos_feed (
+        id_contenido, id_tema, id_facultad, tipo, titulo, resumen, created_at,
+        emocion_dominante, emocion_intensidad, tipo_fuente, origen_fuente, url_ver, url_descargar,
+        facultad_nombre, color_hex, tema_nombre, tags, search_vector)
+    SELECT id_contenido, id_tema, id_facultad, tipo, titulo, resumen, created_at,
+           emocion_dominante, emocion_intensidad, tipo_fuente, origen_fuente, url_ver, url_descargar,
+           facultad_nombre, color_hex, tema_nombre, tags, search_vector
+    FROM contenidos_feed_origen
+    WHERE id_contenido = ANY(p_ids)
+    ON CONFLICT (id_contenido) DO UPDATE SET
+        id_tema = EXCLUDED.id_tema, id_facultad = EXCLUDED.id_facultad, tipo = EXCLUDED.tipo,
+        titulo = EXCLUDED.titulo, resumen = EXCLUDED.resumen, created_at = EXCLUDED.created_at,
+        emocion_dominante = EXCLUDED.emocion_dominante,
+        emocion_intensidad = EXCLUDED.emocion_intensidad,
+        tipo_fuente = EXCLUDED.tipo_fuente, origen_fuente = EXCLUDED.origen_fuente,
+        url_ver = EXCLUDED.url_ver, url_descargar = EXCLUDED.url_descargar,
+        facultad_nombre = EXCLUDED.facultad_nombre, color_hex = EXCLUDED.color_hex,
+        tema_nombre = EXCLUDED.tema_nombre, tags = EXCLUDED.tags,
+        search_vector = EXCLUDED.search_vector;
+$$;
+
+-- Contenidos: una vez por sentencia con las filas afectadas (cargas masivas incluidas)
+CREATE OR REPLACE FUNCTION contenidos_feed_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        TRUNCATE contenidos_feed;
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM contenidos_feed_refrescar(ARRAY(SELECT id_contenido FROM contenidos_nuevos));
+    ELSIF TG_OP = 'DELETE' THEN
+        DELETE FROM contenidos_feed
+         WHERE id_contenido IN (SELECT id_contenido FROM contenidos_viejos);
+    ELSE
+        -- Un UPDATE puede cambiar la clave primaria: quitar las filas con el id anterior
+        DELETE FROM contenidos_feed
+         WHERE id_contenido IN (SELECT id_contenido FROM contenidos_viejos
+                                EXCEPT SELECT id_contenido FROM contenidos_nuevos);
+        PERFORM contenidos_feed_refrescar(ARRAY(SELECT id_contenido FROM contenidos_nuevos));
+    END IF;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_contenidos_feed_ins ON contenidos;
+CREATE TRIGGER trg_contenidos_feed_ins
+    AFTER INSERT ON contenidos REFERENCING NEW TABLE AS contenidos_nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenidos_feed_trigger();
+
+DROP TRIGGER IF EXISTS trg_contenidos_feed_upd ON contenidos;
+CREATE TRIGGER trg_contenidos_feed_upd
+    AFTER UPDATE ON contenidos REFERENCING OLD TABLE AS contenidos_viejos NEW TABLE AS contenidos_nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenidos_feed_trigger();
+
+DROP TRIGGER IF EXISTS trg_contenidos_feed_del ON contenidos;
+CREATE TRIGGER trg_contenidos_feed_del
+    AFTER DELETE ON contenidos REFERENCING OLD TABLE AS contenidos_viejos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenidos_feed_trigger();
+
+DROP TRIGGER IF EXISTS trg_contenidos_feed_truncate ON contenidos;
+CREATE TRIGGER trg_contenidos_feed_truncate
+    AFTER TRUNCATE ON contenidos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenidos_feed_trigger();
+
+-- Tags: recalcular el array de los contenidos afectados
+CREATE OR REPLACE FUNCTION contenido_tags_feed_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM contenidos_feed_refrescar(ARRAY(SELECT DISTINCT id_contenido FROM tags_nuevos));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM contenidos_feed_refrescar(ARRAY(SELECT DISTINCT id_contenido FROM tags_viejos));
+    ELSE
+        PERFORM contenidos_feed_refrescar(ARRAY(SELECT id_contenido FROM tags_nuevos
+                                                UNION SELECT id_contenido FROM tags_viejos));
+    END IF;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_contenido_tags_feed_ins ON contenido_tags;
+CREATE TRIGGER trg_contenido_tags_feed_ins
+    AFTER INSERT ON contenido_tags REFERENCING NEW TABLE AS tags_nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenido_tags_feed_trigger();
+
+DROP TRIGGER IF EXISTS trg_contenido_tags_feed_del ON contenido_tags;
+CREATE TRIGGER trg_contenido_tags_feed_del
+    AFTER DELETE ON contenido_tags REFERENCING OLD TABLE AS tags_viejos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenido_tags_feed_trigger();
+
+DROP TRIGGER IF EXISTS trg_contenido_tags_feed_upd ON contenido_tags;
+CREATE TRIGGER trg_contenido_tags_feed_upd
+    AFTER UPDATE ON contenido_tags REFERENCING OLD TABLE AS tags_viejos NEW TABLE AS tags_nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenido_tags_feed_trigger();
+
+-- Facultades y temas: copiar el nombre/color a todas sus cards
+CREATE OR REPLACE FUNCTION facultades_feed_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE contenidos_feed
+       SET facultad_nombre = NEW.nombre, color_hex = NEW.color_hex
+     WHERE id_facultad = NEW.id_facultad;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_facultades_feed ON facultades;
+CREATE TRIGGER trg_facultades_feed
+    AFTER UPDATE OF nombre, color_hex ON facultades
+    FOR EACH ROW WHEN (OLD.nombre IS DISTINCT FROM NEW.nombre OR OLD.color_hex IS DISTINCT FROM NEW.color_hex)
+    EXECUTE FUNCTION facultades_feed_trigger();
+
+CREATE OR REPLACE FUNCTION temas_feed_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE contenidos_feed SET tema_nombre = NEW.nombre WHERE id_tema = NEW.id_tema;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_temas_feed ON temas;
+CREATE TRIGGER trg_temas_feed
+    AFTER UPDATE OF nombre ON temas
+    FOR EACH ROW WHEN (OLD.nombre IS DISTINCT FROM NEW.nombre)
+    EXECUTE FUNCTION temas_feed_trigger();
+
+-- Verificación de consistencia: cards que faltan en el feed, que sobran o cuyo contenido
+-- no coincide con el JOIN en vivo. Vacío si el feed está al día.
+CREATE OR REPLACE FUNCTION contenidos_feed_diferencias()
+RETURNS TABLE (id_contenido VARCHAR, problema TEXT)
+LANGUAGE sql STABLE AS $$
+    SELECT coalesce(o.id_contenido, f.id_contenido),
+           CASE WHEN f.id_contenido IS NULL THEN 'falta'
+                WHEN o.id_contenido IS NULL THEN 'sobra'
+                ELSE 'distinta' END
+    FROM contenidos_feed_origen o
+    FULL JOIN contenidos_feed f ON f.id_contenido = o.id_contenido
+    WHERE o.id_contenido IS NULL OR f.id_contenido IS NULL OR ROW(o.*) IS DISTINCT FROM ROW(f.*);
+$$;
+
+-- Reparación: aplicar las diferencias encontradas; retorna cuántas cards se corrigieron
+CREATE OR REPLACE FUNCTION contenidos_feed_reconstruir() RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    sobrantes VARCHAR[];
+    desfasadas VARCHAR[];
+BEGIN
+    SELECT coalesce(array_agg(d.id_contenido) FILTER (WHERE d.problema = 'sobra'), '{}'),
+           coalesce(array_agg(d.id_contenido) FILTER (WHERE d.problema <> 'sobra'), '{}')
+      INTO sobrantes, desfasadas
+      FROM contenidos_feed_diferencias() d;
+    DELETE FROM contenidos_feed WHERE id_contenido = ANY(sobrantes);
+    PERFORM contenidos_feed_refrescar(desfasadas);
+    RETURN cardinality(sobrantes) + cardinality(desfasadas);
+END $$;
+
+-- Migración de bases existentes: llenar el feed con los contenidos anteriores a esta sección
+SELECT contenidos_feed_reconstruir();
+
+-- 1.11 Contenidos relacionados (vecinos precalculados de cada card)
+-- GET /api/contenidos/{id}/related lee la lista ya ordenada de una card con una sola
+-- búsqueda por clave primaria. Score entre dos cards: 1 por cada tag compartido, 2 si son
+-- del mismo tema y 0.5 si son de la misma facultad (menos de un punto: solo desempata entre
+-- cards con los mismos tags y tema). Se guardan los 20 mejores vecinos de cada card.
+--
+-- Calcular la lista de una card obliga a recorrer todas las que comparten alguno de sus
+-- tags, demasiado para hacerlo dentro de cada INSERT (las cargas masivas insertan miles de
+-- cards por sentencia): los triggers solo encolan las cards creadas o modificadas en
+-- contenidos_relacionados_pendientes y la API las procesa en segundo plano con
+-- contenidos_relacionados_procesar(). Los borrados se aplican en la misma transacción.
+CREATE TABLE IF NOT EXISTS contenidos_relacionados (
+    id_contenido    VARCHAR(100) PRIMARY KEY,
+    ids             TEXT[] NOT NULL DEFAULT '{}',    -- por score DESC, id_contenido
+    scores          REAL[] NOT NULL DEFAULT '{}',
+    -- Frontera de la lista: cualquier card que no está en ella va por detrás de
+    -- (umbral, umbral_id). 0 y NULL si la lista contiene todos sus candidatos.
+    umbral          REAL NOT NULL DEFAULT 0,
+    umbral_id       TEXT NULL,
+    updated_at      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS contenidos_relacionados_pendientes (
+    id_contenido    VARCHAR(100) PRIMARY KEY,
+    encolado_at     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Cards que comparten un tag (sin visitar el heap), listas que contienen una card
+-- (al borrarla), listas con la frontera más baja y orden de la cola
+CREATE INDEX IF NOT EXISTS idx_contenido_tags_tag_id_contenido ON contenido_tags (tag, id_contenido);
+CREATE INDEX IF NOT EXISTS idx_contenidos_relacionados_ids ON contenidos_relacionados USING GIN (ids);
+CREATE INDEX IF NOT EXISTS idx_contenidos_relacionados_umbral ON contenidos_relacionados (umbral);
+CREATE INDEX IF NOT EXISTS idx_contenidos_relacionados_pendientes_encolado
+    ON contenidos_relacionados_pendientes (encolado_at);
+
+-- Candidatos de una card (las que comparten algún tag o el tema) con su score. Las cards
+-- de la misma facultad se leen del índice (id_facultad, created_at, id_contenido) sin
+-- visitar el heap
+CREATE OR REPLACE FUNCTION contenidos_relacionados_puntuar(p_id VARCHAR)
+RETURNS TABLE (id_relacionado VARCHAR, score REAL)
+LANGUAGE sql STABLE AS $$
+    SELECT x.id_contenido,
+           (count(DISTINCT x.tag) + 2 * max(x.mismo_tema)
+            + CASE WHEN bool_or(f.id_contenido IS NOT NULL) THEN 0.5 ELSE 0 END)::real
+    FROM (
+        SELECT t.id_contenido, t.tag, 0 AS mismo_tema
+        FROM contenido_tags t
+        WHERE t.tag IN (SELECT tag FROM contenido_tags WHERE id_contenido = p_id)
+        UNION ALL
+        SELECT c.id_contenido, NULL, 1
+        FROM contenidos c
+        WHERE c.id_tema = (SELECT id_tema FROM contenidos WHERE id_contenido = p_id)
+    ) x
+    LEFT JOIN (SELECT id_contenido FROM contenidos
+               WHERE id_facultad = (SELECT id_facultad FROM contenidos WHERE id_contenido = p_id)) f
+           ON f.id_contenido = x.id_contenido
+    WHERE x.id_contenido <> p_id
+    GROUP BY x.id_contenido;
+$$;
+
+-- Los p_n mejores vecinos entre los candidatos puntuados (p_ids, p_scores). Con menos de
+-- p_n candidatos se completa con cards que solo comparten la facultad.
+CREATE OR REPLACE FUNCTION contenidos_relacionados_elegir(p_id VARCHAR, p_n INTEGER,
+                                                          p_ids TEXT[], p_scores REAL[])
+RETURNS TABLE (id_relacionado VARCHAR, score REAL)
+LANGUAGE sql STABLE AS $$
+    SELECT id_relacionado, score
+    FROM (
+        SELECT u.id::varchar AS id_relacionado, u.score
+        FROM unnest(p_ids, p_scores) AS u(id, score)
+        UNION ALL
+        SELECT c.id_contenido, 0.5::real
+        FROM contenidos c
+        WHERE cardinality(p_ids) < p_n
+          AND c.id_facultad = (SELECT id_facultad FROM contenidos WHERE id_contenido = p_id)
+          AND c.id_contenido <> p_id AND c.id_contenido <> ALL(p_ids)
+    ) vecinos
+    ORDER BY score DESC, id_relacionado
+    LIMIT p_n;
+$$;
+
+-- Los p_n mejores vecinos de una card, calculados desde cero
+CREATE OR REPLACE FUNCTION contenidos_relacionados_calcular(p_id VARCHAR, p_n INTEGER)
+RETURNS TABLE (id_relacionado VARCHAR, score REAL)
+LANGUAGE sql STABLE AS $$
+    SELECT e.id_relacionado, e.score
+    FROM (SELECT coalesce(array_agg(id_relacionado::text), '{}') AS ids,
+                 coalesce(array_agg(score), '{}') AS scores
+          FROM contenidos_relacionados_puntuar(p_id)) p
+    CROSS JOIN LATERAL contenidos_relacionados_elegir(p_id, p_n, p.ids, p.scores) e;
+$$;
+
+-- Sacar cards de las listas en las que aparecen. La frontera no cambia (el resto de cards
+-- sigue por detrás de ella); las listas incompletas que se quedan con menos de p_minimo
+-- vecinos se encolan para recalcularlas.
+CREATE OR REPLACE FUNCTION contenidos_relacionados_quitar(p_ids VARCHAR[], p_minimo INTEGER DEFAULT 10)
+RETURNS void
+LANGUAGE sql AS $$
+    WITH recortadas AS (
+        UPDATE contenidos_relacionados r
+           SET ids = ARRAY(SELECT u.id FROM unnest(r.ids, r.scores) WITH ORDINALITY AS u(id, score, n)
+                           WHERE u.id <> ALL(p_ids) ORDER BY u.n),
+               scores = ARRAY(SELECT u.score FROM unnest(r.ids, r.scores) WITH ORDINALITY AS u(id, score, n)
+                              WHERE u.id <> ALL(p_ids) ORDER BY u.n),
+               updated_at = CURRENT_TIMESTAMP
+         WHERE r.ids && p_ids::text[]
+        RETURNING r.id_contenido, cardinality(r.ids) AS vecinos, r.umbral
+    )
+    INSERT INTO contenidos_relacionados_pendientes (id_contenido)
+    SELECT id_contenido FROM recortadas WHERE vecinos < p_minimo AND umbral > 0
+    ON CONFLICT (id_contenido) DO NOTHING;
+$$;
+
+-- Meter una card en las listas de sus candidatos (p_ids, p_scores) cuyo score supera la
+-- frontera de la lista, recortándolas a p_n vecinos. Solo se leen listas que la card puede
+-- superar, así que el coste no depende del número de candidatos sino de las listas tocadas.
+CREATE OR REPLACE FUNCTION contenidos_relacionados_insertar(p_id VARCHAR, p_n INTEGER,
+                                                            p_ids TEXT[], p_scores REAL[])
+RETURNS void
+LANGUAGE sql AS $$
+    WITH puntuados AS (
+        SELECT u.id, u.score FROM unnest(p_ids, p_scores) AS u(id, score)
+    ),
+    entrantes AS (
+        -- Score 1.5 o menos (la mayoría de candidatos: comparten un solo tag, o solo la
+        -- facultad): solo puede superar fronteras de 1.5 o menos, que son pocas. Se leen por
+        -- el índice de umbral hasta el mejor de esos scores y cada una se puntúa desde su
+        -- propia card, sin recorrer los candidatos
+        SELECT r.id_contenido, s.score
+        FROM contenidos_relacionados r
+        JOIN contenidos c ON c.id_contenido = r.id_contenido
+        CROSS JOIN (SELECT id_tema, id_facultad FROM contenidos WHERE id_contenido = p_id) o
+        CROSS JOIN LATERAL (
+            SELECT (count(DISTINCT t.tag) + CASE WHEN c.id_tema = o.id_tema THEN 2 ELSE 0 END
+                    + CASE WHEN c.id_facultad = o.id_facultad THEN 0.5 ELSE 0 END)::real AS score
+            FROM contenido_tags t
+            WHERE t.id_contenido = r.id_contenido
+              AND t.tag = ANY(ARRAY(SELECT tag FROM contenido_tags WHERE id_contenido = p_id))
+        ) s
+        WHERE r.umbral <= 1.5
+          AND r.umbral <= (SELECT greatest(0.5, max(score)) FROM puntuados WHERE score <= 1.5)
+          AND r.id_contenido <> p_id
+          AND s.score > 0 AND s.score <= 1.5
+        UNION ALL
+        -- El resto de candidatos, cada uno por clave primaria
+        SELECT r.id_contenido, p.score
+        FROM puntuados p
+        JOIN contenidos_relacionados r ON r.id_contenido = p.id
+        WHERE p.score > 1.5 AND r.umbral <= p.score
+    ),
+    fusionadas AS (
+        SELECT r.id_contenido, x.ids, x.scores, x.total
+        FROM entrantes e
+        JOIN contenidos_relacionados r ON r.id_contenido = e.id_contenido
+        CROSS JOIN LATERAL (
+            SELECT (array_agg(v.id ORDER BY v.score DESC, v.id))[1:p_n] AS ids,
+                   (array_agg(v.score ORDER BY v.score DESC, v.id))[1:p_n] AS scores,
+                   count(*) AS total
+            FROM (SELECT u.id, u.score FROM unnest(r.ids, r.scores) AS u(id, score)
+                  WHERE u.id <> p_id
+                  UNION ALL
+                  SELECT p_id, e.score) v
+        ) x
+        WHERE e.score > r.umbral OR (e.score = r.umbral AND p_id::text < r.umbral_id)
+    )
+    UPDATE contenidos_relacionados r
+       -- Al recortar, la nueva frontera es el último vecino que se queda
+       SET ids = f.ids, scores = f.scores,
+           umbral = CASE WHEN f.total > p_n THEN f.scores[p_n] ELSE r.umbral END,
+           umbral_id = CASE WHEN f.total > p_n THEN f.ids[p_n] ELSE r.umbral_id END,
+           updated_at = CURRENT_TIMESTAMP
+      FROM fusionadas f
+     WHERE r.id_contenido = f.id_contenido;
+$$;
+
+-- Procesar hasta p_limite cards de la cola: sacarlas de las listas en las que estaban,
+-- calcular su lista y meterlas en las de sus vecinos. Retorna cuántas procesó. Varios
+-- workers pueden llamarla a la vez (SKIP LOCKED); con lock_timeout, si una lista está
+-- bloqueada por un borrado, es esta función la que aborta y las cards vuelven a la cola.
+CREATE OR REPLACE FUNCTION contenidos_relacionados_procesar(p_limite INTEGER DEFAULT 20, p_n INTEGER DEFAULT 20)
+RETURNS integer
+LANGUAGE plpgsql
+SET lock_timeout = '200ms' AS $$
+DECLARE
+    v_id VARCHAR;
+    v_ids TEXT[];
+    v_scores REAL[];
+    procesadas INTEGER := 0;
+BEGIN
+    FOR v_id IN
+        DELETE FROM contenidos_relacionados_pendientes
+         WHERE id_contenido IN (SELECT id_contenido FROM contenidos_relacionados_pendientes
+                                 ORDER BY encolado_at LIMIT p_limite
+                                 FOR UPDATE SKIP LOCKED)
+        RETURNING id_contenido
+    LOOP
+        procesadas := procesadas + 1;
+        -- Sus tags, tema o facultad pueden haber cambiado: vuelve a entrar con el score nuevo
+        PERFORM contenidos_relacionados_quitar(ARRAY[v_id], p_n / 2);
+        IF NOT EXISTS (SELECT 1 FROM contenidos WHERE id_contenido = v_id) THEN
+            DELETE FROM contenidos_relacionados WHERE id_contenido = v_id;
+            CONTINUE;
+        END IF;
+
+        SELECT coalesce(array_agg(id_relacionado::text), '{}'), coalesce(array_agg(score), '{}')
+          INTO v_ids, v_scores
+          FROM contenidos_relacionados_puntuar(v_id);
+
+        INSERT INTO contenidos_relacionados (id_contenido, ids, scores, umbral, umbral_id)
+        SELECT v_id, coalesce(array_agg(id_relacionado ORDER BY score DESC, id_relacionado), '{}'),
+               coalesce(array_agg(score ORDER BY score DESC, id_relacionado), '{}'),
+               CASE WHEN count(*) < p_n THEN 0 ELSE min(score) END,
+               CASE WHEN count(*) < p_n THEN NULL
+                    ELSE (array_agg(id_relacionado ORDER BY score DESC, id_relacionado))[p_n] END
+        FROM contenidos_relacionados_elegir(v_id, p_n, v_ids, v_scores)
+        ON CONFLICT (id_contenido) DO UPDATE SET
+            ids = EXCLUDED.ids, scores = EXCLUDED.scores,
+            umbral = EXCLUDED.umbral, umbral_id = EXCLUDED.umbral_id,
+            updated_at = CURRENT_TIMESTAMP;
+
+        PERFORM contenidos_relacionados_insertar(v_id, p_n, v_ids, v_scores);
+    END LOOP;
+    RETURN procesadas;
+END $$;
+
+-- Borrar cards: su lista, su entrada en la cola y su presencia en las listas de otras
+CREATE OR REPLACE FUNCTION contenidos_relacionados_borrar(p_ids VARCHAR[]) RETURNS void
+LANGUAGE sql AS $$
+    DELETE FROM contenidos_relacionados WHERE id_contenido = ANY(p_ids);
+    DELETE FROM contenidos_relacionados_pendientes WHERE id_contenido = ANY(p_ids);
+    SELECT contenidos_relacionados_quitar(p_ids);
+$$;
+
+CREATE OR REPLACE FUNCTION contenidos_relacionados_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        TRUNCATE contenidos_relacionados, contenidos_relacionados_pendientes;
+    ELSIF TG_OP = 'INSERT' THEN
+        INSERT INTO contenidos_relacionados_pendientes (id_contenido)
+        SELECT id_contenido FROM contenidos_nuevos
+        ON CONFLICT (id_contenido) DO NOTHING;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM contenidos_relacionados_borrar(ARRAY(SELECT id_contenido FROM contenidos_viejos));
+    ELSE
+        PERFORM contenidos_relacionados_borrar(ARRAY(SELECT id_contenido FROM contenidos_viejos
+                                                     EXCEPT SELECT id_contenido FROM contenidos_nuevos));
+        -- Los vecinos solo cambian con el tema o la facultad
+        INSERT INTO contenidos_relacionados_pendientes (id_contenido)
+        SELECT n.id_contenido
+        FROM contenidos_nuevos n
+        LEFT JOIN contenidos_viejos v ON v.id_contenido = n.id_contenido
+        WHERE v.id_contenido IS NULL OR v.id_tema <> n.id_tema OR v.id_facultad <> n.id_facultad
+        ON CONFLICT (id_contenido) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_contenidos_relacionados_ins ON contenidos;
+CREATE TRIGGER trg_contenidos_relacionados_ins
+    AFTER INSERT ON contenidos REFERENCING NEW TABLE AS contenidos_nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenidos_relacionados_trigger();
+
+DROP TRIGGER IF EXISTS trg_contenidos_relacionados_upd ON contenidos;
+CREATE TRIGGER trg_contenidos_relacionados_upd
+    AFTER UPDATE ON contenidos REFERENCING OLD TABLE AS contenidos_viejos NEW TABLE AS contenidos_nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenidos_relacionados_trigger();
+
+DROP TRIGGER IF EXISTS trg_contenidos_relacionados_del ON contenidos;
+CREATE TRIGGER trg_contenidos_relacionados_del
+    AFTER DELETE ON contenidos REFERENCING OLD TABLE AS contenidos_viejos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenidos_relacionados_trigger();
+
+DROP TRIGGER IF EXISTS trg_contenidos_relacionados_truncate ON contenidos;
+CREATE TRIGGER trg_contenidos_relacionados_truncate
+    AFTER TRUNCATE ON contenidos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenidos_relacionados_trigger();
+
+-- Tags: encolar las cards que siguen existiendo (en un borrado en cascada ya no están)
+CREATE OR REPLACE FUNCTION contenido_tags_relacionados_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO contenidos_relacionados_pendientes (id_contenido)
+        SELECT DISTINCT t.id_contenido FROM tags_nuevos t
+        WHERE EXISTS (SELECT 1 FROM contenidos c WHERE c.id_contenido = t.id_contenido)
+        ON CONFLICT (id_contenido) DO NOTHING;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        INSERT INTO contenidos_relacionados_pendientes (id_contenido)
+        SELECT DISTINCT t.id_contenido FROM tags_viejos t
+        WHERE EXISTS (SELECT 1 FROM contenidos c WHERE c.id_contenido = t.id_contenido)
+        ON CONFLICT (id_contenido) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END $$;
+
+DROP TRIGGER IF EXISTS trg_contenido_tags_relacionados_ins ON contenido_tags;
+CREATE TRIGGER trg_contenido_tags_relacionados_ins
+    AFTER INSERT ON contenido_tags REFERENCING NEW TABLE AS tags_nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenido_tags_relacionados_trigger();
+
+DROP TRIGGER IF EXISTS trg_contenido_tags_relacionados_del ON contenido_tags;
+CREATE TRIGGER trg_contenido_tags_relacionados_del
+    AFTER DELETE ON contenido_tags REFERENCING OLD TABLE AS tags_viejos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenido_tags_relacionados_trigger();
+
+DROP TRIGGER IF EXISTS trg_contenido_tags_relacionados_upd ON contenido_tags;
+CREATE TRIGGER trg_contenido_tags_relacionados_upd
+    AFTER UPDATE ON contenido_tags REFERENCING OLD TABLE AS tags_viejos NEW TABLE AS tags_nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION contenido_tags_relacionados_trigger();
+
+-- Verificación: cards cuya lista guardada no coincide con la calculada desde cero (con
+-- tantos vecinos como tiene la guardada). Vacío si las listas están al día; recorre cada
+-- lista, así que conviene pasarle una muestra de cards.
+CREATE OR REPLACE FUNCTION contenidos_relacionados_diferencias(p_ids VARCHAR[])
+RETURNS TABLE (id_contenido VARCHAR, problema TEXT)
+LANGUAGE sql STABLE AS $$
+    SELECT r.id_contenido::varchar,
+           CASE WHEN p.id_contenido IS NOT NULL THEN 'pendiente' ELSE 'distinta' END
+    FROM contenidos_relacionados r
+    LEFT JOIN contenidos_relacionados_pendientes p ON p.id_contenido = r.id_contenido
+    CROSS JOIN LATERAL (
+        SELECT coalesce(array_agg(id_relacionado::text ORDER BY score DESC, id_relacionado), '{}') AS ids,
+               coalesce(array_agg(score ORDER BY score DESC, id_relacionado), '{}') AS scores
+        FROM contenidos_relacionados_calcular(r.id_contenido, cardinality(r.ids))
+    ) calculada
+    WHERE r.id_contenido = ANY(p_ids)
+      AND (calculada.ids IS DISTINCT FROM r.ids OR calculada.scores IS DISTINCT FROM r.scores);
+$$;
+
+-- Migración de bases existentes: encolar las cards que todavía no tienen lista
+INSERT INTO contenidos_relacionados_pendientes (id_contenido)
+SELECT c.id_contenido FROM contenidos c
+WHERE NOT EXISTS (SELECT 1 FROM contenidos_relacionados r WHERE r.id_contenido = c.id_contenido)
+ON CONFLICT (id_contenido) DO NOTHING;
+
 -- 2. INSERCIÓN DE DATOS SINTÉTICOS
 
 -- 2.1 Inserción de Facultades
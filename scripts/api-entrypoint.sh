@@ -0,0 +1,46 @@
+#!/bin/bash
+set -e
+
+# =========================================================
+# ENTRYPOINT DE LA API
+# Lanza uvicorn con API_WORKERS procesos ("auto" = uno por CPU disponible en el
+# contenedor, como mucho API_WORKERS_MAX) y parada ordenada al recibir SIGTERM
+# =========================================================
+
+# CPUs que puede usar el contenedor: afinidad (nproc) limitada por la cuota de cgroup
+cpus_disponibles() {
+    local cpus cuota periodo
+    cpus=$(nproc)
+    if [ -r /sys/fs/cgroup/cpu.max ]; then
+        read -r cuota periodo < /sys/fs/cgroup/cpu.max
+    elif [ -r /sys/fs/cgroup/cpu/cpu.cfs_quota_us ]; then
+        cuota=$(cat /sys/fs/cgroup/cpu/cpu.cfs_quota_us)
+        periodo=$(cat /sys/fs/cgroup/cpu/cpu.cfs_period_us)
+    fi
+    if [ -n "$cuota" ] && [ "$cuota" != "max" ] && [ "$cuota" -gt 0 ]; then
+        cuota=$(( (cuota + periodo - 1) / periodo ))
+        [ "$cuota" -lt "$cpus" ] && cpus=$cuota
+    fi
+    echo "$cpus"
+}
+
+WORKERS="${API_WORKERS:-auto}"
+if [ "$WORKERS" = "auto" ]; then
+    WORKERS=$(cpus_disponibles)
+    MAXIMO="${API_WORKERS_MAX:-8}"
+    [ "$WORKERS" -gt "$MAXIMO" ] && WORKERS=$MAXIMO
+fi
+
+# Con varios workers, cada uno escribe sus métricas en un directorio compartido y
+# /metrics las suma (modo multiproceso de prometheus_client); se vacía en cada arranque
+if [ "$WORKERS" -gt 1 ] && [ -z "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    export PROMETHEUS_MULTIPROC_DIR=/tmp/prometheus_multiproc
+fi
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
+echo "=== Iniciando API con $WORKERS worker(s) ==="
+exec uvicorn app:app --host 0.0.0.0 --port 8000 --workers "$WORKERS" \
+    --timeout-graceful-shutdown "${API_SHUTDOWN_TIMEOUT:-20}" "$@"
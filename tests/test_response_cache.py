@@ -0,0 +1,82 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import app  # noqa: E402
+
+logging.getLogger("app").setLevel(logging.ERROR)
+
+
+def test_cancelar_la_peticion_que_genera_no_deja_sin_respuesta_a_las_que_esperan():
+    async def escenario():
+        cache = app.ResponseCache(app.MemoryResponseBackend())
+        empezada = asyncio.Event()
+        llamadas = []
+
+        async def producir_lenta():
+            llamadas.append("primera")
+            empezada.set()
+            await asyncio.sleep(10)
+            return {"success": True, "data": "primera"}
+
+        async def producir():
+            llamadas.append("segunda")
+            return {"success": True, "data": "segunda"}
+
+        primera = asyncio.create_task(cache.obtener("k", ["t"], producir_lenta))
+        await empezada.wait()
+        segunda = asyncio.create_task(cache.obtener("k", ["t"], producir))
+        await asyncio.sleep(0)
+
+        primera.cancel()
+        cuerpo, estado = await asyncio.wait_for(segunda, timeout=5)
+
+        assert primera.cancelled()
+        assert json.loads(cuerpo)["data"] == "segunda"
+        assert estado == "MISS"
+        assert llamadas == ["primera", "segunda"]
+        assert await cache.obtener("k", ["t"], producir) == (cuerpo, "HIT")
+
+    asyncio.run(escenario())
+
+
+def test_las_peticiones_que_esperan_comparten_la_respuesta():
+    async def escenario():
+        cache = app.ResponseCache(app.MemoryResponseBackend())
+        llamadas = []
+
+        async def producir():
+            llamadas.append(1)
+            await asyncio.sleep(0.01)
+            return {"success": True, "data": [1, 2]}
+
+        resultados = await asyncio.gather(*(cache.obtener("k", ["t"], producir) for _ in range(5)))
+
+        assert len(llamadas) == 1
+        assert sorted(estado for _, estado in resultados) == ["COALESCED"] * 4 + ["MISS"]
+        assert len({cuerpo for cuerpo, _ in resultados}) == 1
+
+    asyncio.run(escenario())
+
+
+def test_la_segunda_invalidacion_se_ejecuta_pasado_el_margen(monkeypatch):
+    async def escenario():
+        cache = app.ResponseCache(app.MemoryResponseBackend())
+        monkeypatch.setattr(app, "response_cache", cache)
+        monkeypatch.setattr(app, "CACHE_INVALIDATION_GRACE", 0.05)
+
+        await app.invalidar_respuestas_contenidos("fac_1")
+        # Recargada desde una réplica atrasada entre las dos invalidaciones
+        await cache._escribir("k", b"{}", ["contenidos:fac_1"])
+        assert len(app._reinvalidaciones) == 1
+
+        await asyncio.wait_for(asyncio.gather(*app._reinvalidaciones), timeout=5)
+
+        assert await cache._leer("k") is None
+        assert not app._reinvalidaciones
+
+    asyncio.run(escenario())